@@ -0,0 +1,86 @@
+"""Start-up cost: time to import ofxclient and to run ``ofxclient --help``.
+
+Each target runs in a fresh interpreter, so nothing is already imported;
+the best of ``--repeat`` runs is reported, along with the heavy optional
+modules the target ended up importing.  None should be listed: ofxparse
+(with BeautifulSoup and lxml), ofxhome and keyring are only imported when
+they are needed.
+
+Run from the repository root::
+
+  python -m benchmarks.import_time
+  python -m benchmarks.import_time --repeat 20 --fail-on-heavy
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+import json
+import subprocess
+import sys
+
+# modules that are slow to import, or that do work when imported
+HEAVY = ('ofxparse', 'bs4', 'lxml', 'ofxhome', 'keyring', 'asyncio')
+
+TARGETS = [
+    ('import ofxclient', 'import ofxclient'),
+    ('import ofxclient.config', 'import ofxclient.config'),
+    ('import ofxclient.cli', 'import ofxclient.cli'),
+    ('ofxclient --help',
+     "sys.argv = ['ofxclient', '--help']\n"
+     "from ofxclient.cli import run\n"
+     "try:\n"
+     "    run()\n"
+     "except SystemExit:\n"
+     "    pass"),
+]
+
+PROGRAM = """
+import sys, time, json
+start = time.time()
+%s
+elapsed = time.time() - start
+sys.stdout = sys.__stdout__
+print(json.dumps([elapsed, sorted(m for m in %r if m in sys.modules)]))
+"""
+
+
+def measure(code, repeat):
+    """Best wall time of ``code`` in ``repeat`` fresh interpreters
+
+    :return: 2-tuple of (seconds, heavy modules imported)
+    :rtype: tuple
+    """
+    best = None
+    heavy = []
+    program = PROGRAM % (
+        # keep --help output out of the measurement's stdout
+        'import io\nsys.stdout = io.StringIO()\n' + code, HEAVY)
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, '-c', program])
+        elapsed, heavy = json.loads(out.decode('utf-8').splitlines()[-1])
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.import_time')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fail-on-heavy', action='store_true',
+                        help='exit with status 1 if a target imports a '
+                             'heavy module')
+    args = parser.parse_args()
+
+    failed = False
+    for name, code in TARGETS:
+        elapsed, heavy = measure(code, args.repeat)
+        failed = failed or bool(heavy)
+        print('%-24s %8.1fms  heavy: %s'
+              % (name, 1000 * elapsed, ', '.join(heavy) or '-'))
+    if failed and args.fail_on_heavy:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Pooled vs. unpooled request latency against a local TLS stub server.
+
+Run from the repository root::
+
+  python -m benchmarks.pool --requests 200
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+import time
+
+from ofxclient import Client, Institution
+from ofxclient.pool import ConnectionPool
+
+from benchmarks.stub_server import StubServer
+
+
+def measure(url, pool, requests):
+    institution = Institution(id='1', org='stub', url=url,
+                              username='user', password='pass')
+    client = Client(institution=institution, connection_pool=pool)
+    query = client.authenticated_query()
+    timings = []
+    for _ in range(requests):
+        start = time.time()
+        client.post(query)
+        timings.append(time.time() - start)
+    pool.clear()
+    return timings
+
+
+def summarize(name, timings):
+    timings = sorted(timings)
+    n = len(timings)
+    print('%-9s n=%-5d mean=%7.2fms  p50=%7.2fms  p95=%7.2fms  total=%7.1fms'
+          % (name, n,
+             1000 * sum(timings) / n,
+             1000 * timings[n // 2],
+             1000 * timings[min(n - 1, int(n * 0.95))],
+             1000 * sum(timings)))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.pool')
+    parser.add_argument('-n', '--requests', default=100, type=int)
+    args = parser.parse_args()
+
+    with StubServer() as server:
+        unpooled = ConnectionPool(max_idle=0, context=server.client_context)
+        pooled = ConnectionPool(context=server.client_context)
+        summarize('unpooled', measure(server.url, unpooled, args.requests))
+        summarize('pooled', measure(server.url, pooled, args.requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""OFX SGML scanner vs. BeautifulSoup/OfxParser on synthetic responses.
+
+Times the signon status check done by ``Institution.authenticate`` and the
+account list parsing done by ``Institution.accounts``, the way they used
+to be done and with :py:mod:`ofxclient.sgml`.
+
+OfxParser gets slow quickly as the number of accounts grows (1000 accounts
+take seconds), so keep the sizes modest.
+
+Run from the repository root::
+
+  python -m benchmarks.sgml --sizes 10 100 1000
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+from io import BytesIO
+import time
+
+from ofxclient import Account, Institution
+from ofxclient import sgml
+
+from benchmarks.synthetic import account_list_response
+
+
+def soup_signon(response):
+    from bs4 import BeautifulSoup
+    sonrs = BeautifulSoup(response, 'lxml').find('sonrs')
+    return int(sonrs.find('code').contents[0].strip())
+
+
+def ofxparse_accounts(response, institution):
+    from ofxparse import OfxParser
+    parsed = OfxParser.parse(BytesIO(response.encode()))
+    return [Account.from_ofxparse(a, institution=institution)
+            for a in parsed.accounts]
+
+
+def best_of(repeat, func, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        result = func(*args)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def describe(accounts):
+    return [(type(a).__name__, a.number, a.description,
+             getattr(a, 'routing_number', None),
+             getattr(a, 'account_type', None),
+             getattr(a, 'broker_id', None)) for a in accounts]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.sgml')
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    institution = Institution(id='1', org='org', url='https://example.com',
+                              username='user', password='pass')
+    print('%-8s %-10s %12s %12s %8s' % (
+        'accounts', 'what', 'old (ms)', 'sgml (ms)', 'speedup'))
+    for n in args.sizes:
+        response = account_list_response(n)
+
+        old, code = best_of(args.repeat, soup_signon, response)
+        new, status = best_of(args.repeat, sgml.signon_status, response)
+        assert code == status[0]
+        print('%-8d %-10s %12.2f %12.2f %7.1fx' % (
+            n, 'signon', old * 1000, new * 1000, old / new))
+
+        old, old_accounts = best_of(args.repeat, ofxparse_accounts,
+                                    response, institution)
+        new, new_accounts = best_of(args.repeat,
+                                    institution._accounts_from_response,
+                                    response)
+        assert describe(old_accounts) == describe(new_accounts)
+        print('%-8d %-10s %12.2f %12.2f %7.1fx' % (
+            n, 'accounts', old * 1000, new * 1000, old / new))
+
+
+if __name__ == '__main__':
+    main()
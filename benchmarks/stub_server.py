@@ -0,0 +1,94 @@
+"""A local TLS OFX stub server for benchmarks.
+
+It answers every POST with a canned OFX body and honours HTTP/1.1
+keep-alive, so it can be used to measure connection setup costs without
+talking to a real bank.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+try:
+    # python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+DEFAULT_RESPONSE = (
+    'OFXHEADER:100\r\nDATA:OFXSGML\r\nVERSION:102\r\n\r\n'
+    '<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS>'
+    '<DTSERVER>20190101000000<LANGUAGE>ENG</SONRS></SIGNONMSGSRSV1></OFX>'
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        body = self.server.response_body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ofx')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubServer(object):
+    """TLS server on 127.0.0.1 with a throwaway self signed certificate.
+
+    Use as a context manager; ``url`` is the OFX endpoint to point an
+    :py:class:`ofxclient.Institution` at and ``client_context`` is an
+    :py:class:`ssl.SSLContext` that trusts the certificate.
+    """
+
+    def __init__(self, response_body=DEFAULT_RESPONSE):
+        self.response_body = response_body.encode()
+        self._tmpdir = None
+        self._server = None
+
+    def __enter__(self):
+        self._tmpdir = tempfile.mkdtemp()
+        cert = os.path.join(self._tmpdir, 'cert.pem')
+        key = os.path.join(self._tmpdir, 'key.pem')
+        subprocess.check_call(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+             '-keyout', key, '-out', cert, '-days', '1',
+             '-subj', '/CN=127.0.0.1'],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_context.load_cert_chain(cert, key)
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.response_body = self.response_body
+        self._server.socket = server_context.wrap_socket(
+            self._server.socket, server_side=True)
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        self.client_context = ssl.create_default_context(cafile=cert)
+        self.client_context.check_hostname = False
+        self.url = 'https://127.0.0.1:%d/ofx' % self._server.server_port
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        shutil.rmtree(self._tmpdir)
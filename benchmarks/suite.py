@@ -0,0 +1,203 @@
+"""Benchmarks of the hot paths, on synthetic data and without a network.
+
+Times, at each size N:
+
+* ``query.*``: building N statement queries with :py:class:`ofxclient.Client`
+  (one per account type) and one combined query for N accounts
+* ``parse.statement.*``: ``Account.download_parsed`` of an N transaction
+  bank, credit card and investment statement
+* ``scan.statement.*``: ``Account.iter_transactions`` of the same statements
+* ``parse.accounts``: ``Institution.accounts`` with N accounts
+* ``combined_download``: merging the downloads of N accounts
+* ``config.accounts``: ``OfxConfig(...).accounts()`` with N sections
+* ``config.accounts.sqlite``: the same with N accounts in SQLite storage
+* ``config.account.sqlite``: ``OfxConfig(...).account(id)`` in SQLite
+  storage holding N accounts
+
+OfxParser takes tens of seconds for a 10k transaction investment statement,
+so a full run takes a few minutes.
+
+Banks are simulated by :py:class:`benchmarks.synthetic.SyntheticTransport`.
+Results can be written as JSON and compared against an earlier run to
+spot regressions between releases.
+
+Run from the repository root::
+
+  python -m benchmarks.suite --json results.json
+  python -m benchmarks.suite --only parse config --sizes 10 1000
+  python -m benchmarks.suite --compare results.json
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from ofxclient import Client, Institution, __version__
+from ofxclient.config import OfxConfig, SqliteStorage, migrate
+from ofxclient.util import combined_download
+
+from benchmarks.synthetic import (
+    STATEMENT_KINDS,
+    SyntheticTransport,
+    accounts,
+    write_config
+)
+
+DEFAULT_SIZES = [10, 1000, 10000]
+
+# transactions per account in combined_download
+COMBINED_TRANSACTIONS = 10
+
+
+def institution(transport):
+    return Institution(id='1', org='SYNTH', url='https://ofx.example.com/ofx',
+                       username='user', password='pass',
+                       client_args={'id': 'bench', 'transport': transport})
+
+
+def query_building(n):
+    inst = institution(None)
+    client = Client(institution=inst)
+    bank, card, broker = accounts(inst, 3)
+    requests = [a._statement_request(client, as_of='20190101')
+                for a in accounts(inst, n)]
+    return {
+        'query.bank': lambda: [
+            client.bank_account_query(bank.number, '20190101',
+                                      bank.account_type, bank.routing_number)
+            for _ in range(n)],
+        'query.creditcard': lambda: [
+            client.credit_card_account_query(card.number, '20190101')
+            for _ in range(n)],
+        'query.investment': lambda: [
+            client.brokerage_account_query(broker.number, '20190101',
+                                           broker.broker_id)
+            for _ in range(n)],
+        'query.statements': lambda: client.statements_query(requests),
+    }
+
+
+def statements(n):
+    inst = institution(SyntheticTransport(transactions=n))
+    bank, card, broker = accounts(inst, 3)
+    cases = {}
+    for kind, account in zip(STATEMENT_KINDS, (bank, card, broker)):
+        cases['parse.statement.%s' % kind] = \
+            lambda a=account: a.download_parsed(days=30)
+        cases['scan.statement.%s' % kind] = \
+            lambda a=account: list(a.iter_transactions(days=30))
+    return cases
+
+
+def account_list(n):
+    inst = institution(SyntheticTransport(accounts=n))
+    return {'parse.accounts': inst.accounts}
+
+
+def combined(n):
+    inst = institution(SyntheticTransport(
+        transactions=COMBINED_TRANSACTIONS))
+    members = accounts(inst, n)
+    return {'combined_download': lambda: combined_download(members, days=30)}
+
+
+def config(n, directory):
+    file_name = os.path.join(directory, 'ofxclient-%d.ini' % n)
+    write_config(file_name, n)
+    db = os.path.join(directory, 'ofxclient-%d.db' % n)
+
+    def sqlite():
+        # plain text credentials, as in the INI file; never the keyring
+        return OfxConfig(storage=SqliteStorage(db, keyring_available=False))
+
+    migrate(file_name, sqlite())
+    last = sqlite().storage.local_ids()[-1]
+    return {
+        'config.accounts': lambda: OfxConfig(file_name).accounts(),
+        'config.accounts.sqlite': lambda: sqlite().accounts(),
+        'config.account.sqlite': lambda: sqlite().account(last),
+    }
+
+
+def run(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        timings.append(time.time() - start)
+    return timings
+
+
+def compare_to(file_name):
+    with open(file_name) as fp:
+        previous = json.load(fp)
+    return dict(((r['name'], r['size']), r['best'])
+                for r in previous['results'])
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.suite')
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', metavar='PREFIX',
+                        help='only run benchmarks whose name starts with '
+                             'one of these')
+    parser.add_argument('--json', metavar='FILE',
+                        help='write the results to FILE as JSON')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare with the results in FILE, as written '
+                             'by --json')
+    args = parser.parse_args()
+
+    previous = compare_to(args.compare) if args.compare else {}
+    directory = tempfile.mkdtemp()
+    results = []
+    print('%-26s %7s %12s %12s %9s' % ('benchmark', 'n', 'best (ms)',
+                                       'mean (ms)', 'vs. old'))
+    try:
+        for n in args.sizes:
+            cases = {}
+            for factory in (query_building, statements, account_list,
+                            combined):
+                cases.update(factory(n))
+            cases.update(config(n, directory))
+            for name in sorted(cases):
+                if args.only and \
+                        not any(name.startswith(p) for p in args.only):
+                    continue
+                timings = run(cases[name], args.repeat)
+                best = min(timings)
+                mean = sum(timings) / len(timings)
+                results.append({'name': name, 'size': n, 'best': best,
+                                'mean': mean, 'repeat': args.repeat})
+                old = previous.get((name, n))
+                ratio = '%8.2fx' % (best / old) if old else ''
+                print('%-26s %7d %12.2f %12.2f %9s' % (
+                    name, n, best * 1000, mean * 1000, ratio))
+                sys.stdout.flush()
+    finally:
+        shutil.rmtree(directory)
+
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump({
+                'ofxclient': __version__,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'date': datetime.datetime.now().isoformat(),
+                'unit': 'seconds',
+                'results': results,
+            }, fp, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
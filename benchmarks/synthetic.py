@@ -0,0 +1,227 @@
+"""Synthetic OFX responses for benchmarks."""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from ofxclient import (
+    BankAccount,
+    BrokerageAccount,
+    CreditCardAccount,
+    Institution
+)
+from ofxclient.config import flatten_dict
+from ofxclient.transport import Response, Transport
+
+HEADER = '\r\n'.join([
+    'OFXHEADER:100',
+    'DATA:OFXSGML',
+    'VERSION:102',
+    'SECURITY:NONE',
+    'ENCODING:USASCII',
+    'CHARSET:1252',
+    'COMPRESSION:NONE',
+    'OLDFILEUID:NONE',
+    'NEWFILEUID:NONE',
+    '',
+    ''
+])
+
+
+def signon(code=0, message='Success'):
+    return (
+        '<SIGNONMSGSRSV1><SONRS><STATUS><CODE>%d<SEVERITY>%s'
+        '<MESSAGE>%s</STATUS><DTSERVER>20190301083000.000[-5:EST]'
+        '<LANGUAGE>ENG<FI><ORG>SYNTH<FID>1234</FI></SONRS>'
+        '</SIGNONMSGSRSV1>' % (code, 'INFO' if code == 0 else 'ERROR',
+                               message)
+    )
+
+
+def account_list_response(n):
+    """ACCTINFO response listing ``n`` accounts of mixed types"""
+    infos = []
+    for i in range(n):
+        kind = i % 3
+        if kind == 0:
+            info = (
+                '<BANKACCTINFO><BANKACCTFROM><BANKID>123456789'
+                '<ACCTID>%010d<ACCTTYPE>CHECKING</BANKACCTFROM>'
+                '<SUPTXDL>Y<XFERSRC>Y<XFERDEST>Y<SVCSTATUS>ACTIVE'
+                '</BANKACCTINFO>' % i)
+        elif kind == 1:
+            info = (
+                '<CCACCTINFO><CCACCTFROM><ACCTID>%016d</CCACCTFROM>'
+                '<SUPTXDL>Y<XFERSRC>N<XFERDEST>N<SVCSTATUS>ACTIVE'
+                '</CCACCTINFO>' % i)
+        else:
+            info = (
+                '<INVACCTINFO><INVACCTFROM><BROKERID>broker.example.com'
+                '<ACCTID>%08d</INVACCTFROM><USPRODUCTTYPE>401K'
+                '<CHECKING>N<SVCSTATUS>ACTIVE<INVACCTTYPE>INDIVIDUAL'
+                '</INVACCTINFO>' % i)
+        infos.append('<ACCTINFO><DESC>Account %d%s</ACCTINFO>' % (i, info))
+    return ''.join([
+        HEADER, '<OFX>', signon(),
+        '<SIGNUPMSGSRSV1><ACCTINFOTRNRS><TRNUID>1',
+        '<STATUS><CODE>0<SEVERITY>INFO</STATUS>',
+        '<ACCTINFORS><DTACCTUP>20190301083000.000'
+    ] + infos + [
+        '</ACCTINFORS></ACCTINFOTRNRS></SIGNUPMSGSRSV1></OFX>'
+    ])
+
+
+STATEMENT_KINDS = ('bank', 'creditcard', 'investment')
+
+_TRNTYPES = ('DEBIT', 'CREDIT', 'POS', 'CHECK', 'ATM', 'XFER')
+
+
+def _stmttrn(i):
+    return (
+        '<STMTTRN><TRNTYPE>%s<DTPOSTED>201902%02d120000.000[-5:EST]'
+        '<TRNAMT>%s%d.%02d<FITID>%012d<NAME>Payee number %d'
+        '<MEMO>Synthetic transaction %d</STMTTRN>' % (
+            _TRNTYPES[i % len(_TRNTYPES)], 1 + i % 28,
+            '-' if i % 3 else '', 1 + i % 997, i % 100, i, i % 211, i)
+    )
+
+
+def _invtran(i):
+    if i % 2:
+        return (
+            '<INCOME><INVTRAN><FITID>%012d<DTTRADE>201902%02d'
+            '<MEMO>Dividend %d</INVTRAN><SECID><UNIQUEID>%09d'
+            '<UNIQUEIDTYPE>CUSIP</SECID><INCOMETYPE>DIV<TOTAL>%d.%02d'
+            '<SUBACCTSEC>CASH<SUBACCTFUND>CASH</INCOME>' % (
+                i, 1 + i % 28, i, 100000000 + i % 50, 1 + i % 97, i % 100))
+    return (
+        '<BUYSTOCK><INVBUY><INVTRAN><FITID>%012d<DTTRADE>201902%02d'
+        '<MEMO>Buy %d</INVTRAN><SECID><UNIQUEID>%09d'
+        '<UNIQUEIDTYPE>CUSIP</SECID><UNITS>%d<UNITPRICE>%d.25'
+        '<COMMISSION>0<TOTAL>-%d.00<SUBACCTSEC>CASH<SUBACCTFUND>CASH'
+        '</INVBUY><BUYTYPE>BUY</BUYSTOCK>' % (
+            i, 1 + i % 28, i, 100000000 + i % 50, 1 + i % 20, 10 + i % 90,
+            (1 + i % 20) * (10 + i % 90)))
+
+
+def statement_response(kind, n, acctid='1234567890', trnuid='1'):
+    """Statement response of the given ``kind`` (one of
+    :py:data:`STATEMENT_KINDS`) with ``n`` transactions"""
+    if kind == 'bank':
+        body = (
+            '<BANKMSGSRSV1><STMTTRNRS><TRNUID>%s<STATUS><CODE>0'
+            '<SEVERITY>INFO</STATUS><STMTRS><CURDEF>USD<BANKACCTFROM>'
+            '<BANKID>123456789<ACCTID>%s<ACCTTYPE>CHECKING</BANKACCTFROM>'
+            '<BANKTRANLIST><DTSTART>20190101<DTEND>20190301%s'
+            '</BANKTRANLIST><LEDGERBAL><BALAMT>1234.56<DTASOF>20190301'
+            '</LEDGERBAL></STMTRS></STMTTRNRS></BANKMSGSRSV1>' % (
+                trnuid, acctid, ''.join(_stmttrn(i) for i in range(n))))
+    elif kind == 'creditcard':
+        body = (
+            '<CREDITCARDMSGSRSV1><CCSTMTTRNRS><TRNUID>%s<STATUS><CODE>0'
+            '<SEVERITY>INFO</STATUS><CCSTMTRS><CURDEF>USD<CCACCTFROM>'
+            '<ACCTID>%s</CCACCTFROM><BANKTRANLIST><DTSTART>20190101'
+            '<DTEND>20190301%s</BANKTRANLIST><LEDGERBAL><BALAMT>-432.10'
+            '<DTASOF>20190301</LEDGERBAL></CCSTMTRS></CCSTMTTRNRS>'
+            '</CREDITCARDMSGSRSV1>' % (
+                trnuid, acctid, ''.join(_stmttrn(i) for i in range(n))))
+    elif kind == 'investment':
+        body = (
+            '<INVSTMTMSGSRSV1><INVSTMTTRNRS><TRNUID>%s<STATUS><CODE>0'
+            '<SEVERITY>INFO</STATUS><INVSTMTRS><DTASOF>20190301'
+            '<CURDEF>USD<INVACCTFROM><BROKERID>broker.example.com'
+            '<ACCTID>%s</INVACCTFROM><INVTRANLIST><DTSTART>20190101'
+            '<DTEND>20190301%s</INVTRANLIST><INVBAL><AVAILCASH>100.00'
+            '<MARGINBALANCE>0<SHORTBALANCE>0</INVBAL></INVSTMTRS>'
+            '</INVSTMTTRNRS></INVSTMTMSGSRSV1>' % (
+                trnuid, acctid, ''.join(_invtran(i) for i in range(n))))
+    else:
+        raise ValueError('unknown statement kind %r' % kind)
+    return ''.join([HEADER, '<OFX>', signon(), body, '</OFX>'])
+
+
+def accounts(institution, n):
+    """``n`` accounts of mixed types at ``institution``"""
+    result = []
+    for i in range(n):
+        kind = i % 3
+        if kind == 0:
+            result.append(BankAccount(
+                institution=institution, number='%010d' % i,
+                routing_number='123456789', account_type='CHECKING',
+                description='Checking %d' % i))
+        elif kind == 1:
+            result.append(CreditCardAccount(
+                institution=institution, number='%016d' % i,
+                description='Card %d' % i))
+        else:
+            result.append(BrokerageAccount(
+                institution=institution, number='%08d' % i,
+                broker_id='broker.example.com',
+                description='Brokerage %d' % i))
+    return result
+
+
+def write_config(file_name, n):
+    """Write an OfxConfig file with ``n`` account sections, spread over
+    institutions of ten accounts each, with plain text credentials"""
+    lines = []
+    for start in range(0, n, 10):
+        institution = Institution(
+            id='%d' % start, org='SYNTH%d' % start,
+            url='https://ofx%d.example.com/ofx' % start,
+            username='user%d' % start, password='pass%d' % start,
+            description='Institution %d' % start)
+        for account in accounts(institution, min(10, n - start)):
+            items = flatten_dict(account.serialize())
+            lines.append('[%s]' % items['local_id'])
+            lines.extend('%s = %s' % (k, items[k]) for k in sorted(items))
+            lines.append('')
+    with open(file_name, 'w') as fp:
+        fp.write('\n'.join(lines))
+
+
+class SyntheticTransport(Transport):
+    """Transport (see :py:mod:`ofxclient.transport`) that answers like a
+    bank with synthetic responses: account list queries get ``accounts``
+    accounts and statement queries a statement with ``transactions``
+    transactions for the requested account"""
+
+    def __init__(self, accounts=10, transactions=10):
+        self.accounts = accounts
+        self.transactions = transactions
+        self._cache = {}
+
+    def post(self, url, headers, body, timing=None):
+        query = body.decode()
+        trnuid = _value(query, 'TRNUID') or '1'
+        if '<ACCTINFORQ>' in query:
+            response = account_list_response(self.accounts)
+        else:
+            if '<INVSTMTRQ>' in query:
+                kind = 'investment'
+            elif '<CCSTMTRQ>' in query:
+                kind = 'creditcard'
+            else:
+                kind = 'bank'
+            acctid = _value(query, 'ACCTID')
+            # building the body dominates for large statements; only the
+            # TRNUID and ACCTID change from one request to the next
+            key = (kind, self.transactions)
+            if key not in self._cache:
+                self._cache[key] = statement_response(
+                    kind, self.transactions, acctid='{ACCTID}',
+                    trnuid='{TRNUID}')
+            response = self._cache[key].replace(
+                '{ACCTID}', acctid).replace('{TRNUID}', trnuid)
+        res = Response(200, 'OK', [('Content-Type', 'application/x-ofx')])
+        return res, response.encode()
+
+
+def _value(query, tag):
+    start = query.find('<%s>' % tag)
+    if start < 0:
+        return None
+    start += len(tag) + 2
+    end = start
+    while end < len(query) and query[end] not in '<\r\n':
+        end += 1
+    return query[start:end].strip()
@@ -2,9 +2,10 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 import datetime
 import hashlib
+from io import BytesIO
 try:
     # python 3
-    from io import StringIO, BytesIO
+    from io import StringIO
     IS_PYTHON_2 = False
 except ImportError:
     # python 2
@@ -12,7 +13,8 @@ except ImportError:
     IS_PYTHON_2 = True
 import time
 
-from ofxparse import OfxParser, AccountType
+from ofxclient import sgml
+from ofxclient import timing
 
 
 class Account(object):
@@ -63,15 +65,30 @@ class Account(object):
         self.institution = institution
         self.number = number
         self.description = description or self._default_description()
+        self.hooks = []
+        self._local_id = None
+
+    def add_hook(self, hook):
+        """Call ``hook`` with the timings of this account's downloads:
+        a :py:class:`ofxclient.timing.RequestTiming` for every request and
+        a :py:class:`ofxclient.timing.ParseTiming` for every parse
+
+        :param hook: callable taking one timing
+        """
+        self.hooks.append(hook)
+        return self
 
     def local_id(self):
         """Locally generated unique account identifier.
 
         :rtype: string
         """
-        return hashlib.sha256(("%s%s" % (
-            self.institution.local_id(),
-            self.number)).encode()).hexdigest()
+        # cached, but recomputed if the institution or number are changed
+        key = (self.institution.local_id(), self.number)
+        if self._local_id is None or self._local_id[0] != key:
+            self._local_id = (key, hashlib.sha256(
+                ("%s%s" % key).encode()).hexdigest())
+        return self._local_id[1]
 
     def number_masked(self):
         """Masked version of the account number for privacy.
@@ -98,12 +115,112 @@ class Account(object):
         :rtype: :py:class:`StringIO`
 
         """
-        days_ago = datetime.datetime.now() - datetime.timedelta(days=days)
-        as_of = time.strftime("%Y%m%d", days_ago.timetuple())
+        return StringIO(sgml.decode(self.download_bytes(days=days)))
+
+    def download_bytes(self, days=60):
+        """Downloaded OFX response for the given time range, exactly as the
+        bank sent it
+
+        Use this rather than :py:meth:`download` when the response is going
+        to be parsed or written out anyway; it is not decoded to text and
+        copied around first.
+
+        :param days: Number of days to look back at
+        :type days: integer
+        :rtype: bytes
+        """
+        as_of = self._as_of(days)
         query = self._download_query(as_of=as_of)
-        response = self.institution.client().post(query)
+        return self._client().post_bytes(
+            query, cache_key=self._cache_key(as_of))
+
+    def download_chunked(self, days=365, window_days=None, workers=None,
+                         chunk_dir=None):
+        """Download a long history as a series of shorter date ranges,
+        merged into one response (see :py:mod:`ofxclient.chunked`)
+
+        :param days: Number of days to look back at
+        :type days: integer
+        :param window_days: days per request (default
+          :py:data:`ofxclient.chunked.DEFAULT_WINDOW_DAYS`)
+        :type window_days: integer or None
+        :param workers: max number of requests at once (default
+          :py:data:`ofxclient.chunked.DEFAULT_WORKERS`)
+        :type workers: integer or None
+        :param chunk_dir: directory to save the ranges in, so that an
+          interrupted download can be resumed (optional)
+        :type chunk_dir: string or None
+        :rtype: bytes
+        """
+        from ofxclient import chunked
+        return chunked.download(
+            self, days=days,
+            window_days=window_days or chunked.DEFAULT_WINDOW_DAYS,
+            workers=workers or chunked.DEFAULT_WORKERS, chunk_dir=chunk_dir)
+
+    def statement_chunked(self, days=365, window_days=None, workers=None,
+                          chunk_dir=None):
+        """The :py:class:`ofxparse.Statement` of
+        :py:meth:`download_chunked`
+
+        :rtype: :py:class:`ofxparser.Statement`
+        """
+        parsed = self._parse(self.download_chunked(
+            days=days, window_days=window_days, workers=workers,
+            chunk_dir=chunk_dir))
+        return parsed.account.statement
+
+    def download_since_last(self, store=None, overlap_days=None, days=60):
+        """Download only what is new since the last successful download
+
+        Asks the bank for transactions starting ``overlap_days`` before the
+        watermark (the DTEND, or DTSERVER, of the last successful statement
+        for this account) and then moves the watermark forward and saves
+        it.  Without a watermark it falls back to ``days`` days ago.
+
+        :param store: watermark storage (the process-wide default store,
+          see :py:func:`ofxclient.watermark.default_store`, if None)
+        :type store: :py:class:`ofxclient.watermark.WatermarkStore` or None
+        :param overlap_days: days to re-request before the watermark
+          (default :py:data:`ofxclient.watermark.DEFAULT_OVERLAP_DAYS`)
+        :type overlap_days: integer or None
+        :param days: Number of days to look back at with no watermark
+        :type days: integer
+        :rtype: :py:class:`StringIO`
+        """
+        from ofxclient import watermark
+        if store is None:
+            store = watermark.default_store()
+        if overlap_days is None:
+            overlap_days = watermark.DEFAULT_OVERLAP_DAYS
+
+        local_id = self.local_id()
+        last = store.get(local_id)
+        if last:
+            as_of = watermark.since(last, overlap_days=overlap_days)
+        else:
+            as_of = self._as_of(days)
+        query = self._download_query(as_of=as_of)
+        response = self._client().post(query)
+
+        reached = watermark.watermark_from_response(response)
+        if reached:
+            store.set(local_id, reached).save()
         return StringIO(response)
 
+    def download_async(self, days=60):
+        """Coroutine version of :py:meth:`download` (Python 3.5+)
+
+        The query is built exactly like :py:meth:`download` builds it and
+        posted with :py:class:`ofxclient.aio.AsyncClient`.
+
+        :param days: Number of days to look back at
+        :type days: integer
+        :rtype: coroutine returning :py:class:`StringIO`
+        """
+        from ofxclient import aio
+        return aio.download(self, days=days)
+
     def download_parsed(self, days=60):
         """Downloaded OFX response parsed by :py:meth:`OfxParser.parse`
 
@@ -111,14 +228,7 @@ class Account(object):
         :type days: integer
         :rtype: :py:class:`ofxparser.Ofx`
         """
-        if IS_PYTHON_2:
-            return OfxParser.parse(
-                self.download(days=days)
-            )
-        else:
-            return OfxParser.parse(
-                BytesIO(self.download(days=days).read().encode())
-            )
+        return self._parse(self.download_bytes(days=days))
 
     def statement(self, days=60):
         """Download the :py:class:`ofxparse.Statement` given the time range
@@ -130,6 +240,16 @@ class Account(object):
         parsed = self.download_parsed(days=days)
         return parsed.account.statement
 
+    def statement_async(self, days=60):
+        """Coroutine version of :py:meth:`statement` (Python 3.5+)
+
+        :param days: Number of days to look back at
+        :type days: integer
+        :rtype: coroutine returning :py:class:`ofxparser.Statement`
+        """
+        from ofxclient import aio
+        return aio.statement(self, days=days)
+
     def transactions(self, days=60):
         """Download a a list of :py:class:`ofxparse.Transaction` objects
 
@@ -139,6 +259,50 @@ class Account(object):
         """
         return self.statement(days=days).transactions
 
+    def _cache_key(self, as_of, dtend=None):
+        """Key of a statement response in a
+        :py:class:`ofxclient.cache.ResponseCache`"""
+        key = (self.institution.local_id(), self.local_id(), 'statement',
+               as_of)
+        if dtend:
+            key += (dtend,)
+        return key
+
+    def _as_of(self, days):
+        """'YYYYMMDD' date ``days`` days ago, as used in download queries"""
+        days_ago = datetime.datetime.now() - datetime.timedelta(days=days)
+        return time.strftime("%Y%m%d", days_ago.timetuple())
+
+    def _client(self):
+        """The institution's client, reporting to this account's hooks"""
+        return self.institution.client().with_hooks(self.hooks)
+
+    def _parse(self, response):
+        """Parse a raw downloaded response with :py:class:`OfxParser`"""
+        # imported here: ofxparse pulls in BeautifulSoup, which is slow to
+        # import and not needed by most uses of this module
+        from ofxparse import OfxParser
+        start = time.time()
+        parsed = OfxParser.parse(BytesIO(response))
+        timing.emit(timing.ParseTiming(
+            timing.host(self.institution.url), self.local_id(),
+            time.time() - start, len(response)), self.hooks)
+        return parsed
+
+    def iter_transactions(self, days=60):
+        """Generator of the transactions in the given time range
+
+        Unlike :py:meth:`transactions` this never builds an
+        :py:class:`ofxparse.Ofx` tree: the response is tokenized
+        incrementally and each transaction is yielded as soon as its
+        aggregate closes, as a lightweight record.
+
+        :param days: Number of days to look back at
+        :type days: integer
+        :rtype: iterator of :py:class:`ofxclient.sgml.TransactionRecord`
+        """
+        return sgml.transactions(BytesIO(self.download_bytes(days=days)))
+
     def serialize(self):
         """Serialize predictably for use in configuration storage.
 
@@ -173,15 +337,26 @@ class Account(object):
         return data
 
     @staticmethod
-    def deserialize(raw):
+    def deserialize(raw, institutions=None):
         """Instantiate :py:class:`ofxclient.Account` subclass from dictionary
 
         :param raw: serilized Account
         :param type: dict as  given by :py:meth:`~ofxclient.Account.serialize`
+        :param institutions: institutions by local id; the account gets the
+          one with the same local id when there is one, so accounts of one
+          login share it (and its client), updated to the settings in
+          ``raw``, and its own otherwise, which is then added
+        :type institutions: dict or None
         :rtype: subclass of :py:class:`ofxclient.Account`
         """
         from ofxclient.institution import Institution
         institution = Institution.deserialize(raw['institution'])
+        if institutions is not None:
+            shared = institutions.setdefault(institution.local_id(),
+                                             institution)
+            if shared is not institution:
+                shared._update(institution)
+                institution = shared
 
         del raw['institution']
         del raw['local_id']
@@ -204,6 +379,7 @@ class Account(object):
         :param institution: The parent institution of the account
         :type institution: :py:class:`ofxclient.Institution` object
         """
+        from ofxparse import AccountType
 
         description = data.desc if hasattr(data, 'desc') else None
         if data.type == AccountType.Bank:
@@ -226,6 +402,37 @@ class Account(object):
                 description=description)
         raise ValueError("unknown account type: %s" % data.type)
 
+    @staticmethod
+    def from_acctinfo(data, institution):
+        """Instantiate :py:class:`ofxclient.Account` subclass from an
+        account list entry
+
+        :param data: an account as returned by
+          :py:func:`ofxclient.sgml.account_list`
+        :type data: dict
+        :param institution: The parent institution of the account
+        :type institution: :py:class:`ofxclient.Institution` object
+        """
+        if data['type'] == 'BANKACCTINFO':
+            return BankAccount(
+                institution=institution,
+                number=data.get('ACCTID', ''),
+                routing_number=data.get('BANKID', ''),
+                account_type=data.get('ACCTTYPE', ''),
+                description=data['desc'])
+        elif data['type'] == 'CCACCTINFO':
+            return CreditCardAccount(
+                institution=institution,
+                number=data.get('ACCTID', ''),
+                description=data['desc'])
+        elif data['type'] == 'INVACCTINFO':
+            return BrokerageAccount(
+                institution=institution,
+                number=data.get('ACCTID', ''),
+                broker_id=data.get('BROKERID', ''),
+                description=data['desc'])
+        raise ValueError("unknown account type: %s" % data['type'])
+
 
 class BrokerageAccount(Account):
     """:py:class:`ofxclient.Account` subclass for brokerage/investment accounts
@@ -244,19 +451,31 @@ class BrokerageAccount(Account):
         super(BrokerageAccount, self).__init__(**kwargs)
         self.broker_id = broker_id
 
-    def _download_query(self, as_of):
+    def _download_query(self, as_of, dtend=None):
         """Formulate the specific query needed for download
 
         Not intended to be called by developers directly.
 
         :param as_of: Date in 'YYYYMMDD' format
         :type as_of: string
+        :param dtend: End date in 'YYYYMMDD' format (optional)
+        :type dtend: string or None
         """
         c = self.institution.client()
         q = c.brokerage_account_query(
-            number=self.number, date=as_of, broker_id=self.broker_id)
+            number=self.number, date=as_of, broker_id=self.broker_id,
+            dtend=dtend)
         return q
 
+    def _statement_request(self, client, as_of):
+        """(message set, transaction type, request) for
+        :py:meth:`ofxclient.Client.statements_query`
+
+        Not intended to be called by developers directly.
+        """
+        return ('INVSTMT', 'INVSTMT',
+                client._invstmtrq(self.broker_id, self.number, as_of))
+
 
 class BankAccount(Account):
     """:py:class:`ofxclient.Account` subclass for a checking/savings account
@@ -278,22 +497,35 @@ class BankAccount(Account):
         self.routing_number = routing_number
         self.account_type = account_type
 
-    def _download_query(self, as_of):
+    def _download_query(self, as_of, dtend=None):
         """Formulate the specific query needed for download
 
         Not intended to be called by developers directly.
 
         :param as_of: Date in 'YYYYMMDD' format
         :type as_of: string
+        :param dtend: End date in 'YYYYMMDD' format (optional)
+        :type dtend: string or None
         """
         c = self.institution.client()
         q = c.bank_account_query(
             number=self.number,
             date=as_of,
             account_type=self.account_type,
-            bank_id=self.routing_number)
+            bank_id=self.routing_number,
+            dtend=dtend)
         return q
 
+    def _statement_request(self, client, as_of):
+        """(message set, transaction type, request) for
+        :py:meth:`ofxclient.Client.statements_query`
+
+        Not intended to be called by developers directly.
+        """
+        return ('BANK', 'STMT',
+                client._bastmtrq(self.number, as_of, self.account_type,
+                                 self.routing_number))
+
 
 class CreditCardAccount(Account):
     """:py:class:`ofxclient.Account` subclass for a credit card account
@@ -307,14 +539,26 @@ class CreditCardAccount(Account):
     def __init__(self, **kwargs):
         super(CreditCardAccount, self).__init__(**kwargs)
 
-    def _download_query(self, as_of):
+    def _download_query(self, as_of, dtend=None):
         """Formulate the specific query needed for download
 
         Not intended to be called by developers directly.
 
         :param as_of: Date in 'YYYYMMDD' format
         :type as_of: string
+        :param dtend: End date in 'YYYYMMDD' format (optional)
+        :type dtend: string or None
         """
         c = self.institution.client()
-        q = c.credit_card_account_query(number=self.number, date=as_of)
+        q = c.credit_card_account_query(number=self.number, date=as_of,
+                                        dtend=dtend)
         return q
+
+    def _statement_request(self, client, as_of):
+        """(message set, transaction type, request) for
+        :py:meth:`ofxclient.Client.statements_query`
+
+        Not intended to be called by developers directly.
+        """
+        return ('CREDITCARD', 'CCSTMT',
+                client._ccstmtrq(self.number, as_of))
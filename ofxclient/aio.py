@@ -0,0 +1,303 @@
+"""asyncio support (Python 3.5+ only).
+
+Nothing in here is imported by the rest of the package until one of the
+``*_async`` methods on :py:class:`ofxclient.Account` or
+:py:class:`ofxclient.Institution` is called, so the package itself keeps
+working on Python 2.
+"""
+import asyncio
+from io import StringIO
+import logging
+import ssl
+import time
+from urllib.parse import urlsplit
+
+from ofxclient import retry
+from ofxclient import sgml
+from ofxclient import timing
+from ofxclient.client import Client, LINE_ENDING
+from ofxclient.transport import Response
+
+
+class AsyncResponse(Response):
+    """Status and headers of a response read by :py:class:`AsyncClient`."""
+
+    def __init__(self, status, reason, headers):
+        super(AsyncResponse, self).__init__(status, reason, headers,
+                                            will_close=True)
+
+
+class AsyncClient(Client):
+    """:py:class:`ofxclient.Client` whose ``post`` is a coroutine.
+
+    Queries are built by the exact same methods as the blocking client;
+    only the HTTP exchange runs on the event loop, so one loop can drive
+    many bank downloads concurrently without a thread per request.
+
+    The socket timeout and SSL context are taken from ``connection_pool``
+    so that both clients can be configured in one place.  When a
+    ``transport`` is set, requests go through it on the loop's default
+    executor instead.
+
+    Example::
+
+      import asyncio
+      from ofxclient.aio import AsyncClient
+
+      client = AsyncClient(institution=inst)
+      query = client.account_list_query()
+      response = asyncio.get_event_loop().run_until_complete(
+          client.post(query))
+    """
+
+    async def post(self, query, cache_key=None):
+        """Coroutine version of :py:meth:`ofxclient.Client.post`."""
+        return sgml.decode(await self.post_bytes(query, cache_key=cache_key))
+
+    async def post_bytes(self, query, cache_key=None):
+        """Coroutine version of :py:meth:`ofxclient.Client.post_bytes`."""
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+        response = await self._post_bytes(query)
+        again = self._session_retry(query, response)
+        if again is not None:
+            response = await self._post_bytes(again)
+            self._session_retry(again, response)
+        self._cache(cache_key, response)
+        return response
+
+    async def _post_bytes(self, query):
+        """Coroutine version of :py:meth:`ofxclient.Client._post_bytes`"""
+        attempts = retry.Attempts(self.retry_policy, self.breaker(),
+                                  self.institution.url,
+                                  timeouts=(asyncio.TimeoutError,))
+        while True:
+            attempts.check()
+            try:
+                status, response = await self._post_once(query,
+                                                         attempts.number)
+            except Exception as e:
+                delay = attempts.error(e)
+                if delay is None:
+                    raise
+            except BaseException:
+                # cancelled (a BaseException from Python 3.8 on)
+                attempts.cancelled()
+                raise
+            else:
+                delay = attempts.response(status, response)
+                if delay is None:
+                    return response
+            await asyncio.sleep(delay)
+
+    async def _post_once(self, query, attempt=1):
+        url = self.institution.url
+        request_timing = timing.RequestTiming(url, timing.host(url))
+        request_timing.attempt = attempt
+        try:
+            res, response = await self._do_post(
+                query, self._cookie_headers(), timing=request_timing)
+            cookies = self._cookie_retry(res, response, request_timing)
+            if cookies is not None:
+                res, response = await self._do_post(
+                    query, self._cookie_headers(cookies),
+                    timing=request_timing)
+                self._keep_cookies(res)
+        except Exception as e:
+            self._emit(request_timing.finish(error=e))
+            raise
+        self._emit(request_timing.finish())
+        return res.status, response
+
+    async def _do_post(self, query, extra_headers=[], timing=None):
+        """Coroutine version of :py:meth:`ofxclient.Client._do_post`.
+
+        Name resolution, TCP connect and TLS handshake are timed together,
+        as ``connect``.
+
+        :return: 2-tuple of (AsyncResponse, bytes response body)
+        :rtype: tuple
+        """
+        if self.transport is not None:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                None, Client._do_post, self, query, extra_headers, timing)
+        i = self.institution
+        logging.debug('posting data to %s' % i.url)
+        url = urlsplit(i.url)
+        selector = url.path or '/'
+        if url.query:
+            selector = '%s?%s' % (selector, url.query)
+        limiter = self.rate_limiter(url.netloc)
+        if limiter is not None:
+            await _acquire(limiter)
+        try:
+            return await self._exchange(url, selector, query, extra_headers,
+                                        timing)
+        finally:
+            if limiter is not None:
+                limiter.release()
+
+    async def _exchange(self, url, selector, query, extra_headers, timing):
+        """Send one request on a new connection and read the response."""
+        pool = self.connection_pool
+        context = pool.context or ssl.create_default_context()
+        start = time.time()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(url.hostname, url.port or 443,
+                                    ssl=context),
+            pool.timeout)
+        connected = time.time()
+        try:
+            headers = self._request_headers(url.netloc, query, extra_headers)
+            lines = ['POST %s HTTP/1.1' % selector]
+            lines.extend('%s: %s' % h for h in headers)
+            head = LINE_ENDING.join(lines) + LINE_ENDING + LINE_ENDING
+            logging.debug('---- request ----')
+            logging.debug(head)
+            logging.debug(query)
+            data = head.encode() + query.encode()
+            writer.write(data)
+            sent = time.time()
+            res = await asyncio.wait_for(_read_head(reader), pool.timeout)
+            started = time.time()
+            body = await asyncio.wait_for(_read_body(reader, res),
+                                          pool.timeout)
+        finally:
+            await _close(writer)
+        if timing is not None:
+            timing.reused = False
+            timing.add('connect', connected - start)
+            timing.add('send', sent - connected)
+            timing.add('server', started - sent)
+            timing.add('transfer', time.time() - started)
+            timing.status = res.status
+            timing.bytes_sent += len(data)
+            timing.bytes_received += len(body)
+        logging.debug('---- response ----')
+        logging.debug('Headers: %s', res.getheaders())
+        logging.debug(body)
+        return res, body
+
+
+async def _acquire(limiter):
+    """Wait for a :py:class:`ofxclient.ratelimit.RateLimiter` without
+    blocking the event loop: sleep until the bucket has a token, or until
+    a running request gives back its slot"""
+    loop = asyncio.get_event_loop()
+    while True:
+        released = loop.create_future()
+        wait = limiter.try_acquire(
+            on_release=lambda: loop.call_soon_threadsafe(_wake, released))
+        if wait == 0:
+            return
+        if wait is None:
+            await released
+        else:
+            await asyncio.sleep(wait)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+async def _close(writer):
+    """Close a :py:class:`asyncio.StreamWriter` and wait until it is
+    closed (Python 3.7+), so the connection is not left for the event loop
+    to clean up"""
+    writer.close()
+    if hasattr(writer, 'wait_closed'):
+        try:
+            await writer.wait_closed()
+        except OSError:
+            # the connection is gone either way
+            pass
+
+
+async def _read_head(reader):
+    """Read the status line and headers of an HTTP/1.x response from a
+    :py:class:`asyncio.StreamReader`.
+
+    :rtype: AsyncResponse
+    """
+    status_line = (await reader.readline()).decode('latin-1').rstrip()
+    parts = status_line.split(' ', 2)
+    if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+        raise ValueError('bad status line: %r' % status_line)
+    status = int(parts[1])
+    reason = parts[2] if len(parts) > 2 else ''
+
+    headers = []
+    while True:
+        line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers.append((name.strip(), value.strip()))
+    return AsyncResponse(status, reason, headers)
+
+
+async def _read_body(reader, res):
+    """Read the body of a response whose head has been read.
+
+    :rtype: bytes
+    """
+    if (res.getheader('Transfer-Encoding') or '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # skip trailers
+                while (await reader.readline()).strip():
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        return b''.join(chunks)
+
+    length = res.getheader('Content-Length')
+    if length is not None:
+        return await reader.readexactly(int(length))
+    return await reader.read()
+
+
+async def download_bytes(account, days=60):
+    """Coroutine version of :py:meth:`ofxclient.Account.download_bytes`"""
+    as_of = account._as_of(days)
+    query = account._download_query(as_of=as_of)
+    client = account.institution.async_client()
+    client.hooks.extend(account.hooks)
+    return await client.post_bytes(query,
+                                   cache_key=account._cache_key(as_of))
+
+
+async def download(account, days=60):
+    """See :py:meth:`ofxclient.Account.download_async`"""
+    return StringIO(sgml.decode(await download_bytes(account, days=days)))
+
+
+async def statement(account, days=60):
+    """See :py:meth:`ofxclient.Account.statement_async`"""
+    parsed = account._parse(await download_bytes(account, days=days))
+    return parsed.account.statement
+
+
+async def authenticate(institution, username=None, password=None):
+    """See :py:meth:`ofxclient.Institution.authenticate_async`"""
+    u, p = institution._credentials(username, password)
+    client = institution.async_client()
+    query = client.authenticated_query(username=u, password=p)
+    res = await client.post_bytes(query)
+    return institution._check_authentication(res)
+
+
+async def accounts(institution):
+    """See :py:meth:`ofxclient.Institution.accounts_async`"""
+    client = institution.async_client()
+    query = client.account_list_query()
+    resp = await client.post_bytes(query,
+                                   cache_key=institution._cache_key())
+    return institution._accounts_from_response(resp)
@@ -0,0 +1,196 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+import errno
+import hashlib
+import os
+import os.path
+import tempfile
+import threading
+import time
+
+from ofxclient import sgml
+
+DEFAULT_TTL = 15 * 60
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# cache used by every Client that is not given one; assign a ResponseCache
+# to turn caching on everywhere
+DEFAULT_CACHE = None
+
+
+class ResponseCache(object):
+    """On-disk cache of OFX responses with a time to live.
+
+    Entries are keyed on what was asked for - institution, account, kind
+    of query and date window - not on the raw query, which is different
+    every time (TRNUID, NEWFILEUID, DTCLIENT).  Only responses with a
+    successful signon are cached.
+
+    When the cache grows past ``max_bytes`` the least recently used
+    entries are removed.
+
+    :param directory: where to keep the cached responses
+    :type directory: string
+    :param ttl: seconds a response stays valid
+    :type ttl: integer or float
+    :param max_bytes: max total size of the cached responses
+    :type max_bytes: integer
+
+    Example::
+
+      import ofxclient.cache
+      from ofxclient.cache import ResponseCache
+
+      ofxclient.cache.DEFAULT_CACHE = ResponseCache('/tmp/ofx-cache', ttl=600)
+      account.statement(days=30)  # asks the bank
+      account.statement(days=30)  # served from the cache
+    """
+
+    def __init__(self, directory, ttl=DEFAULT_TTL,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def get(self, key):
+        """Cached response for ``key``, or None if there is none or it
+        has expired.
+
+        :param key: tuple identifying the request
+        :type key: tuple
+        :rtype: bytes or None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fp:
+                stored = os.fstat(fp.fileno()).st_mtime
+                if time.time() - stored > self.ttl:
+                    data = None
+                else:
+                    data = fp.read()
+        except (IOError, OSError):
+            data = None
+        if data is None:
+            self._count(hit=False)
+            return None
+        # the access time orders entries for eviction; set it explicitly
+        # since file systems are often mounted noatime
+        try:
+            os.utime(path, (time.time(), stored))
+        except OSError:
+            pass
+        self._count(hit=True)
+        return data
+
+    def set(self, key, data):
+        """Cache a response, then evict entries if the cache is too big
+
+        Responses without a successful signon are not cached.
+
+        :return: True if the response was cached
+        :rtype: boolean
+        """
+        if not cacheable(data):
+            return False
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            _replace(tmp, self._path(key))
+        except:
+            os.remove(tmp)
+            raise
+        self._evict()
+        return True
+
+    def clear(self):
+        """Remove every cached response"""
+        for path, _ in self._entries():
+            _remove(path)
+
+    def stats(self):
+        """Hit and miss counters and the current size of the cache
+
+        :rtype: dict
+        """
+        entries = self._entries()
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(entries),
+                'bytes': sum(st.st_size for _, st in entries),
+            }
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _path(self, key):
+        digest = hashlib.sha256(
+            '\0'.join('%s' % part for part in key).encode()).hexdigest()
+        return os.path.join(self.directory, digest + '.ofx')
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.ofx'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((path, os.stat(path)))
+            except OSError:
+                pass
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(st.st_size for _, st in entries)
+        if total <= self.max_bytes:
+            return
+        now = time.time()
+        # expired entries go first, then the least recently used ones
+        entries.sort(key=lambda e: (now - e[1].st_mtime <= self.ttl,
+                                    e[1].st_atime))
+        for path, st in entries:
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= st.st_size
+
+
+def cacheable(data):
+    """Is a response worth caching: does it have a successful signon,
+    and did every transaction response in it (STMTTRNRS, ...) succeed?
+
+    :rtype: boolean
+    """
+    signon, responses = sgml.statuses(data)
+    return signon is not None and signon[0] == 0 and \
+        all(code == 0 for _, code, _ in responses)
+
+
+def _replace(src, dst):
+    if hasattr(os, 'replace'):
+        # python 3
+        os.replace(src, dst)
+    else:
+        # python 2
+        os.rename(src, dst)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
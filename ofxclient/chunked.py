@@ -0,0 +1,271 @@
+"""Downloading a long history as a series of shorter date ranges.
+
+Asking a bank for years of transactions in one request is slow and
+fragile: the request may time out, or the bank may quietly cut the
+response short.  :py:func:`download` splits the range into windows of
+``window_days`` (see :py:func:`windows`), each an ordinary statement
+request with an explicit DTEND, and fetches them ``workers`` at a time.
+
+Windows overlap by ``overlap_days`` so that nothing is lost to how a bank
+treats the ends of a range; :py:func:`merge` drops the duplicates by
+FITID and puts everything into one response: the newest window, with the
+transactions of all of them.  It can be written out, or parsed like any
+other download (see :py:meth:`ofxclient.Account.statement_chunked`).
+
+Window boundaries are multiples of ``window_days`` counted from a fixed
+day (:py:data:`EPOCH`), not from today, so the windows of a backfill
+stay the same from one day to the next.  With a ``chunk_dir`` every
+closed window (one with a DTEND) is saved as soon as it is downloaded
+and a later run only fetches the windows that are missing, so an
+interrupted backfill picks up where it stopped.  The last window, which
+runs up to now, is always downloaded again.
+
+Example::
+
+  from ofxclient import chunked
+
+  data = chunked.download(account, days=5 * 365, window_days=90,
+                          chunk_dir='/tmp/backfill')
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+import datetime
+import logging
+import os
+import os.path
+import re
+import threading
+
+from ofxclient import sgml
+from ofxclient.util import write_atomic
+
+DEFAULT_WINDOW_DAYS = 90
+DEFAULT_OVERLAP_DAYS = 1
+DEFAULT_WORKERS = 4
+
+DATE_FORMAT = '%Y%m%d'
+
+# window boundaries are counted from here
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def windows(days, window_days=DEFAULT_WINDOW_DAYS,
+            overlap_days=DEFAULT_OVERLAP_DAYS, today=None):
+    """The (DTSTART, DTEND) date ranges covering the last ``days`` days,
+    oldest first
+
+    Windows start on multiples of ``window_days`` days after
+    :py:data:`EPOCH`, so the first one may reach up to ``window_days - 1``
+    days further back than asked, and a window does not move as the days
+    go by.  Each window but the last ends ``overlap_days`` after the next
+    one starts.  The last has no DTEND, so it reaches up to now like a
+    normal download.
+
+    :param days: Number of days to look back at
+    :type days: integer
+    :param window_days: days per window
+    :type window_days: integer
+    :param overlap_days: days each window overlaps the next one by
+    :type overlap_days: integer
+    :param today: the day to count back from (defaults to today)
+    :type today: :py:class:`datetime.date` or None
+    :return: 2-tuples of 'YYYYMMDD' strings (the last DTEND is None)
+    :rtype: list
+    """
+    if window_days < 1:
+        raise ValueError('window_days must be at least 1')
+    today = today or datetime.date.today()
+    start = today - datetime.timedelta(days=days)
+    start -= datetime.timedelta(
+        days=(start - EPOCH).days % window_days)
+    step = datetime.timedelta(days=window_days)
+    overlap = datetime.timedelta(days=overlap_days)
+    result = []
+    while start + step <= today:
+        result.append((start.strftime(DATE_FORMAT),
+                       (start + step + overlap).strftime(DATE_FORMAT)))
+        start += step
+    result.append((start.strftime(DATE_FORMAT), None))
+    return result
+
+
+def download(account, days=365, window_days=DEFAULT_WINDOW_DAYS,
+             overlap_days=DEFAULT_OVERLAP_DAYS, workers=DEFAULT_WORKERS,
+             chunk_dir=None):
+    """Download the last ``days`` days of an account window by window and
+    merge them into one response
+
+    :param account: account to download
+    :type account: :py:class:`ofxclient.Account`
+    :param days: Number of days to look back at
+    :type days: integer
+    :param window_days: days per request
+    :type window_days: integer
+    :param overlap_days: days each window overlaps the next one by
+    :type overlap_days: integer
+    :param workers: max number of windows downloaded at once
+    :type workers: integer
+    :param chunk_dir: directory to keep downloaded windows in, to resume
+      from (optional)
+    :type chunk_dir: string or None
+    :raises: the error of the first window that failed (ValueError if
+      the bank refused it or sent no transaction list), once the windows
+      already being downloaded are done (and saved); no new ones are
+      started after a failure
+    :rtype: bytes
+    """
+    ranges = windows(days, window_days=window_days,
+                     overlap_days=overlap_days)
+    return merge(download_windows(account, ranges, workers=workers,
+                                  chunk_dir=chunk_dir))
+
+
+def download_windows(account, ranges, workers=DEFAULT_WORKERS,
+                     chunk_dir=None):
+    """Download a statement for each (DTSTART, DTEND) range,
+    ``workers`` at a time
+
+    Closed windows (with a DTEND) already in ``chunk_dir`` are read from
+    there; new ones are saved to it.  The open window (no DTEND) still
+    changes, so it is never saved.  A window whose signon or statement
+    STATUS is not 0, or that has no transaction list, fails with a
+    ValueError rather than leaving a gap in the merged statement.
+
+    :rtype: list of bytes, in the order of ``ranges``
+    """
+    if chunk_dir and not os.path.isdir(chunk_dir):
+        os.makedirs(chunk_dir)
+    results = [None] * len(ranges)
+    errors = []
+    pending = list(range(len(ranges)))
+    lock = threading.Lock()
+
+    def fetch(idx):
+        dtstart, dtend = ranges[idx]
+        file_name = None
+        if chunk_dir and dtend:
+            file_name = os.path.join(chunk_dir, '%s-%s-%s.ofx' % (
+                account.local_id(), dtstart, dtend))
+            if os.path.exists(file_name):
+                with open(file_name, 'rb') as fp:
+                    return fp.read()
+        query = account._download_query(as_of=dtstart, dtend=dtend)
+        data = account._client().post_bytes(
+            query, cache_key=account._cache_key(dtstart, dtend))
+        error = _window_error(data)
+        if error is not None:
+            raise error
+        if file_name:
+            write_atomic(file_name, data)
+        return data
+
+    def worker():
+        while True:
+            with lock:
+                if not pending or errors:
+                    return
+                idx = pending.pop(0)
+            try:
+                results[idx] = fetch(idx)
+            except Exception as e:
+                logging.exception('window %s-%s of %s failed',
+                                  ranges[idx][0], ranges[idx][1] or 'now',
+                                  account.long_description())
+                with lock:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(max(1, min(workers, len(ranges))))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def merge(chunks):
+    """Merge statement responses for consecutive date ranges of one
+    account into one response
+
+    The result is the last (newest) response, so its balances and
+    positions are the current ones, with a transaction list that runs
+    from the earliest DTSTART to the latest DTEND and holds the
+    transactions of every response, each FITID only once.  Responses
+    without a transaction list add nothing; if the newest has none, the
+    newest one that has is used instead.
+
+    :param chunks: statement responses, oldest first
+    :type chunks: list of bytes
+    :rtype: bytes
+    """
+    lists = [(data, _TRANLIST.search(data)) for data in chunks]
+    lists = [(data, match) for data, match in lists if match is not None]
+    if len(lists) < 2:
+        return lists[-1][0] if lists else chunks[-1]
+
+    seen = set()
+    entries = []
+    dtstart = dtend = None
+    for data, match in lists:
+        body = match.group(2)
+        start = _value(body, b'DTSTART')
+        end = _value(body, b'DTEND')
+        if start and (dtstart is None or start < dtstart):
+            dtstart = start
+        if end and (dtend is None or end > dtend):
+            dtend = end
+        for entry in _entries(body):
+            text = entry.group(0)
+            key = _value(text, b'FITID') or text
+            if key not in seen:
+                seen.add(key)
+                entries.append(text)
+
+    last, match = lists[-1]
+    body = match.group(2)
+    first = next(_entries(body), None)
+    head = body[:first.start()] if first else body
+    if dtstart:
+        head = _DTSTART.sub(lambda m: m.group(1) + dtstart, head, 1)
+    if dtend:
+        head = _DTEND.sub(lambda m: m.group(1) + dtend, head, 1)
+    return b''.join([last[:match.start(2)], head, b''.join(entries),
+                     last[match.end(2):]])
+
+
+def _window_error(data):
+    """Why the response for a window is unusable, or None"""
+    signon, responses = sgml.statuses(data)
+    if signon is None:
+        return ValueError('no signon response')
+    if signon[0] != 0:
+        return ValueError('signon failed with code %s: %s' % signon)
+    for name, code, message in responses:
+        if code != 0:
+            return ValueError('%s failed with code %s: %s' % (
+                name, code, message))
+    if _TRANLIST.search(data) is None:
+        return ValueError('no transaction list')
+    return None
+
+
+def _entries(body):
+    """Matches of the aggregates directly inside a transaction list"""
+    for entry in _ENTRY.finditer(body):
+        if entry.group(1).upper() not in (b'DTSTART', b'DTEND'):
+            yield entry
+
+
+def _value(data, tag):
+    match = re.search(br'<' + tag + br'>\s*([^<\s]+)', data, re.I)
+    return match.group(1) if match else None
+
+
+_TRANLIST = re.compile(br'<(BANKTRANLIST|INVTRANLIST)>(.*?)</\1>', re.S | re.I)
+# an aggregate directly inside a transaction list (STMTTRN, BUYSTOCK, ...)
+_ENTRY = re.compile(br'<(\w+)>(?:(?!</?\1>).)*?</\1>\s*', re.S)
+_DTSTART = re.compile(br'(<DTSTART>\s*)[^<\s]+', re.I)
+_DTEND = re.compile(br'(<DTEND>\s*)[^<\s]+', re.I)
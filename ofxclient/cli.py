@@ -3,17 +3,17 @@ from __future__ import unicode_literals
 import argparse
 import getpass
 import io
+import json
 import logging
 import os
 import os.path
+import signal
 import sys
 
-from ofxhome import OFXHome
-
 from ofxclient.account import BankAccount, BrokerageAccount, CreditCardAccount
-from ofxclient.config import OfxConfig
+from ofxclient.config import OfxConfig, migrate
 from ofxclient.institution import Institution
-from ofxclient.util import combined_download
+from ofxclient.util import combined_download_to
 from ofxclient.client import DEFAULT_OFX_VERSION
 
 AUTO_OPEN_DOWNLOADS = 1
@@ -25,13 +25,21 @@ GlobalConfig = None
 def run():
     global GlobalConfig
 
-    parser = argparse.ArgumentParser(prog='ofxclient')
+    if sys.argv[1:2] == ['daemon']:
+        return run_daemon(sys.argv[2:])
+    if sys.argv[1:2] == ['sync']:
+        return run_sync(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(prog='ofxclient', epilog='see also: ofxclient sync --help, ofxclient daemon --help')
     parser.add_argument('-a', '--account')
     parser.add_argument('-d', '--download', type=argparse.FileType('wb', 0))
     parser.add_argument('-o', '--open', action='store_true')
     parser.add_argument('-v', '--verbose', action='store_true')
     parser.add_argument('-c', '--config', help='config file path')
     parser.add_argument('--download-days', default=DOWNLOAD_DAYS, type=int, help='number of days to download (default: %s)' % DOWNLOAD_DAYS)
+    parser.add_argument('-j', '--jobs', default=1, type=int, help='number of accounts to download in parallel (default: 1)')
+    parser.add_argument('--jobs-per-institution', type=int, help='max parallel downloads per institution (default: no limit)')
+    parser.add_argument('--migrate-to', metavar='FILE', help='copy the configured accounts to another config file (ending in .db for SQLite) and exit')
     parser.add_argument('--ofx-version', default=DEFAULT_OFX_VERSION, type=int, help='ofx version to use for new accounts (default: %s)' % DEFAULT_OFX_VERSION)
     args = parser.parse_args()
 
@@ -40,6 +48,11 @@ def run():
     else:
         GlobalConfig = OfxConfig()
 
+    if args.migrate_to:
+        count = migrate(GlobalConfig, args.migrate_to)
+        print("copied %d accounts to %s" % (count, args.migrate_to))
+        sys.exit(0)
+
     accounts = GlobalConfig.accounts()
     account_ids = [a.local_id() for a in accounts]
 
@@ -50,10 +63,15 @@ def run():
         if accounts:
             if args.account:
                 a = GlobalConfig.account(args.account)
-                ofxdata = a.download(days=args.download_days)
+                args.download.write(a.download_bytes(days=args.download_days))
             else:
-                ofxdata = combined_download(accounts, days=args.download_days)
-            args.download.write(ofxdata.read().encode())
+                combined_download_to(
+                    args.download,
+                    accounts,
+                    days=args.download_days,
+                    workers=args.jobs,
+                    per_institution=args.jobs_per_institution
+                )
             if args.open:
                 open_with_ofx_handler(args.download.name)
             sys.exit(0)
@@ -63,6 +81,99 @@ def run():
     main_menu(args)
 
 
+def run_sync(argv):
+    from ofxclient import sync
+
+    parser = argparse.ArgumentParser(prog='ofxclient sync', description='download accounts in parallel, each to its own file, and summarize the run as JSON')
+    parser.add_argument('--output-dir', required=True, help='directory to write downloads to')
+    parser.add_argument('-c', '--config', help='config file path')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    parser.add_argument('-a', '--account', action='append', metavar='ID', help='only this account local id (repeatable)')
+    parser.add_argument('-i', '--institution', action='append', help='only accounts of this institution: local id, FI id, org or description (repeatable)')
+    parser.add_argument('-t', '--type', action='append', choices=sorted(sync.ACCOUNT_TYPES), help='only accounts of this type (repeatable)')
+    parser.add_argument('--download-days', default=DOWNLOAD_DAYS, type=int, help='number of days to download (default: %s)' % DOWNLOAD_DAYS)
+    parser.add_argument('-j', '--jobs', default=4, type=int, help='number of accounts to download in parallel (default: 4)')
+    parser.add_argument('--jobs-per-institution', type=int, help='max parallel downloads per institution (default: no limit)')
+    parser.add_argument('--summary', help='where to write the JSON summary, - for stdout (default: OUTPUT_DIR/summary.json)')
+    args = parser.parse_args(argv)
+
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    config = OfxConfig(file_name=args.config) if args.config else OfxConfig()
+    accounts = sync.select_accounts(
+        config.accounts(),
+        ids=args.account,
+        institutions=args.institution,
+        types=args.type
+    )
+    if not accounts:
+        print("no accounts match")
+        sys.exit(1)
+
+    summary = sync.sync_accounts(
+        accounts,
+        args.output_dir,
+        days=args.download_days,
+        workers=args.jobs,
+        per_institution=args.jobs_per_institution
+    )
+    text = json.dumps(summary, indent=2, sort_keys=True)
+    if args.summary == '-':
+        print(text)
+    else:
+        summary_file = args.summary or os.path.join(args.output_dir, 'summary.json')
+        with io.open(summary_file, 'w', encoding='utf-8') as fp:
+            fp.write(text)
+        print("%d of %d accounts synced in %.1fs; summary: %s" % (
+            summary['succeeded'], len(accounts), summary['seconds'],
+            summary_file))
+    sys.exit(1 if summary['failed'] else 0)
+
+
+def run_daemon(argv):
+    from ofxclient import daemon
+
+    parser = argparse.ArgumentParser(prog='ofxclient daemon', description='keep running and download every account on a schedule')
+    parser.add_argument('--output-dir', required=True, help='directory to write downloads to')
+    parser.add_argument('-c', '--config', help='config file path')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    parser.add_argument('--interval', default=daemon.DEFAULT_INTERVAL, type=float, help='seconds between syncs of an account (default: %s)' % daemon.DEFAULT_INTERVAL)
+    parser.add_argument('--account-interval', action='append', default=[], metavar='ID=SECONDS', help='seconds between syncs of one account (repeatable)')
+    parser.add_argument('--jitter', default=daemon.DEFAULT_JITTER, type=float, help='randomize intervals by up to this fraction (default: %s)' % daemon.DEFAULT_JITTER)
+    parser.add_argument('--stagger', default=daemon.DEFAULT_STAGGER, type=float, help='seconds to spread the first syncs of the institutions over (default: %s)' % daemon.DEFAULT_STAGGER)
+    parser.add_argument('--download-days', default=DOWNLOAD_DAYS, type=int, help='number of days to download (default: %s)' % DOWNLOAD_DAYS)
+    parser.add_argument('-j', '--jobs', default=4, type=int, help='number of accounts to download in parallel (default: 4)')
+    parser.add_argument('--jobs-per-institution', type=int, help='max parallel downloads per institution (default: no limit)')
+    args = parser.parse_args(argv)
+
+    intervals = {}
+    for item in args.account_interval:
+        local_id, _, seconds = item.partition('=')
+        try:
+            intervals[local_id] = float(seconds)
+        except ValueError:
+            parser.error('bad --account-interval: %s' % item)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    config = OfxConfig(file_name=args.config) if args.config else OfxConfig()
+    d = daemon.SyncDaemon(
+        config,
+        args.output_dir,
+        interval=args.interval,
+        intervals=intervals,
+        jitter=args.jitter,
+        stagger=args.stagger,
+        days=args.download_days,
+        workers=args.jobs,
+        per_institution=args.jobs_per_institution
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: d.stop())
+    try:
+        d.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
 def main_menu(args):
     while 1:
         menu_title("Main\nEdit %s to\nchange descriptions or ofx options" %
@@ -85,12 +196,18 @@ def main_menu(args):
             if not accounts:
                 print("no accounts on file")
             else:
-                ofxdata = combined_download(accounts, days=args.download_days)
-                wrote = write_and_handle_download(
-                    ofxdata,
-                    'combined_download.ofx'
-                )
-                print("wrote: %s" % wrote)
+                name = 'combined_download.ofx'
+                with io.open(name, 'wb') as outfile:
+                    combined_download_to(
+                        outfile,
+                        accounts,
+                        days=args.download_days,
+                        workers=args.jobs,
+                        per_institution=args.jobs_per_institution
+                    )
+                if AUTO_OPEN_DOWNLOADS:
+                    open_with_ofx_handler(name)
+                print("wrote: %s" % os.path.abspath(name))
         elif choice in ['q', '']:
             return
         elif int(choice) < len(accounts):
@@ -99,6 +216,9 @@ def main_menu(args):
 
 
 def add_account_menu(args):
+    # imported here so that starting the cli does not pay for it
+    from ofxhome import OFXHome
+
     menu_title("Add account")
     while 1:
         print('------')
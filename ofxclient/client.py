@@ -1,12 +1,10 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
-try:
-    # python 3
-    from http.client import HTTPSConnection
-except ImportError:
-    # python 2
-    from httplib import HTTPSConnection
+from __future__ import with_statement
+import copy
 import logging
+import re
+import threading
 import time
 try:
     # python 3
@@ -16,6 +14,14 @@ except ImportError:
     from urllib import splittype, splithost
 import uuid
 
+from ofxclient import cache
+from ofxclient import ratelimit
+from ofxclient import retry
+from ofxclient import sgml
+from ofxclient import timing
+from ofxclient.pool import DEFAULT_POOL
+from ofxclient.transport import HTTPSTransport
+
 DEFAULT_APP_ID = 'QWIN'
 DEFAULT_APP_VERSION = '2500'
 DEFAULT_OFX_VERSION = '102'
@@ -24,6 +30,9 @@ DEFAULT_ACCEPT = '*/*, application/x-ofx'
 
 LINE_ENDING = "\r\n"
 
+# statement message sets, in the order they must appear in a request
+MESSAGE_SET_ORDER = ['BANK', 'CREDITCARD', 'INVSTMT']
+
 
 def ofx_uid():
     return str(uuid.uuid4().hex)
@@ -48,6 +57,40 @@ class Client:
     :param accept: Value to send for Accept HTTP header. Leave as
       None to send default. Set to False to not send User-Agent header.
     :type accept: str, None or False
+    :param connection_pool: pool to borrow HTTPS connections from. Leave as
+      None to share the process-wide :py:data:`ofxclient.pool.DEFAULT_POOL`.
+    :type connection_pool: :py:class:`ofxclient.pool.ConnectionPool` or None
+    :param response_cache: cache for responses posted with a ``cache_key``.
+      Leave as None to use :py:data:`ofxclient.cache.DEFAULT_CACHE` (which
+      is off unless set).
+    :type response_cache: :py:class:`ofxclient.cache.ResponseCache` or None
+    :param transport: what sends requests to the bank. Leave as None to
+      use HTTPS; a :py:class:`ofxclient.transport.ReplayTransport` serves
+      recorded responses instead.
+    :type transport: :py:class:`ofxclient.transport.Transport` or None
+    :param hooks: callables to pass a
+      :py:class:`ofxclient.timing.RequestTiming` for every request
+    :type hooks: list or None
+    :param retry_policy: which failed requests to retry and how. Leave as
+      None to use :py:data:`ofxclient.retry.DEFAULT_POLICY`.
+    :type retry_policy: :py:class:`ofxclient.retry.RetryPolicy` or None
+    :param circuit_breaker: breaker that stops requests while the bank is
+      down. Leave as None to share one per institution url (see
+      :py:func:`ofxclient.retry.breaker_for`).
+    :type circuit_breaker: :py:class:`ofxclient.retry.CircuitBreaker` or
+      None
+    :param rate_limit: max requests per second to the bank's host, shared
+      by every client (see :py:mod:`ofxclient.ratelimit`)
+    :type rate_limit: float, string or None
+    :param rate_burst: requests that may go out at once within
+      ``rate_limit``
+    :type rate_burst: float, string or None
+    :param max_concurrent: max requests in flight to the bank's host,
+      shared by every client
+    :type max_concurrent: integer, string or None
+    :param reuse_session: send back the cookies and signon tokens the
+      institution handed out before (see :py:mod:`ofxclient.session`)
+    :type reuse_session: boolean or string
     """
 
     def __init__(
@@ -58,7 +101,17 @@ class Client:
         app_version=DEFAULT_APP_VERSION,
         ofx_version=DEFAULT_OFX_VERSION,
         user_agent=DEFAULT_USER_AGENT,
-        accept=DEFAULT_ACCEPT
+        accept=DEFAULT_ACCEPT,
+        connection_pool=None,
+        response_cache=None,
+        transport=None,
+        hooks=None,
+        retry_policy=None,
+        circuit_breaker=None,
+        rate_limit=None,
+        rate_burst=None,
+        max_concurrent=None,
+        reuse_session=True
     ):
         self.institution = institution
         self.id = id
@@ -67,6 +120,12 @@ class Client:
         self.ofx_version = ofx_version
         self.user_agent = user_agent
         self.accept = accept
+        self.connection_pool = connection_pool or DEFAULT_POOL
+        self.response_cache = response_cache or cache.DEFAULT_CACHE
+        self.transport = transport
+        self.hooks = list(hooks or [])
+        self.retry_policy = retry_policy or retry.DEFAULT_POLICY
+        self.circuit_breaker = circuit_breaker
         # used when serializing Institutions
         self._init_args = {
             'id': self.id,
@@ -76,7 +135,22 @@ class Client:
             'user_agent': self.user_agent,
             'accept': self.accept
         }
+        # limits come from config files as strings
+        self.rate_limit = float(rate_limit) if rate_limit else None
+        self.rate_burst = float(rate_burst) if rate_burst else None
+        self.max_concurrent = int(max_concurrent) if max_concurrent else None
+        for name in ('rate_limit', 'rate_burst', 'max_concurrent'):
+            if getattr(self, name) is not None:
+                self._init_args[name] = getattr(self, name)
+        # also from config files as a string
+        self.reuse_session = '%s' % reuse_session not in ('False', 'false',
+                                                          '0', '')
+        if not self.reuse_session:
+            self._init_args['reuse_session'] = False
         self.cookie = 3
+        # one client is shared by the accounts of an institution, possibly
+        # across threads
+        self._cookie_lock = threading.Lock()
 
     @property
     def init_args(self):
@@ -102,43 +176,253 @@ class Client:
         """
         u = username or self.institution.username
         p = password or self.institution.password
+        # credentials given explicitly are being tested, so they get a
+        # full signon
+        session = self.session() if not (username or password) else None
 
-        contents = ['OFX', self._signOn(username=u, password=p)]
+        contents = ['OFX', self._signOn(username=u, password=p,
+                                        session=session)]
         if with_message:
             contents.append(with_message)
         return LINE_ENDING.join([self.header(), _tag(*contents)])
 
-    def bank_account_query(self, number, date, account_type, bank_id):
-        """Bank account statement request"""
+    def bank_account_query(self, number, date, account_type, bank_id,
+                           dtend=None):
+        """Bank account statement request
+
+        Statement requests cover transactions from ``date`` until
+        ``dtend``, or until now if it is None.
+        """
         return self.authenticated_query(
-            self._bareq(number, date, account_type, bank_id)
+            self._bareq(number, date, account_type, bank_id, dtend)
         )
 
-    def credit_card_account_query(self, number, date):
+    def credit_card_account_query(self, number, date, dtend=None):
         """CC Statement request"""
-        return self.authenticated_query(self._ccreq(number, date))
+        return self.authenticated_query(self._ccreq(number, date, dtend))
 
-    def brokerage_account_query(self, number, date, broker_id):
+    def brokerage_account_query(self, number, date, broker_id, dtend=None):
         return self.authenticated_query(
-            self._invstreq(broker_id, number, date))
+            self._invstreq(broker_id, number, date, dtend))
 
     def account_list_query(self, date='19700101000000'):
         return self.authenticated_query(self._acctreq(date))
 
-    def post(self, query):
+    def statements_query(self, requests):
+        """Several statement requests sent with a single signon
+
+        Requests for the same message set share one ``*MSGSRQV1``
+        aggregate, each in its own transaction with a fresh TRNUID.
+
+        :param requests: (message set, transaction type, request)
+          3-tuples, e.g. ``('BANK', 'STMT', client._bastmtrq(...))``
+        :type requests: list
+        :return: 2-tuple of (query, list of TRNUIDs in the same order as
+          ``requests``)
+        :rtype: tuple
+        """
+        unknown = set(r[0] for r in requests) - set(MESSAGE_SET_ORDER)
+        if unknown:
+            raise ValueError("unknown message set: %s" % ', '.join(unknown))
+        trnuids = [ofx_uid() for _ in requests]
+        msgsets = []
+        # message sets have to appear in the order the OFX spec defines
+        for msgType in MESSAGE_SET_ORDER:
+            transactions = [
+                self._transaction(trnType, request, trnuid)
+                for (m, trnType, request), trnuid in zip(requests, trnuids)
+                if m == msgType
+            ]
+            if transactions:
+                msgsets.append(_tag(msgType+"MSGSRQV1", *transactions))
+        return self.authenticated_query(LINE_ENDING.join(msgsets)), trnuids
+
+    def post(self, query, cache_key=None):
+        """
+        POST a query and return the response as text, decoded with the
+        character set declared in its OFX header.
+
+        :param cache_key: see :py:meth:`post_bytes`
+        :rtype: str
+        """
+        return sgml.decode(self.post_bytes(query, cache_key=cache_key))
+
+    def post_bytes(self, query, cache_key=None):
         """
         Wrapper around ``_do_post()`` to handle accounts that require
         sending back session cookies (``self.set_cookies`` True).
+
+        If a ``response_cache`` is set and a ``cache_key`` is given, a
+        cached response for the key is returned instead of posting, and
+        a fresh response is stored under it.
+
+        A query that signed on with session tokens the institution then
+        refuses is sent again with a full signon.
+
+        :param query: OFX query
+        :type query: str
+        :param cache_key: what is being asked for, e.g. (institution,
+          account, query kind, start date); the query itself is different
+          every time so it cannot be the key
+        :type cache_key: tuple or None
+        :return: the raw response body
+        :rtype: bytes
         """
-        res, response = self._do_post(query)
-        cookies = res.getheader('Set-Cookie', None)
-        if len(response) == 0 and cookies is not None and res.status == 200:
-            logging.debug('Got 0-length 200 response with Set-Cookies header; '
-                          'retrying request with cookies')
-            _, response = self._do_post(query, [('Cookie', cookies)])
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+        response = self._post_bytes(query)
+        again = self._session_retry(query, response)
+        if again is not None:
+            response = self._post_bytes(again)
+            self._session_retry(again, response)
+        self._cache(cache_key, response)
         return response
 
-    def _do_post(self, query, extra_headers=[]):
+    def _cached(self, cache_key):
+        """The cached response for ``cache_key``, or None"""
+        if self.response_cache is None or cache_key is None:
+            return None
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            logging.debug('using cached response for %s', cache_key)
+        return cached
+
+    def _cache(self, cache_key, response):
+        if self.response_cache is not None and cache_key is not None:
+            self.response_cache.set(cache_key, response)
+
+    def session(self):
+        """The cookies and signon tokens requests reuse: the
+        institution's, unless ``reuse_session`` is off
+
+        :rtype: :py:class:`ofxclient.session.Session` or None
+        """
+        if not self.reuse_session:
+            return None
+        return getattr(self.institution, 'session', None)
+
+    def _session_retry(self, query, response):
+        """Keep the signon tokens of ``response``; if ``query`` signed on
+        with saved ones and the institution refused them, the query to
+        send instead, with a full signon
+
+        :rtype: str or None
+        """
+        session = self.session()
+        if session is None:
+            return None
+        # a user key is only good for the user it was handed out to
+        userid = _USERID.search(query)
+        username = userid.group(1) if userid else self.institution.username
+        status = session.update(response, username)
+        if _SESSION_FIELDS.search(query) is None or \
+                (status is not None and status[0] == 0):
+            return None
+        logging.info('%s refused the saved session; signing on again',
+                     self.institution.url)
+        signon = self._signOn()
+        return _SIGNON.sub(lambda m: signon, query, 1)
+
+    def _post_bytes(self, query):
+        """Post, retrying failures as ``retry_policy`` says, unless the
+        circuit breaker is open
+
+        After the last attempt a retryable response (like a 503) is
+        returned as is; a retryable exception is raised.
+        """
+        attempts = retry.Attempts(self.retry_policy, self.breaker(),
+                                  self.institution.url)
+        while True:
+            attempts.check()
+            try:
+                status, response = self._post_once(query, attempts.number)
+            except Exception as e:
+                delay = attempts.error(e)
+                if delay is None:
+                    raise
+            except BaseException:
+                attempts.cancelled()
+                raise
+            else:
+                delay = attempts.response(status, response)
+                if delay is None:
+                    return response
+            time.sleep(delay)
+
+    def breaker(self):
+        """The circuit breaker requests go through
+
+        :rtype: :py:class:`ofxclient.retry.CircuitBreaker`
+        """
+        return self.circuit_breaker or \
+            retry.breaker_for(self.institution.url)
+
+    def _post_once(self, query, attempt=1):
+        """Post once (twice if the bank wants its session cookie back)
+
+        :return: 2-tuple of (HTTP status, bytes response body)
+        :rtype: tuple
+        """
+        url = self.institution.url
+        request_timing = timing.RequestTiming(url, timing.host(url))
+        request_timing.attempt = attempt
+        try:
+            res, response = self._do_post(query, self._cookie_headers(),
+                                          timing=request_timing)
+            cookies = self._cookie_retry(res, response, request_timing)
+            if cookies is not None:
+                res, response = self._do_post(
+                    query, self._cookie_headers(cookies),
+                    timing=request_timing)
+                self._keep_cookies(res)
+        except Exception as e:
+            self._emit(request_timing.finish(error=e))
+            raise
+        self._emit(request_timing.finish())
+        return res.status, response
+
+    def _cookie_retry(self, res, response, request_timing):
+        """Keep the cookies ``res`` sets; if the bank answered with an
+        empty 200 that sets cookies, the ``Set-Cookie`` header to send the
+        request again with
+
+        :rtype: string or None
+        """
+        cookies = self._keep_cookies(res)
+        if len(response) == 0 and cookies is not None and res.status == 200:
+            logging.debug('Got 0-length 200 response with Set-Cookies '
+                          'header; retrying request with cookies')
+            request_timing.cookie_retry = True
+            return cookies
+        return None
+
+    def _cookie_headers(self, cookies=None):
+        """The ``Cookie`` header to send: the session's cookies, else
+        ``cookies`` (the raw ``Set-Cookie`` of the last response)
+
+        :rtype: list of (Name, Value) header 2-tuples
+        """
+        session = self.session()
+        header = session.cookie_header() if session is not None else None
+        header = header or cookies
+        return [('Cookie', header)] if header else []
+
+    def _keep_cookies(self, res):
+        """Save the cookies ``res`` sets in the session
+
+        :return: the raw ``Set-Cookie`` header, or None
+        :rtype: string or None
+        """
+        cookies = res.getheader('Set-Cookie', None)
+        session = self.session()
+        if session is not None and cookies is not None:
+            # one header per cookie; joined up they cannot be told apart
+            session.set_cookies([v for k, v in res.getheaders()
+                                 if k.lower() == 'set-cookie'])
+        return cookies
+
+    def _do_post(self, query, extra_headers=[], timing=None):
         """
         Do a POST to the Institution.
 
@@ -147,18 +431,86 @@ class Client:
         :param extra_headers: Extra headers to send with the request, as a list
           of (Name, Value) header 2-tuples.
         :type extra_headers: list
-        :return: 2-tuple of (HTTPResponse, str response body)
+        :param timing: where to record how long the request took
+        :type timing: :py:class:`ofxclient.timing.RequestTiming` or None
+        :return: 2-tuple of (HTTPResponse, bytes response body)
         :rtype: tuple
         """
         i = self.institution
         logging.debug('posting data to %s' % i.url)
         garbage, path = splittype(i.url)
         host, selector = splithost(path)
-        h = HTTPSConnection(host, timeout=60)
-        # Discover requires a particular ordering of headers, so send the
-        # request step by step.
-        h.putrequest('POST', selector, skip_host=True,
-                     skip_accept_encoding=True)
+        headers = self._request_headers(host, query, extra_headers)
+        body = query.encode()
+        limiter = self.rate_limiter(host)
+        if limiter is None:
+            res, response = self.http_transport().post(i.url, headers, body,
+                                                       timing=timing)
+        else:
+            with limiter:
+                res, response = self.http_transport().post(
+                    i.url, headers, body, timing=timing)
+        if timing is not None:
+            timing.status = res.status
+            timing.bytes_sent += len(body)
+            timing.bytes_received += len(response)
+        return res, response
+
+    def add_hook(self, hook):
+        """Call ``hook`` with a :py:class:`ofxclient.timing.RequestTiming`
+        for every request
+
+        :param hook: callable taking one timing
+        """
+        self.hooks.append(hook)
+        return self
+
+    def with_hooks(self, hooks):
+        """A copy of this client that also reports to ``hooks``
+
+        The copy shares everything else (transport, connection pool,
+        breaker), so it is cheap; the client an institution shares among
+        its accounts is left as it is.
+
+        :param hooks: callables taking one timing
+        :type hooks: list
+        :rtype: :py:class:`Client`
+        """
+        if not hooks:
+            return self
+        client = copy.copy(self)
+        client.hooks = self.hooks + list(hooks)
+        return client
+
+    def _emit(self, event):
+        timing.emit(event, self.hooks)
+
+    def rate_limiter(self, host):
+        """The shared limiter for ``host``, or None if this client has no
+        limits
+
+        :rtype: :py:class:`ofxclient.ratelimit.RateLimiter` or None
+        """
+        if not (self.rate_limit or self.max_concurrent):
+            return None
+        return ratelimit.limiter_for(host, rate=self.rate_limit,
+                                     burst=self.rate_burst,
+                                     max_concurrent=self.max_concurrent)
+
+    def http_transport(self):
+        """The transport requests are sent with: ``transport`` if one was
+        given, else HTTPS over ``connection_pool``
+
+        :rtype: :py:class:`ofxclient.transport.Transport`
+        """
+        return self.transport or HTTPSTransport(self.connection_pool)
+
+    def _request_headers(self, host, query, extra_headers=[]):
+        """Headers to send with a POST, in the order they must be sent.
+
+        :return: list of (Name, Value) header 2-tuples
+        :rtype: list
+        """
         headers = [
             ('Content-Type', 'application/x-ofx'),
             ('Host', host),
@@ -171,25 +523,12 @@ class Client:
             headers.append(('User-Agent', self.user_agent))
         for ehname, ehval in extra_headers:
             headers.append((ehname, ehval))
-        logging.debug('---- request headers ----')
-        for hname, hval in headers:
-            logging.debug('%s: %s', hname, hval)
-            h.putheader(hname, hval)
-        logging.debug('---- request body (query) ----')
-        logging.debug(query)
-        h.endheaders(query.encode())
-        res = h.getresponse()
-        response = res.read().decode('ascii', 'ignore')
-        logging.debug('---- response ----')
-        logging.debug(res.__dict__)
-        logging.debug('Headers: %s', res.getheaders())
-        logging.debug(response)
-        res.close()
-        return res, response
+        return headers
 
     def next_cookie(self):
-        self.cookie += 1
-        return str(self.cookie)
+        with self._cookie_lock:
+            self.cookie += 1
+            return str(self.cookie)
 
     def header(self):
         parts = [
@@ -207,75 +546,95 @@ class Client:
         return LINE_ENDING.join(parts)
 
     """Generate signon message"""
-    def _signOn(self, username=None, password=None):
+    def _signOn(self, username=None, password=None, session=None):
         i = self.institution
         u = username or i.username
         p = password or i.password
+        # what the institution handed out at the last signon, in the
+        # places the OFX spec gives them
+        tokens = session.signon_fields(u) if session is not None else {}
+        if 'USERKEY' in tokens:
+            sonrq = [_field("DTCLIENT", now()),
+                     _field("USERKEY", tokens['USERKEY'])]
+        else:
+            sonrq = [_field("DTCLIENT", now()),
+                     _field("USERID", u),
+                     _field("USERPASS", p)]
         fidata = [_field("ORG", i.org)]
         if i.id:
             fidata.append(_field("FID", i.id))
+        sonrq += [_field("LANGUAGE", "ENG"), _tag("FI", *fidata)]
+        if 'SESSCOOKIE' in tokens:
+            sonrq.append(_field("SESSCOOKIE", tokens['SESSCOOKIE']))
 
         client_uid = ''
         if str(self.ofx_version) == '103':
             client_uid = _field('CLIENTUID', self.id)
 
         return _tag("SIGNONMSGSRQV1",
-                    _tag("SONRQ",
-                         _field("DTCLIENT", now()),
-                         _field("USERID", u),
-                         _field("USERPASS", p),
-                         _field("LANGUAGE", "ENG"),
-                         _tag("FI", *fidata),
+                    _tag("SONRQ", *(sonrq + [
                          _field("APPID", self.app_id),
                          _field("APPVER", self.app_version),
                          client_uid
-                         ))
+                         ])))
 
     def _acctreq(self, dtstart):
         req = _tag("ACCTINFORQ", _field("DTACCTUP", dtstart))
         return self._message("SIGNUP", "ACCTINFO", req)
 
 # this is from _ccreq below and reading page 176 of the latest OFX doc.
-    def _bareq(self, acctid, dtstart, accttype, bankid):
-        req = _tag("STMTRQ",
-                   _tag("BANKACCTFROM",
-                        _field("BANKID", bankid),
-                        _field("ACCTID", acctid),
-                        _field("ACCTTYPE", accttype)),
-                   _tag("INCTRAN",
-                        _field("DTSTART", dtstart),
-                        _field("INCLUDE", "Y")))
+    def _bareq(self, acctid, dtstart, accttype, bankid, dtend=None):
+        req = self._bastmtrq(acctid, dtstart, accttype, bankid, dtend)
         return self._message("BANK", "STMT", req)
 
-    def _ccreq(self, acctid, dtstart):
-        req = _tag("CCSTMTRQ",
-                   _tag("CCACCTFROM", _field("ACCTID", acctid)),
-                   _tag("INCTRAN",
-                        _field("DTSTART", dtstart),
-                        _field("INCLUDE", "Y")))
+    def _ccreq(self, acctid, dtstart, dtend=None):
+        req = self._ccstmtrq(acctid, dtstart, dtend)
         return self._message("CREDITCARD", "CCSTMT", req)
 
-    def _invstreq(self, brokerid, acctid, dtstart):
-        req = _tag("INVSTMTRQ",
-                   _tag("INVACCTFROM",
-                        _field("BROKERID", brokerid),
-                        _field("ACCTID", acctid)),
-                   _tag("INCTRAN",
-                        _field("DTSTART", dtstart),
-                        _field("INCLUDE", "Y")),
-                   _field("INCOO", "Y"),
-                   _tag("INCPOS",
-                        _field("DTASOF", now()),
-                        _field("INCLUDE", "Y")),
-                   _field("INCBAL", "Y"))
+    def _invstreq(self, brokerid, acctid, dtstart, dtend=None):
+        req = self._invstmtrq(brokerid, acctid, dtstart, dtend)
         return self._message("INVSTMT", "INVSTMT", req)
 
+    def _bastmtrq(self, acctid, dtstart, accttype, bankid, dtend=None):
+        return _tag("STMTRQ",
+                    _tag("BANKACCTFROM",
+                         _field("BANKID", bankid),
+                         _field("ACCTID", acctid),
+                         _field("ACCTTYPE", accttype)),
+                    _inctran(dtstart, dtend))
+
+    def _ccstmtrq(self, acctid, dtstart, dtend=None):
+        return _tag("CCSTMTRQ",
+                    _tag("CCACCTFROM", _field("ACCTID", acctid)),
+                    _inctran(dtstart, dtend))
+
+    def _invstmtrq(self, brokerid, acctid, dtstart, dtend=None):
+        return _tag("INVSTMTRQ",
+                    _tag("INVACCTFROM",
+                         _field("BROKERID", brokerid),
+                         _field("ACCTID", acctid)),
+                    _inctran(dtstart, dtend),
+                    _field("INCOO", "Y"),
+                    _tag("INCPOS",
+                         _field("DTASOF", now()),
+                         _field("INCLUDE", "Y")),
+                    _field("INCBAL", "Y"))
+
     def _message(self, msgType, trnType, request):
         return _tag(msgType+"MSGSRQV1",
-                    _tag(trnType+"TRNRQ",
-                         _field("TRNUID", ofx_uid()),
-                         _field("CLTCOOKIE", self.next_cookie()),
-                         request))
+                    self._transaction(trnType, request))
+
+    def _transaction(self, trnType, request, trnuid=None):
+        return _tag(trnType+"TRNRQ",
+                    _field("TRNUID", trnuid or ofx_uid()),
+                    _field("CLTCOOKIE", self.next_cookie()),
+                    request)
+
+
+# signon elements that only a reused session puts in a request
+_SESSION_FIELDS = re.compile(r'<(USERKEY|SESSCOOKIE)>')
+_USERID = re.compile(r'<USERID>([^<\r\n]*)')
+_SIGNON = re.compile(r'<SIGNONMSGSRQV1>.*?</SIGNONMSGSRQV1>', re.S)
 
 
 def _field(tag, value):
@@ -286,5 +645,13 @@ def _tag(tag, *contents):
     return LINE_ENDING.join(['<'+tag+'>']+list(contents)+['</'+tag+'>'])
 
 
+def _inctran(dtstart, dtend=None):
+    fields = [_field("DTSTART", dtstart)]
+    if dtend:
+        fields.append(_field("DTEND", dtend))
+    fields.append(_field("INCLUDE", "Y"))
+    return _tag("INCTRAN", *fields)
+
+
 def now():
     return time.strftime("%Y%m%d%H%M%S", time.localtime())
@@ -7,18 +7,14 @@ try:
 except ImportError:
     # python 2
     from ConfigParser import ConfigParser
-try:
-    import keyring
-    keyring.get_password('is-backend', 'configured?')
-    KEYRING_AVAILABLE = True
-except RuntimeError:
-    # no keyring backend found
-    KEYRING_AVAILABLE = False
-except ImportError:
-    KEYRING_AVAILABLE = False
+from collections import OrderedDict
+import copy
+import json
 import os
 import os.path
+import sqlite3
 import sys
+import threading
 
 from ofxclient.account import Account
 
@@ -27,6 +23,71 @@ try:
 except:
     DEFAULT_CONFIG = None
 
+# the keyring module, imported on first use: importing it and asking it for
+# a backend can be slow (D-Bus, disk) and most imports of ofxclient never
+# touch a secret
+keyring = None
+_keyring_available = None
+_keyring_lock = threading.Lock()
+
+
+def keyring_available():
+    """Is there a usable keyring backend?
+
+    The keyring is probed the first time this is called, not when
+    ofxclient is imported.  This replaces the ``KEYRING_AVAILABLE``
+    module attribute, which is deprecated.
+
+    :rtype: boolean
+    """
+    global _keyring_available
+    with _keyring_lock:
+        if _keyring_available is None:
+            try:
+                _keyring().get_password('is-backend', 'configured?')
+                _keyring_available = True
+            except RuntimeError:
+                # no keyring backend found
+                _keyring_available = False
+            except ImportError:
+                _keyring_available = False
+        return _keyring_available
+
+
+def _keyring():
+    global keyring
+    if keyring is None:
+        import keyring as module
+        keyring = module
+    return keyring
+
+
+class _KeyringAvailable(object):
+    """Deprecated stand-in for the old ``KEYRING_AVAILABLE`` boolean: it
+    is true or false (and equal to True or False) as
+    :py:func:`keyring_available` says, asked only when it is tested"""
+
+    def __bool__(self):
+        return keyring_available()
+
+    # python 2
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        return keyring_available() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(keyring_available())
+
+    def __repr__(self):
+        return repr(keyring_available())
+
+
+KEYRING_AVAILABLE = _KeyringAvailable()
+
 
 class SecurableConfigParser(ConfigParser):
     """:py:class:`ConfigParser` subclass that knows how to store
@@ -38,6 +99,11 @@ class SecurableConfigParser(ConfigParser):
     option and from then on it will be seen as secure
     and will be stored / retrieved from the keychain.
 
+    Secrets read from the keychain are cached in memory, so each one is
+    only fetched once; 'set_secure', 'remove_option' and 'write' keep the
+    cache up to date, and 'clear_secret_cache' empties it.  Pass
+    cache_secrets=False to always ask the keychain.
+
     Example::
 
       from ofxclient.config import SecurableConfigParser
@@ -55,7 +121,8 @@ class SecurableConfigParser(ConfigParser):
     _secure_placeholder = '%{secured}'
 
     def __init__(self, keyring_name='ofxclient',
-                 keyring_available=KEYRING_AVAILABLE, **kwargs):
+                 keyring_available=None, cache_secrets=True,
+                 **kwargs):
         if sys.version_info >= (3,):
             # python 3
             ConfigParser.__init__(self, interpolation=None)
@@ -63,10 +130,24 @@ class SecurableConfigParser(ConfigParser):
             # python 2
             ConfigParser.__init__(self)
         self.keyring_name = keyring_name
-        self.keyring_available = keyring_available
+        # None: probe the keyring the first time it matters
+        self._keyring_available = keyring_available
+        self.cache_secrets = cache_secrets
         self._unsaved = {}
+        self._secrets = {}
+        self._secrets_lock = threading.Lock()
         self.keyring_name = keyring_name
 
+    @property
+    def keyring_available(self):
+        if self._keyring_available is None:
+            self._keyring_available = keyring_available()
+        return self._keyring_available
+
+    @keyring_available.setter
+    def keyring_available(self, value):
+        self._keyring_available = value
+
     def is_secure_option(self, section, option):
         """Test an option to see if it is secured or not.
 
@@ -134,6 +215,7 @@ class SecurableConfigParser(ConfigParser):
         if self.keyring_available:
             s_option = "%s%s" % (section, option)
             self._unsaved[s_option] = ('set', value)
+            self._forget_secret(s_option)
             value = self._secure_placeholder
         ConfigParser.set(self, section, option, value)
 
@@ -145,7 +227,7 @@ class SecurableConfigParser(ConfigParser):
             if self._unsaved.get(s_option, [''])[0] == 'set':
                 res = self._unsaved[s_option][1]
             else:
-                res = keyring.get_password(self.keyring_name, s_option)
+                res = self._secret(s_option)
         else:
             res = ConfigParser.get(self, section, option, *args)
         if res == '!!False!!':
@@ -159,6 +241,7 @@ class SecurableConfigParser(ConfigParser):
         if self.is_secure_option(section, option) and self.keyring_available:
             s_option = "%s%s" % (section, option)
             self._unsaved[s_option] = ('delete', None)
+            self._forget_secret(s_option)
         ConfigParser.remove_option(self, section, option)
 
     def write(self, *args):
@@ -169,14 +252,454 @@ class SecurableConfigParser(ConfigParser):
                 action = thing[0]
                 value = thing[1]
                 if action == 'set':
-                    keyring.set_password(self.keyring_name, key, value)
+                    _keyring().set_password(self.keyring_name, key, value)
+                    self._remember_secret(key, value)
                 elif action == 'delete':
+                    self._forget_secret(key)
                     try:
-                        keyring.delete_password(self.keyring_name, key)
+                        _keyring().delete_password(self.keyring_name, key)
                     except:
                         pass
         self._unsaved = {}
 
+    def prefetch_secrets(self, workers=8):
+        """Fetch every secure option from the keychain into the secret
+        cache, ``workers`` at a time
+
+        Worth it when a slow keychain holds many secrets; a keychain
+        that cannot handle parallel requests should use workers=1.
+
+        :return: number of secrets fetched
+        :rtype: integer
+        """
+        if not (self.keyring_available and self.cache_secrets):
+            return 0
+        pending = []
+        for section in self.sections():
+            for option in self.options(section):
+                key = "%s%s" % (section, option)
+                if self.is_secure_option(section, option) and \
+                        key not in self._unsaved and \
+                        key not in self._secrets:
+                    pending.append(key)
+        fetched = list(pending)
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    key = pending.pop()
+                self._secret(key)
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(max(1, min(workers, len(pending))))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return len(fetched)
+
+    def clear_secret_cache(self):
+        """Forget every secret read from the keychain"""
+        with self._secrets_lock:
+            self._secrets = {}
+
+    def _secret(self, key):
+        if not self.cache_secrets:
+            return _keyring().get_password(self.keyring_name, key)
+        with self._secrets_lock:
+            if key in self._secrets:
+                return self._secrets[key]
+        value = _keyring().get_password(self.keyring_name, key)
+        self._remember_secret(key, value)
+        return value
+
+    def _remember_secret(self, key, value):
+        if self.cache_secrets:
+            with self._secrets_lock:
+                self._secrets[key] = value
+
+    def _forget_secret(self, key):
+        with self._secrets_lock:
+            self._secrets.pop(key, None)
+
+
+class ConfigStorage(object):
+    """Interface of where :py:class:`OfxConfig` keeps accounts
+
+    Accounts are stored as given by :py:meth:`ofxclient.Account.serialize`
+    and identified by their local id.  Changes are staged until
+    :py:meth:`commit`.  Secure fields (usernames and passwords) live in the
+    keyring when one is available, under the same names whatever the
+    storage, so accounts can be moved between storages without touching
+    the keyring.
+
+    :py:class:`IniStorage` is the default; :py:class:`SqliteStorage` is
+    meant for thousands of accounts and several writers.
+    """
+
+    file_name = None
+
+    def local_ids(self):
+        """Local ids of the stored accounts, in the order they were added
+
+        :rtype: list
+        """
+        raise NotImplementedError
+
+    def load(self, local_id):
+        """Serialized account, or None if there is none with that id
+
+        :rtype: dict or None
+        """
+        raise NotImplementedError
+
+    def load_all(self):
+        """Every serialized account by local id, in the order they were
+        added
+
+        :rtype: :py:class:`collections.OrderedDict`
+        """
+        accounts = OrderedDict()
+        for local_id in self.local_ids():
+            accounts[local_id] = self.load(local_id)
+        return accounts
+
+    def save(self, local_id, serialized):
+        """Add or replace an account (staged until :py:meth:`commit`)"""
+        raise NotImplementedError
+
+    def remove(self, local_id):
+        """Remove an account (staged until :py:meth:`commit`)
+
+        :return: whether there was one
+        :rtype: boolean
+        """
+        raise NotImplementedError
+
+    def encrypt(self, local_id, fields):
+        """Move the (dotted) ``fields`` of an account into the keyring"""
+        raise NotImplementedError
+
+    def is_encrypted(self, local_id, fields):
+        """Are all (dotted) ``fields`` of an account in the keyring?
+
+        :rtype: boolean
+        """
+        raise NotImplementedError
+
+    def commit(self):
+        """Write the staged changes"""
+        raise NotImplementedError
+
+    def reload(self):
+        """Drop the staged changes and read the storage again"""
+        raise NotImplementedError
+
+    def prefetch_secrets(self):
+        """Fetch every secret from the keyring ahead of use, if supported
+
+        :return: number of secrets fetched
+        :rtype: integer
+        """
+        return 0
+
+
+class IniStorage(ConfigStorage):
+    """Accounts as sections of an INI file, read and written by a
+    :py:class:`SecurableConfigParser` (the ``parser`` attribute)
+
+    The file is created if missing; every :py:meth:`commit` rewrites all
+    of it.
+
+    :param file_name: absolute path to the INI file
+    :type file_name: string
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.reload()
+
+    def local_ids(self):
+        return self.parser.sections()
+
+    def load(self, local_id):
+        if not self.parser.has_section(local_id):
+            return None
+        return unflatten_dict(dict(self.parser.items(local_id)))
+
+    def save(self, local_id, serialized):
+        section_items = flatten_dict(serialized)
+        if not self.parser.has_section(local_id):
+            self.parser.add_section(local_id)
+        for key in sorted(section_items):
+            self.parser.set(local_id, key, section_items[key])
+
+    def remove(self, local_id):
+        if self.parser.has_section(local_id):
+            self.parser.remove_section(local_id)
+            return True
+        return False
+
+    def encrypt(self, local_id, fields):
+        for key in fields:
+            value = self.parser.get(local_id, key)
+            self.parser.set_secure(local_id, key, value)
+
+    def is_encrypted(self, local_id, fields):
+        for key in fields:
+            if not self.parser.is_secure_option(local_id, key):
+                return False
+        return True
+
+    def commit(self):
+        with open(self.file_name, 'w') as fp:
+            self.parser.write(fp)
+
+    def reload(self):
+        self.parser = None
+        if not os.path.exists(self.file_name):
+            with open(self.file_name, 'a'):
+                os.utime(self.file_name, None)
+
+        conf = SecurableConfigParser()
+        with open(self.file_name) as f:
+            if hasattr(conf, 'read_file'):
+                # python 3
+                conf.read_file(f)
+            else:
+                # python 2
+                conf.readfp(f)
+        self.parser = conf
+
+    def prefetch_secrets(self):
+        return self.parser.prefetch_secrets()
+
+
+_SQLITE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS accounts (
+        local_id TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    )""",
+]
+
+
+class SqliteStorage(ConfigStorage):
+    """Accounts as rows of a SQLite database, one JSON document each
+
+    Lookups by local id use the primary key index, and :py:meth:`commit`
+    writes only the accounts that were changed, in one transaction, so
+    several processes can share the database without losing each other's
+    changes (the last writer of the same account wins).
+
+    Secure fields hold a placeholder and their values live in the keyring,
+    like those of a :py:class:`SecurableConfigParser`; keyring writes are
+    also deferred to :py:meth:`commit`.
+
+    :param file_name: path of the SQLite database, or ':memory:'
+    :type file_name: string
+    :param keyring_name: name of the keyring service
+    :type keyring_name: string
+    :param keyring_available: whether to use the keyring; None to probe
+      it on first use
+    :type keyring_available: boolean or None
+    """
+
+    _secure_placeholder = SecurableConfigParser._secure_placeholder
+
+    def __init__(self, file_name, keyring_name='ofxclient',
+                 keyring_available=None):
+        self.file_name = file_name
+        self.keyring_name = keyring_name
+        self._keyring_available = keyring_available
+        self._lock = threading.RLock()
+        # wait for other writers rather than failing right away
+        self._db = sqlite3.connect(file_name, timeout=30,
+                                   check_same_thread=False)
+        with self._db:
+            for statement in _SQLITE_SCHEMA:
+                self._db.execute(statement)
+        self._pending = OrderedDict()
+        self._secrets = {}
+        self._unsaved = {}
+
+    @property
+    def keyring_available(self):
+        if self._keyring_available is None:
+            self._keyring_available = keyring_available()
+        return self._keyring_available
+
+    def close(self):
+        self._db.close()
+
+    def local_ids(self):
+        return list(self._raw_all())
+
+    def load(self, local_id):
+        with self._lock:
+            data = self._raw(local_id)
+        if data is None:
+            return None
+        return self._resolve(local_id, data)
+
+    def load_all(self):
+        accounts = OrderedDict()
+        for local_id, data in self._raw_all().items():
+            accounts[local_id] = self._resolve(local_id, data)
+        return accounts
+
+    def save(self, local_id, serialized):
+        # a JSON round trip copies the account and checks it can be stored
+        data = json.loads(json.dumps(serialized))
+        with self._lock:
+            old = self._raw(local_id)
+            if old is not None:
+                # keep fields that are already in the keyring secured
+                for key, value in _leaves(old):
+                    if value != self._secure_placeholder:
+                        continue
+                    name = '%s%s' % (local_id, key)
+                    secret = _get_path(data, key)
+                    if secret != self._secret(name):
+                        self._set_secret(name, secret)
+                    _set_path(data, key, value)
+            self._pending[local_id] = data
+
+    def remove(self, local_id):
+        with self._lock:
+            data = self._raw(local_id)
+            if data is None:
+                return False
+            for key, value in _leaves(data):
+                if value == self._secure_placeholder:
+                    name = '%s%s' % (local_id, key)
+                    self._secrets.pop(name, None)
+                    self._unsaved[name] = ('delete', None)
+            self._pending[local_id] = None
+            return True
+
+    def encrypt(self, local_id, fields):
+        if not self.keyring_available:
+            return
+        with self._lock:
+            data = self._raw(local_id)
+            changed = False
+            for key in fields:
+                value = _get_path(data, key)
+                if value != self._secure_placeholder:
+                    self._set_secret('%s%s' % (local_id, key), value)
+                    _set_path(data, key, self._secure_placeholder)
+                    changed = True
+            if changed:
+                self._pending[local_id] = data
+
+    def is_encrypted(self, local_id, fields):
+        with self._lock:
+            data = self._raw(local_id)
+        if data is None:
+            return False
+        return all(_get_path(data, key) == self._secure_placeholder
+                   for key in fields)
+
+    def commit(self):
+        with self._lock:
+            with self._db:
+                for local_id, data in self._pending.items():
+                    if data is None:
+                        self._db.execute(
+                            'DELETE FROM accounts WHERE local_id = ?',
+                            (local_id,))
+                        continue
+                    doc = json.dumps(data, sort_keys=True)
+                    cursor = self._db.execute(
+                        'UPDATE accounts SET data = ? WHERE local_id = ?',
+                        (doc, local_id))
+                    if cursor.rowcount == 0:
+                        # a new account; inserted rather than replaced, so
+                        # its rowid, and with it the account order, is kept
+                        self._db.execute(
+                            'INSERT INTO accounts (local_id, data) '
+                            'VALUES (?, ?)', (local_id, doc))
+            self._pending = OrderedDict()
+            unsaved, self._unsaved = self._unsaved, {}
+        keyring = _keyring() if unsaved else None
+        for name, (action, value) in unsaved.items():
+            if action == 'set':
+                keyring.set_password(self.keyring_name, name, value)
+            else:
+                try:
+                    keyring.delete_password(self.keyring_name, name)
+                except:
+                    pass
+
+    def reload(self):
+        with self._lock:
+            self._pending = OrderedDict()
+            self._secrets = {}
+            self._unsaved = {}
+
+    def _raw(self, local_id):
+        if local_id in self._pending:
+            data = self._pending[local_id]
+        else:
+            row = self._db.execute(
+                'SELECT data FROM accounts WHERE local_id = ?',
+                (local_id,)).fetchone()
+            data = json.loads(row[0]) if row else None
+        return copy.deepcopy(data)
+
+    def _raw_all(self):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT local_id, data FROM accounts ORDER BY rowid')
+            accounts = OrderedDict((local_id, json.loads(data))
+                                   for local_id, data in rows)
+            for local_id, data in self._pending.items():
+                if data is None:
+                    accounts.pop(local_id, None)
+                else:
+                    accounts[local_id] = copy.deepcopy(data)
+        return accounts
+
+    def _resolve(self, local_id, data):
+        """``data`` with its placeholders replaced by their secrets"""
+        if not self.keyring_available:
+            return data
+        for key, value in _leaves(data):
+            if value == self._secure_placeholder:
+                _set_path(data, key, self._secret('%s%s' % (local_id, key)))
+        return data
+
+    def _secret(self, name):
+        with self._lock:
+            if name in self._secrets:
+                return self._secrets[name]
+        value = _keyring().get_password(self.keyring_name, name)
+        with self._lock:
+            self._secrets[name] = value
+        return value
+
+    def _set_secret(self, name, value):
+        self._secrets[name] = value
+        self._unsaved[name] = ('set', value)
+
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+
+def open_storage(file_name):
+    """The storage for a config file: a :py:class:`SqliteStorage` for
+    names ending in one of :py:data:`SQLITE_EXTENSIONS`, otherwise an
+    :py:class:`IniStorage`
+
+    :rtype: :py:class:`ConfigStorage`
+    """
+    if os.path.splitext(file_name)[1].lower() in SQLITE_EXTENSIONS:
+        return SqliteStorage(file_name)
+    return IniStorage(file_name)
+
 
 class OfxConfig(object):
     """Default config file handler for other tools to use.
@@ -184,8 +707,29 @@ class OfxConfig(object):
     This can read and write from the default config which is
     $USERS_HOME/ofxclient.ini
 
+    Accounts are kept in a :py:class:`ConfigStorage`: an INI file by
+    default, or a SQLite database when the file name ends in ``.db``,
+    ``.sqlite`` or ``.sqlite3`` (see :py:func:`open_storage`) or a
+    ``storage`` is given.  :py:func:`migrate` copies accounts from one to
+    the other.
+
+    Accounts are deserialized once and kept in a map by local id, so
+    :py:meth:`accounts` and :py:meth:`account` return the same objects
+    from one call to the next.  The map follows :py:meth:`add_account`,
+    :py:meth:`remove_account` and :py:meth:`reload`; changes made to
+    ``parser`` directly are only seen after a reload.  Accounts of the same
+    login share one :py:class:`ofxclient.Institution`, and through it one
+    :py:class:`ofxclient.Client`.
+
     :param file_name: absolute path to a config file (optional)
     :type file_name: string or None
+    :param prefetch_secrets: fetch all usernames and passwords from the
+      keychain in parallel as soon as the file is loaded (see
+      :py:meth:`SecurableConfigParser.prefetch_secrets`)
+    :type prefetch_secrets: boolean
+    :param storage: where to keep the accounts (optional; chosen from
+      ``file_name`` by default)
+    :type storage: :py:class:`ConfigStorage` or None
 
     Example usage::
 
@@ -202,26 +746,42 @@ class OfxConfig(object):
       one_account  = c.account( a.local_id() )
     """
 
-    def __init__(self, file_name=None):
+    def __init__(self, file_name=None, prefetch_secrets=False,
+                 storage=None):
 
+        self.prefetch_secrets = prefetch_secrets
         self.secured_field_names = [
             'institution.username',
             'institution.password'
         ]
 
-        f = file_name or DEFAULT_CONFIG
+        self.storage = storage
+        f = file_name or getattr(storage, 'file_name', None) or \
+            DEFAULT_CONFIG
         if f is None:
             raise ValueError('file_name is required')
         self._load(f)
 
+    @property
+    def parser(self):
+        """The :py:class:`SecurableConfigParser` of an INI config (None
+        for other storages)"""
+        return getattr(self.storage, 'parser', None)
+
     def reload(self):
         """Reload the config file from disk"""
         return self._load()
 
     def accounts(self):
         """List of confgured :py:class:`ofxclient.Account` objects"""
-        return [self._section_to_account(s)
-                for s in self.parser.sections()]
+        if not self._complete:
+            accounts = OrderedDict()
+            for local_id, serialized in self.storage.load_all().items():
+                accounts[local_id] = self._accounts.get(local_id) or \
+                    Account.deserialize(serialized, self._institutions)
+            self._accounts = accounts
+            self._complete = True
+        return list(self._accounts.values())
 
     def encrypted_accounts(self):
         return [a
@@ -235,80 +795,100 @@ class OfxConfig(object):
 
     def account(self, id):
         """Get :py:class:`ofxclient.Account` by section id"""
-        if self.parser.has_section(id):
-            return self._section_to_account(id)
-        return None
+        if id in self._accounts or self._complete:
+            return self._accounts.get(id)
+        account = self._load_account(id)
+        if account is not None:
+            self._accounts[id] = account
+        return account
 
     def add_account(self, account):
         """Add Account to config (does not save)"""
         serialized = account.serialize()
-        section_items = flatten_dict(serialized)
-        section_id = section_items['local_id']
-
-        if not self.parser.has_section(section_id):
-            self.parser.add_section(section_id)
-
-        for key in sorted(section_items):
-            self.parser.set(section_id, key, section_items[key])
+        section_id = serialized['local_id']
 
+        self.storage.save(section_id, serialized)
         self.encrypt_account(id=section_id)
 
+        # accounts of the same login already loaded share its institution
+        shared = self._institutions.get(account.institution.local_id())
+        if shared is not None and shared is not account.institution:
+            shared._update(account.institution)
+        if self._complete or section_id in self._accounts:
+            self._accounts[section_id] = self._load_account(section_id)
+
         return self
 
     def encrypt_account(self, id):
         """Make sure that certain fields are encrypted."""
-        for key in self.secured_field_names:
-            value = self.parser.get(id, key)
-            self.parser.set_secure(id, key, value)
+        self.storage.encrypt(id, self.secured_field_names)
         return self
 
     def is_encrypted_account(self, id):
         """Are all fields for the account id encrypted?"""
-        for key in self.secured_field_names:
-            if not self.parser.is_secure_option(id, key):
-                return False
-        return True
+        return self.storage.is_encrypted(id, self.secured_field_names)
 
     def remove_account(self, id):
         """Add Account from config (does not save)"""
-        if self.parser.has_section(id):
-            self.parser.remove_section(id)
+        if self.storage.remove(id):
+            self._accounts.pop(id, None)
             return True
         return False
 
     def save(self):
         """Save changes to config file"""
-        with open(self.file_name, 'w') as fp:
-            self.parser.write(fp)
+        self.storage.commit()
         return self
 
     def _load(self, file_name=None):
-        self.parser = None
+        self._accounts = OrderedDict()
+        self._complete = False
+        self._institutions = {}
 
-        file_name = file_name or self.file_name
+        if file_name is None:
+            self.storage.reload()
+        else:
+            self.file_name = file_name
+            if self.storage is None:
+                self.storage = open_storage(file_name)
 
-        if not os.path.exists(file_name):
-            with open(file_name, 'a'):
-                os.utime(file_name, None)
+        if self.prefetch_secrets:
+            self.storage.prefetch_secrets()
 
-        self.file_name = file_name
+        return self
 
-        conf = SecurableConfigParser()
-        with open(self.file_name) as f:
-            if hasattr(conf, 'read_file'):
-                # python 3
-                conf.read_file(f)
-            else:
-                # python 2
-                conf.readfp(f)
-        self.parser = conf
+    def _load_account(self, id):
+        serialized = self.storage.load(id)
+        if serialized is None:
+            return None
+        return Account.deserialize(serialized, self._institutions)
 
-        return self
 
-    def _section_to_account(self, section):
-        section_items = dict(self.parser.items(section))
-        serialized = unflatten_dict(section_items)
-        return Account.deserialize(serialized)
+def migrate(source, destination):
+    """Copy every account of one config file to another, for instance from
+    INI to SQLite::
+
+      migrate('~/ofxclient.ini', '~/ofxclient.accounts.db')
+
+    Accounts already in ``destination`` are replaced.  Secure fields end
+    up in the keyring under the same names as before.
+
+    :param source: config file to read
+    :type source: string or :py:class:`OfxConfig`
+    :param destination: config file to write
+    :type destination: string or :py:class:`OfxConfig`
+    :return: number of accounts copied
+    :rtype: integer
+    """
+    if not isinstance(source, OfxConfig):
+        source = OfxConfig(file_name=os.path.expanduser(source))
+    if not isinstance(destination, OfxConfig):
+        destination = OfxConfig(file_name=os.path.expanduser(destination))
+    accounts = source.accounts()
+    for account in accounts:
+        destination.add_account(account)
+    destination.save()
+    return len(accounts)
 
 
 def unflatten_dict(dict, prefix=None, separator='.'):
@@ -344,3 +924,27 @@ def flatten_dict(dict_, prefix=None, separator='.'):
         else:
             ret[flat_key] = v
     return ret
+
+
+def _leaves(data, prefix=None):
+    """(dotted key, value) of every non-dict value in a nested dict"""
+    for k, v in list(data.items()):
+        key = '%s.%s' % (prefix, k) if prefix else k
+        if isinstance(v, dict):
+            for leaf in _leaves(v, key):
+                yield leaf
+        else:
+            yield key, v
+
+
+def _get_path(data, key):
+    for part in key.split('.'):
+        data = data[part]
+    return data
+
+
+def _set_path(data, key, value):
+    parts = key.split('.')
+    for part in parts[:-1]:
+        data = data[part]
+    data[parts[-1]] = value
@@ -0,0 +1,219 @@
+"""Keeping accounts in sync from one long-running process.
+
+Running ``ofxclient --download`` from cron pays for start-up, loading the
+config, probing the keyring and connecting to every bank on each run.
+:py:class:`SyncDaemon` stays up instead: it downloads each account on its
+own schedule, keeps connections and institutions warm between syncs, and
+picks up config changes as they are saved.
+
+* every account is synced every ``interval`` seconds (or its own entry in
+  ``intervals``), give or take ``jitter`` (a fraction of the interval)
+* the first syncs of different institutions are spread over ``stagger``
+  seconds, so banks are not all contacted at once; the accounts of one
+  institution are synced together
+* the config file is reloaded when its modification time changes; new
+  accounts are scheduled and removed ones dropped
+* each successful sync is written to ``output_dir`` as
+  ``<local id>-<UTC time>.ofx``; a response with an HTTP error or a
+  failed signon is logged and not written
+
+From the command line::
+
+  ofxclient daemon --output-dir /var/lib/ofx --interval 21600
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+from collections import OrderedDict
+import logging
+import os
+import os.path
+import random
+import threading
+import time
+
+from ofxclient.sync import download_error, recording_requests
+from ofxclient.util import iter_downloads, write_atomic
+
+DEFAULT_INTERVAL = 6 * 60 * 60
+DEFAULT_JITTER = 0.1
+DEFAULT_STAGGER = 60
+DEFAULT_DAYS = 30
+# how often to look at the config file while nothing is due
+DEFAULT_POLL = 5
+
+
+class SyncDaemon(object):
+    """Downloads the accounts of an :py:class:`ofxclient.config.OfxConfig`
+    on a schedule, until stopped
+
+    :param config: config to take the accounts from
+    :type config: :py:class:`ofxclient.config.OfxConfig`
+    :param output_dir: directory to write downloads to (created if missing)
+    :type output_dir: string
+    :param interval: seconds between syncs of an account
+    :type interval: integer or float
+    :param intervals: seconds between syncs by account local id, for
+      accounts that differ from ``interval``
+    :type intervals: dict or None
+    :param jitter: each wait is randomly lengthened or shortened by up to
+      this fraction
+    :type jitter: float
+    :param stagger: seconds over which the first syncs of the
+      institutions are spread
+    :type stagger: integer or float
+    :param days: number of days each download looks back at
+    :type days: integer
+    :param workers: max number of concurrent downloads
+    :type workers: integer
+    :param per_institution: max number of concurrent downloads per
+      institution (optional)
+    :type per_institution: integer or None
+    :param poll: max seconds between checks of the config file
+    :type poll: integer or float
+
+    Example::
+
+      from ofxclient.config import OfxConfig
+      from ofxclient.daemon import SyncDaemon
+
+      SyncDaemon(OfxConfig(), '/var/lib/ofx', interval=3600).run_forever()
+    """
+
+    def __init__(self, config, output_dir, interval=DEFAULT_INTERVAL,
+                 intervals=None, jitter=DEFAULT_JITTER,
+                 stagger=DEFAULT_STAGGER, days=DEFAULT_DAYS, workers=4,
+                 per_institution=None, poll=DEFAULT_POLL):
+        self.config = config
+        self.output_dir = output_dir
+        self.interval = interval
+        self.intervals = dict(intervals or {})
+        self.jitter = jitter
+        self.stagger = stagger
+        self.days = days
+        self.workers = workers
+        self.per_institution = per_institution
+        self.poll = poll
+        self._due = {}
+        self._stopped = threading.Event()
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+        self._mtime = self._config_mtime()
+        self.schedule()
+
+    def schedule(self, now=None):
+        """Schedule the first sync of accounts that are new to the config,
+        and forget those that are gone from it"""
+        now = time.time() if now is None else now
+        accounts = self._accounts()
+        for local_id in list(self._due):
+            if local_id not in accounts:
+                del self._due[local_id]
+
+        institutions = OrderedDict()
+        for local_id, account in accounts.items():
+            if local_id not in self._due:
+                institutions.setdefault(account.institution.local_id(),
+                                        []).append(local_id)
+        step = float(self.stagger) / len(institutions) if institutions else 0
+        for idx, members in enumerate(institutions.values()):
+            for local_id in members:
+                self._due[local_id] = now + idx * step
+
+    def next_due(self):
+        """Time of the next sync, or None if there are no accounts
+
+        :rtype: float or None
+        """
+        return min(self._due.values()) if self._due else None
+
+    def interval_for(self, local_id):
+        """Seconds between syncs of an account, before jitter"""
+        return float(self.intervals.get(local_id, self.interval))
+
+    def reload_if_changed(self, now=None):
+        """Reload the config and reschedule if the file was modified
+
+        :return: whether it was reloaded
+        :rtype: boolean
+        """
+        mtime = self._config_mtime()
+        if mtime == self._mtime:
+            return False
+        logging.info('%s changed; reloading', self.config.file_name)
+        self._mtime = mtime
+        self.config.reload()
+        self.schedule(now)
+        return True
+
+    def run_pending(self, now=None):
+        """Sync every account that is due, and schedule its next sync
+
+        :return: (account, file written or None, exception or None)
+          3-tuples
+        :rtype: list
+        """
+        now = time.time() if now is None else now
+        accounts = self._accounts()
+        due = [accounts[local_id]
+               for local_id, when in sorted(self._due.items(),
+                                            key=lambda item: item[1])
+               if when <= now and local_id in accounts]
+        results = []
+        with recording_requests(due) as timings:
+            for account, data, error in iter_downloads(
+                    due, days=self.days, workers=self.workers,
+                    per_institution=self.per_institution, raw=True):
+                local_id = account.local_id()
+                file_name = None
+                if error is None:
+                    error = download_error(data, timings[id(account)])
+                    if error is not None:
+                        logging.error('sync of %s failed: %s',
+                                      account.long_description(), error)
+                if error is None:
+                    try:
+                        file_name = self._write(local_id, data)
+                    except (IOError, OSError) as e:
+                        logging.exception('could not write sync of %s',
+                                          account.long_description())
+                        error = e
+                self._due[local_id] = time.time() + self._wait(local_id)
+                results.append((account, file_name, error))
+        return results
+
+    def run_forever(self):
+        """Sync accounts as they fall due until :py:meth:`stop` is called"""
+        while not self._stopped.is_set():
+            self.reload_if_changed()
+            self.run_pending()
+            wait = self.poll
+            due = self.next_due()
+            if due is not None:
+                wait = min(wait, due - time.time())
+            self._stopped.wait(max(0, wait))
+
+    def stop(self):
+        """Make :py:meth:`run_forever` return (safe from signal handlers
+        and other threads)"""
+        self._stopped.set()
+
+    def _accounts(self):
+        return OrderedDict((a.local_id(), a) for a in self.config.accounts())
+
+    def _wait(self, local_id):
+        interval = self.interval_for(local_id)
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _write(self, local_id, data):
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime())
+        file_name = os.path.join(self.output_dir,
+                                 '%s-%s.ofx' % (local_id, stamp))
+        write_atomic(file_name, data)
+        return file_name
+
+    def _config_mtime(self):
+        try:
+            return os.stat(self.config.file_name).st_mtime
+        except OSError:
+            return None
@@ -1,19 +1,19 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
+from __future__ import with_statement
 import hashlib
+import re
+import threading
 try:
     # python 3
-    from io import StringIO, BytesIO
-    IS_PYTHON_2 = False
+    from io import StringIO
 except ImportError:
     # python 2
     from StringIO import StringIO
-    IS_PYTHON_2 = True
-
-from bs4 import BeautifulSoup
-from ofxparse import OfxParser
 
+from ofxclient import sgml
 from ofxclient.client import Client
+from ofxclient.session import Session
 
 
 class Institution(object):
@@ -72,25 +72,70 @@ class Institution(object):
         self.password = password
         self.description = description or self._default_description()
         self.client_args = client_args
+        self._local_id = None
+        self._client = None
+        self._client_args = None
+        self._client_lock = threading.Lock()
+        # cookies and signon tokens, kept across clients and accounts
+        self.session = Session()
 
     def client(self):
-        """Build a :py:class:`ofxclient.Client` for talking with the bank
+        """The :py:class:`ofxclient.Client` for talking with the bank
 
         It implicitly passes in the ``client_args`` that were passed
-        when instantiating this ``Institution``.
+        when instantiating this ``Institution``.  The client is built on
+        first use and reused after that, so every account of the
+        institution shares it; it is built again if ``client_args`` are
+        changed.
 
         :rtype: :py:class:`ofxclient.Client`
         """
-        return Client(institution=self, **self.client_args)
+        with self._client_lock:
+            if self._client is None or self._client_args != self.client_args:
+                self._client = Client(institution=self, **self.client_args)
+                self._client_args = dict(self.client_args)
+            return self._client
+
+    def _update(self, other):
+        """Take on the settings of ``other``, the same login read again
+        (e.g. with a new password or url); the client is rebuilt and
+        the session dropped if anything changed
+
+        :return: whether anything changed
+        :rtype: boolean
+        """
+        names = ('org', 'url', 'broker_id', 'password', 'description',
+                 'client_args')
+        if all(getattr(self, n) == getattr(other, n) for n in names):
+            return False
+        with self._client_lock:
+            for name in names:
+                setattr(self, name, getattr(other, name))
+            self._client = None
+        self.session.clear()
+        return True
+
+    def async_client(self):
+        """Build an :py:class:`ofxclient.aio.AsyncClient` (Python 3.5+)
+
+        Like :py:meth:`client` it passes in ``client_args``.
+
+        :rtype: :py:class:`ofxclient.aio.AsyncClient`
+        """
+        from ofxclient.aio import AsyncClient
+        return AsyncClient(institution=self, **self.client_args)
 
     def local_id(self):
         """Locally generated unique account identifier.
 
         :rtype: string
         """
-        return hashlib.sha256(("%s%s" % (
-            self.id,
-            self.username)).encode()).hexdigest()
+        # cached, but recomputed if the id or username are changed
+        key = (self.id, self.username)
+        if self._local_id is None or self._local_id[0] != key:
+            self._local_id = (key, hashlib.sha256(
+                ("%s%s" % key).encode()).hexdigest())
+        return self._local_id[1]
 
     def _default_description(self):
         return self.org
@@ -107,48 +152,97 @@ class Institution(object):
         :type password: string or None
         """
 
-        u = self.username
-        p = self.password
-        if username and password:
-            u = username
-            p = password
-
+        u, p = self._credentials(username, password)
         client = self.client()
         query = client.authenticated_query(username=u, password=p)
-        res = client.post(query)
-        ofx = BeautifulSoup(res, 'lxml')
+        res = client.post_bytes(query)
+        return self._check_authentication(res)
+
+    def authenticate_async(self, username=None, password=None):
+        """Coroutine version of :py:meth:`authenticate` (Python 3.5+)
+
+        :param username: optional username (use self.username by default)
+        :type username: string or None
+        :param password: optional password (use self.password by default)
+        :type password: string or None
+        """
+        from ofxclient import aio
+        return aio.authenticate(self, username=username, password=password)
 
-        sonrs = ofx.find('sonrs')
-        code = int(sonrs.find('code').contents[0].strip())
+    def _cache_key(self):
+        """Key of the account list response in a
+        :py:class:`ofxclient.cache.ResponseCache`"""
+        return (self.local_id(), None, 'accounts', None)
 
-        try:
-            status = sonrs.find('message').contents[0].strip()
-        except Exception:
-            status = ''
+    def _credentials(self, username=None, password=None):
+        if username and password:
+            return username, password
+        return self.username, self.password
 
-        if code == 0:
-            return 1
+    def _check_authentication(self, res):
+        self._check_signon(sgml.signon_status(res))
+        return 1
 
-        raise ValueError(status)
+    def _check_signon(self, status):
+        if status is None:
+            raise ValueError('no signon response from %s' % self.description)
+        code, message = status
+        if code != 0:
+            raise ValueError(message)
 
     def accounts(self):
         """Ask the bank for the known :py:class:`ofxclient.Account` list.
 
         :rtype: list of :py:class:`ofxclient.Account` objects
         """
-        from ofxclient.account import Account
         client = self.client()
         query = client.account_list_query()
-        resp = client.post(query)
-        resp_handle = StringIO(resp)
+        resp = client.post_bytes(query, cache_key=self._cache_key())
+        return self._accounts_from_response(resp)
+
+    def accounts_async(self):
+        """Coroutine version of :py:meth:`accounts` (Python 3.5+)
 
-        if IS_PYTHON_2:
-            parsed = OfxParser.parse(resp_handle)
-        else:
-            parsed = OfxParser.parse(BytesIO(resp_handle.read().encode()))
+        :rtype: coroutine returning a list of :py:class:`ofxclient.Account`
+        """
+        from ofxclient import aio
+        return aio.accounts(self)
 
-        return [Account.from_ofxparse(a, institution=self)
-                for a in parsed.accounts]
+    def _accounts_from_response(self, resp):
+        from ofxclient.account import Account
+        status, infos = sgml.account_list(resp)
+        self._check_signon(status)
+        return [Account.from_acctinfo(info, institution=self)
+                for info in infos]
+
+    def download_all(self, accounts, days=60):
+        """Download statements for several accounts of this login with a
+        single request.
+
+        All the statement requests go out in one OFX request with one
+        signon, and the response is split back into one OFX document per
+        account (matched up by TRNUID), each looking like the response
+        :py:meth:`ofxclient.Account.download` would have returned.
+
+        :param accounts: accounts that belong to this institution login
+        :type accounts: list of :py:class:`ofxclient.Account` objects
+        :param days: Number of days to look back at
+        :type days: integer
+        :rtype: list of :py:class:`StringIO`, in the order of ``accounts``
+        """
+        for a in accounts:
+            if a.institution.local_id() != self.local_id():
+                raise ValueError("account %s does not belong to %s" % (
+                    a.number_masked(), self.description))
+        if not accounts:
+            return []
+        client = self.client()
+        requests = [a._statement_request(client, as_of=a._as_of(days))
+                    for a in accounts]
+        query, trnuids = client.statements_query(requests)
+        response = client.post(query)
+        return [StringIO(r) for r in
+                split_statements(response, requests, trnuids)]
 
     def serialize(self):
         """Serialize predictably for use in configuration storage.
@@ -203,3 +297,51 @@ class Institution(object):
             description=raw.get('description', None),
             client_args=raw.get('client_args', {})
         )
+
+
+def split_statements(response, requests, trnuids):
+    """Split the response to :py:meth:`ofxclient.Client.statements_query`
+    into one OFX document per request.
+
+    Each document gets the response header, the signon response and the
+    one ``*TRNRS`` aggregate whose TRNUID matches.
+
+    :raises ValueError: if the response has no transaction for a TRNUID
+    :rtype: list of str, in the order of ``requests``
+    """
+    header, _, body = response.partition('<OFX>')
+    signon = _aggregate(body, 'SIGNONMSGSRSV1')
+    by_trnuid = {}
+    for match in _TRNRS.finditer(body):
+        trnuid = _TRNUID.search(match.group(0))
+        if trnuid:
+            by_trnuid[trnuid.group(1)] = match.group(0)
+
+    documents = []
+    for (msgType, trnType, _), trnuid in zip(requests, trnuids):
+        trnrs = by_trnuid.get(trnuid)
+        if trnrs is None:
+            raise ValueError("no %s response for TRNUID %s" % (
+                trnType, trnuid))
+        msgset = msgType + 'MSGSRSV1'
+        documents.append(''.join([
+            header, '<OFX>', signon,
+            '<%s>' % msgset, trnrs, '</%s>' % msgset,
+            '</OFX>'
+        ]))
+    return documents
+
+
+def _aggregate(text, tag):
+    start = text.find('<%s>' % tag)
+    if start < 0:
+        return ''
+    close = '</%s>' % tag
+    end = text.find(close, start)
+    if end < 0:
+        return text[start:]
+    return text[start:end + len(close)]
+
+
+_TRNRS = re.compile(r'<((?:CC|INV)?STMTTRNRS)>.*?</\1>', re.S)
+_TRNUID = re.compile(r'<TRNUID>\s*([^<\s]+)')
@@ -0,0 +1,183 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+try:
+    # python 3
+    from http.client import HTTPSConnection
+except ImportError:
+    # python 2
+    from httplib import HTTPSConnection
+import logging
+import select
+import socket
+import threading
+import time
+
+DEFAULT_MAX_IDLE = 4
+DEFAULT_IDLE_TIMEOUT = 30
+DEFAULT_TIMEOUT = 60
+
+
+class ConnectionPool(object):
+    """Keeps idle keep-alive HTTPS connections around so that back-to-back
+    requests to the same bank reuse the socket instead of paying for a new
+    TCP and TLS handshake every time.
+
+    Connections are keyed by host.  A connection is handed out by
+    :py:meth:`connection` and must be given back with :py:meth:`release`
+    once its response has been read completely (or closed if it is no
+    longer usable).
+
+    :param max_idle: max number of idle connections kept per host. Use 0
+      to disable pooling entirely.
+    :type max_idle: integer
+    :param idle_timeout: seconds after which an idle connection is discarded
+    :type idle_timeout: integer or float
+    :param timeout: socket timeout used for new connections
+    :type timeout: integer or float
+    :param context: optional :py:class:`ssl.SSLContext` for new connections
+    :type context: :py:class:`ssl.SSLContext` or None
+
+    Example::
+
+      from ofxclient.pool import ConnectionPool
+
+      pool = ConnectionPool(max_idle=2, idle_timeout=10)
+      client = institution.client()
+      client.connection_pool = pool
+    """
+
+    def __init__(self, max_idle=DEFAULT_MAX_IDLE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, timeout=DEFAULT_TIMEOUT,
+                 context=None):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.context = context
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def connection(self, host):
+        """Borrow a connection to ``host``.
+
+        Idle connections are reused most recently used first.  Ones that
+        have expired or that the server has already closed are thrown away.
+
+        :param host: host (and optional port) to connect to
+        :type host: string
+        :return: 2-tuple of (connection, True if it was reused)
+        :rtype: tuple
+        """
+        now = time.time()
+        with self._lock:
+            idle = self._idle.get(host, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used > self.idle_timeout or _is_stale(conn):
+                    logging.debug('discarding idle connection to %s', host)
+                    conn.close()
+                    continue
+                logging.debug('reusing pooled connection to %s', host)
+                return conn, True
+        return self.new_connection(host), False
+
+    def new_connection(self, host):
+        """Create a new (unpooled) connection to ``host``.
+
+        :rtype: :py:class:`HTTPSConnection`
+        """
+        if self.context is not None:
+            return TimedHTTPSConnection(host, timeout=self.timeout,
+                                        context=self.context)
+        return TimedHTTPSConnection(host, timeout=self.timeout)
+
+    def release(self, host, conn):
+        """Give a connection back to the pool once its response has been
+        read.  It is closed instead if the pool for ``host`` is full.
+        """
+        with self._lock:
+            idle = self._idle.setdefault(host, [])
+            if conn.sock is not None and len(idle) < self.max_idle:
+                idle.append((conn, time.time()))
+                return
+        conn.close()
+
+    def idle_count(self, host=None):
+        """Number of idle connections, for one host or all of them.
+
+        :rtype: integer
+        """
+        with self._lock:
+            if host is not None:
+                return len(self._idle.get(host, []))
+            return sum(len(idle) for idle in self._idle.values())
+
+    def clear(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    """:py:class:`HTTPSConnection` that remembers how long connecting
+    took, in ``timings``: a dict of seconds spent on name resolution
+    (``dns``), the TCP connect (``connect``) and the TLS handshake
+    (``tls``).
+
+    On Python 2 the first two cannot be told apart and the whole
+    connect is reported as ``connect``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        HTTPSConnection.__init__(self, *args, **kwargs)
+        self.timings = {}
+        # python 3 connects through this attribute
+        self._create_connection = self._timed_create_connection
+
+    def connect(self):
+        self.timings = {}
+        start = time.time()
+        HTTPSConnection.connect(self)
+        elapsed = time.time() - start
+        tcp = self.timings.get('dns', 0) + self.timings.get('connect', 0)
+        if tcp:
+            self.timings['tls'] = elapsed - tcp
+        else:
+            self.timings['connect'] = elapsed
+
+    def _timed_create_connection(self, address, timeout, source_address=None):
+        host, port = address
+        start = time.time()
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        resolved = time.time()
+        self.timings['dns'] = resolved - start
+        error = None
+        for info in infos:
+            try:
+                sock = socket.create_connection(info[4][:2], timeout,
+                                                source_address)
+            except socket.error as e:
+                error = e
+                continue
+            self.timings['connect'] = time.time() - resolved
+            return sock
+        raise error
+
+
+def _is_stale(conn):
+    """An idle connection is stale if it has no socket, or if its socket is
+    readable: with no request in flight that means the server closed it
+    (or sent something we did not ask for)."""
+    sock = conn.sock
+    if sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (ValueError, select.error):
+        return True
+    return bool(readable)
+
+
+DEFAULT_POOL = ConnectionPool()
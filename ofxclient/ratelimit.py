@@ -0,0 +1,163 @@
+"""Keeping the number of requests to each bank within its limits.
+
+Banks throttle or lock accounts that sign on too often in a short time.
+A :py:class:`RateLimiter` allows a steady number of requests per second
+(with a small burst) and at most a fixed number of requests in flight at
+once.  Limiters are shared per bank host (see :py:func:`limiter_for`) by
+every :py:class:`ofxclient.Client`, thread and asyncio task in the
+process.
+
+Limits are set through the ``rate_limit``, ``rate_burst`` and
+``max_concurrent`` client arguments, so they can be kept in the config
+file with the rest of an institution::
+
+  [...]
+  institution.client_args.rate_limit = 0.5
+  institution.client_args.max_concurrent = 2
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+import threading
+import time
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class RateLimiter(object):
+    """Token bucket plus a cap on concurrent requests
+
+    :param rate: requests per second (None for no limit)
+    :type rate: float or None
+    :param burst: requests that may be sent at once after a quiet period
+      (defaults to ``rate``, and at least 1)
+    :type burst: float or None
+    :param max_concurrent: max number of requests in flight (None for no
+      limit)
+    :type max_concurrent: integer or None
+
+    Use it as a context manager around each request::
+
+      with limiter:
+          send()
+    """
+
+    def __init__(self, rate=None, burst=None, max_concurrent=None):
+        self._cond = threading.Condition()
+        self.active = 0
+        # called once when a slot may have come free
+        self._on_release = []
+        self.configure(rate=rate, burst=burst, max_concurrent=max_concurrent)
+        self._tokens = self.burst
+        self._stamp = time.time()
+
+    def configure(self, rate=None, burst=None, max_concurrent=None):
+        """Change the limits; values may be strings, as read from a config
+        file"""
+        with self._cond:
+            self.rate = float(rate) if rate else None
+            self.burst = float(burst) if burst else max(1.0, self.rate or 1.0)
+            self.max_concurrent = \
+                int(max_concurrent) if max_concurrent else None
+            self._cond.notify_all()
+        self._released()
+        return self
+
+    def try_acquire(self, on_release=None):
+        """Take a token and a concurrency slot if both are available
+
+        :param on_release: when None is returned, this is called (once,
+          from whichever thread releases the slot) when a running request
+          finishes or the limits change
+        :type on_release: callable or None
+        :return: 0 if they were taken; otherwise how many seconds to wait
+          before trying again, or None to wait for a running request to
+          finish
+        :rtype: float or None
+        """
+        with self._cond:
+            wait = self._try_acquire()
+            if wait is None and on_release is not None:
+                self._on_release.append(on_release)
+            return wait
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        with self._cond:
+            while True:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return
+                self._cond.wait(wait)
+
+    def release(self):
+        """Give back the concurrency slot of a finished request"""
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+        self._released()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def _released(self):
+        with self._cond:
+            callbacks, self._on_release = self._on_release, []
+        for callback in callbacks:
+            callback()
+
+    def _try_acquire(self):
+        if self.max_concurrent and self.active >= self.max_concurrent:
+            return None
+        if self.rate:
+            now = time.time()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self.active += 1
+        return 0
+
+
+def limiter_for(host, rate=None, burst=None, max_concurrent=None):
+    """The shared :py:class:`RateLimiter` of a bank host
+
+    It is created with the given limits the first time; after that the
+    limits are updated when any are given, so the last client with limits
+    to ask sets them.
+
+    :rtype: :py:class:`RateLimiter`
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = RateLimiter(
+                rate=rate, burst=burst, max_concurrent=max_concurrent)
+        elif (rate or burst or max_concurrent) and (
+                (limiter.rate, limiter.max_concurrent) !=
+                (_float(rate), _int(max_concurrent)) or
+                (burst and float(burst) != limiter.burst)):
+            limiter.configure(rate=rate, burst=burst,
+                              max_concurrent=max_concurrent)
+        return limiter
+
+
+def reset_limiters():
+    """Forget every shared limiter"""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def _float(value):
+    return float(value) if value else None
+
+
+def _int(value):
+    return int(value) if value else None
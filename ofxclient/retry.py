@@ -0,0 +1,353 @@
+"""Retrying failed requests, and not hammering banks that are down.
+
+A :py:class:`RetryPolicy` decides which failures are worth another try -
+connection errors, HTTP 5xx responses and OFX status codes that are known
+to be transient - and how long to wait before it, with exponential
+backoff and jitter.  Timeouts are not retried unless asked for: the bank
+may have carried out a request that timed out.
+
+A :py:class:`CircuitBreaker` per bank url counts consecutive failures;
+after too many it opens and requests fail right away with
+:py:class:`CircuitOpenError` until ``reset_timeout`` has passed, when one
+trial request is let through.
+
+Example::
+
+  from ofxclient import retry
+
+  # no retries, for every client from now on
+  retry.DEFAULT_POLICY = retry.RetryPolicy(max_attempts=1)
+
+  # or for one institution, timeouts included
+  institution.client_args['retry_policy'] = retry.RetryPolicy(
+      max_attempts=5, backoff=2, retry_timeouts=True)
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+try:
+    # python 3
+    from http.client import HTTPException
+except ImportError:
+    # python 2
+    from httplib import HTTPException
+import logging
+import random
+import socket
+import threading
+import time
+
+from ofxclient import sgml
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF = 1
+DEFAULT_MAX_BACKOFF = 30
+
+# HTTP statuses worth retrying
+TRANSIENT_HTTP_STATUSES = (500, 502, 503, 504)
+
+# signon STATUS codes worth retrying: 2000 is the OFX "general error"
+# banks send when they cannot process a request right now
+TRANSIENT_OFX_CODES = (2000,)
+
+# exceptions that mean a request timed out (asyncio has its own)
+try:
+    # python 3
+    TIMEOUT_ERRORS = (socket.timeout, TimeoutError)
+except NameError:
+    # python 2
+    TIMEOUT_ERRORS = (socket.timeout,)
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 60
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a bank that is known to be
+    down"""
+
+
+class RetryPolicy(object):
+    """Which failed requests to retry, how often and after how long
+
+    The n-th retry waits a random time between 0 and ``backoff * 2 **
+    (n - 1)`` seconds, capped at ``max_backoff`` ("full jitter"), so that
+    many clients failing at once do not all come back at once.
+
+    :param max_attempts: max number of times a request is sent, including
+      the first; 1 disables retrying
+    :type max_attempts: integer
+    :param backoff: base delay in seconds
+    :type backoff: integer or float
+    :param max_backoff: longest delay in seconds
+    :type max_backoff: integer or float
+    :param jitter: randomize delays; without it every delay is the cap
+    :type jitter: boolean
+    :param http_statuses: HTTP statuses to retry
+    :type http_statuses: tuple
+    :param ofx_codes: signon STATUS codes to retry
+    :type ofx_codes: tuple
+    :param errors: exception classes to retry
+    :type errors: tuple
+    :param retry_timeouts: also retry requests that timed out (even if
+      they are instances of ``errors``)
+    :type retry_timeouts: boolean
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF,
+                 jitter=True, http_statuses=TRANSIENT_HTTP_STATUSES,
+                 ofx_codes=TRANSIENT_OFX_CODES,
+                 errors=(socket.error, HTTPException), retry_timeouts=False):
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.http_statuses = tuple(http_statuses)
+        self.ofx_codes = tuple(ofx_codes)
+        self.errors = tuple(errors)
+        self.retry_timeouts = retry_timeouts
+
+    def delay(self, attempt):
+        """Seconds to wait after failed attempt number ``attempt``
+        (starting at 1)
+
+        :rtype: float
+        """
+        cap = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            return random.uniform(0, cap)
+        return cap
+
+    def retryable_error(self, error):
+        """Is an exception raised while posting worth a retry?
+
+        :rtype: boolean
+        """
+        if isinstance(error, TIMEOUT_ERRORS):
+            return self.retry_timeouts
+        return isinstance(error, self.errors)
+
+    def retryable_response(self, status, response):
+        """Is a response worth a retry?
+
+        :param status: HTTP status
+        :type status: integer
+        :param response: response body
+        :type response: bytes
+        :rtype: boolean
+        """
+        if status in self.http_statuses:
+            return True
+        if self.ofx_codes and response:
+            signon = sgml.signon_status(response)
+            if signon is not None and signon[0] in self.ofx_codes:
+                return True
+        return False
+
+
+class CircuitBreaker(object):
+    """Stops requests to a bank after ``failure_threshold`` consecutive
+    failures, for ``reset_timeout`` seconds
+
+    After that one trial request is let through: if it succeeds the
+    breaker closes again, otherwise it stays open for another
+    ``reset_timeout``.  Safe to share between threads.
+
+    :param failure_threshold: consecutive failures that open the breaker
+    :type failure_threshold: integer
+    :param reset_timeout: seconds the breaker stays open
+    :type reset_timeout: integer or float
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def allow(self):
+        """May a request be sent now?  In the half-open state only the
+        first caller gets True, for the trial request.
+
+        :rtype: boolean
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self._opened = time.time()
+            self._trial = False
+
+    def release(self):
+        """Give back the trial slot of a request that ended without
+        telling whether the bank works (it was cancelled, or failed on
+        our side), so that the next request can be the trial"""
+        with self._lock:
+            self._trial = False
+
+    def _state(self):
+        if self._opened is None:
+            return self.CLOSED
+        if time.time() - self._opened >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+
+# used by every Client that is not given a retry_policy
+DEFAULT_POLICY = RetryPolicy()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(url):
+    """The shared :py:class:`CircuitBreaker` of a bank url
+
+    :rtype: :py:class:`CircuitBreaker`
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(url)
+        if breaker is None:
+            breaker = _breakers[url] = CircuitBreaker()
+        return breaker
+
+
+def reset_breakers():
+    """Forget every shared circuit breaker"""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def check(breaker, url):
+    """Raise :py:class:`CircuitOpenError` unless ``breaker`` lets a
+    request to ``url`` through"""
+    if not breaker.allow():
+        raise CircuitOpenError('%s is failing; not retrying for up to %ss'
+                               % (url, breaker.reset_timeout))
+
+
+def log_retry(url, attempt, policy, reason, delay):
+    logging.warning('request to %s failed (%s); retrying in %.1fs '
+                    '(attempt %d of %d)', url, reason, delay, attempt + 1,
+                    policy.max_attempts)
+
+
+class Attempts(object):
+    """The decisions of one request's retry loop, so that the blocking
+    and the async client only differ in how they post and sleep::
+
+      attempts = Attempts(policy, breaker, url)
+      while True:
+          attempts.check()
+          try:
+              status, response = post(attempts.number)
+          except Exception as e:
+              delay = attempts.error(e)
+              if delay is None:
+                  raise
+          except BaseException:
+              attempts.cancelled()
+              raise
+          else:
+              delay = attempts.response(status, response)
+              if delay is None:
+                  return response
+          sleep(delay)
+
+    :param policy: which failures to retry
+    :type policy: :py:class:`RetryPolicy`
+    :param breaker: the circuit breaker of the bank
+    :type breaker: :py:class:`CircuitBreaker`
+    :param url: the bank url, for errors and logging
+    :type url: string
+    :param timeouts: more exception classes that mean a timeout, besides
+      :py:data:`TIMEOUT_ERRORS`
+    :type timeouts: tuple
+    """
+
+    def __init__(self, policy, breaker, url, timeouts=()):
+        self.policy = policy
+        self.breaker = breaker
+        self.url = url
+        self.timeouts = TIMEOUT_ERRORS + tuple(timeouts)
+        # the attempt being made, starting at 1
+        self.number = 1
+
+    def check(self):
+        """Raise :py:class:`CircuitOpenError` if the breaker is open"""
+        check(self.breaker, self.url)
+
+    def error(self, error):
+        """The attempt raised ``error``
+
+        Errors of the bank (the policy's ``errors`` and timeouts) count
+        against the breaker; others, like bugs, do not.
+
+        :return: seconds to wait before the next attempt, or None if
+          ``error`` is to be raised
+        :rtype: float or None
+        """
+        if isinstance(error, self.timeouts):
+            retryable = self.policy.retry_timeouts
+        elif self.policy.retryable_error(error):
+            retryable = True
+        else:
+            self.breaker.release()
+            return None
+        self.breaker.failure()
+        if not retryable:
+            return None
+        return self._next(repr(error))
+
+    def response(self, status, response):
+        """The attempt got a response
+
+        :return: seconds to wait before the next attempt, or None if
+          ``response`` is to be returned
+        :rtype: float or None
+        """
+        if not self.policy.retryable_response(status, response):
+            self.breaker.success()
+            return None
+        self.breaker.failure()
+        return self._next('status %s' % status)
+
+    def cancelled(self):
+        """The attempt ended without telling whether the bank works"""
+        self.breaker.release()
+
+    def _next(self, reason):
+        if self.number >= self.policy.max_attempts:
+            return None
+        delay = self.policy.delay(self.number)
+        log_retry(self.url, self.number, self.policy, reason, delay)
+        self.number += 1
+        return delay
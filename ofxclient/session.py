@@ -0,0 +1,164 @@
+"""Reusing what a bank hands out at signon for the requests after it.
+
+Some banks take seconds to authenticate a signon.  Most of them set HTTP
+cookies for the session, and an OFX signon response may carry a
+SESSCOOKIE, which the client is to send back with its next signon, and
+a USERKEY (with TSKEYEXPIRE), which stands in for the user id and
+password until it expires.
+
+Every :py:class:`ofxclient.Institution` keeps one :py:class:`Session`,
+shared by all its accounts and threads, and
+:py:class:`ofxclient.Client` sends what it holds with every request.
+Values are dropped when they expire; cookies and a SESSCOOKIE without an
+expiry are kept for ``max_age`` seconds.  When a bank refuses a signon
+made with them, the session is cleared and the request is sent again
+with a full signon.
+
+Banks that mishandle this can be left out with a client argument::
+
+  institution.client_args['reuse_session'] = False
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+import calendar
+from email.utils import mktime_tz, parsedate_tz
+import threading
+import time
+
+from ofxclient import sgml
+
+DEFAULT_MAX_AGE = 10 * 60
+
+
+class Session(object):
+    """HTTP cookies and OFX session tokens of one login at a bank
+
+    :param max_age: seconds to keep values the bank gave no expiry for
+    :type max_age: integer or float
+    """
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget everything, so that the next signon is a full one"""
+        with self._lock:
+            # name -> (value, expires)
+            self._cookies = {}
+            # (value, expires)
+            self._sesscookie = None
+            # (username, value, expires)
+            self._userkey = None
+
+    def cookie_header(self, now=None):
+        """Value for the ``Cookie`` header, or None if there are no live
+        cookies
+
+        :rtype: string or None
+        """
+        now = now or time.time()
+        with self._lock:
+            self._cookies = dict((name, cookie) for name, cookie
+                                 in self._cookies.items() if cookie[1] > now)
+            if not self._cookies:
+                return None
+            return '; '.join('%s=%s' % (name, self._cookies[name][0])
+                             for name in sorted(self._cookies))
+
+    def set_cookies(self, headers, now=None):
+        """Keep the cookies of ``Set-Cookie`` headers
+
+        A cookie with a ``Max-Age`` of 0 or an ``Expires`` in the past is
+        removed.
+
+        :param headers: the values of the ``Set-Cookie`` headers of a
+          response, one per cookie
+        :type headers: list
+        """
+        now = now or time.time()
+        with self._lock:
+            for header in headers:
+                cookie = _parse_set_cookie(header, now, self.max_age)
+                if cookie is None:
+                    continue
+                name, value, expires = cookie
+                if expires > now:
+                    self._cookies[name] = (value, expires)
+                else:
+                    self._cookies.pop(name, None)
+
+    def signon_fields(self, username, now=None):
+        """Session elements to put in a SONRQ for ``username``
+
+        :return: dict with SESSCOOKIE and USERKEY, if there are live ones
+        :rtype: dict
+        """
+        now = now or time.time()
+        fields = {}
+        with self._lock:
+            if self._sesscookie and self._sesscookie[1] > now:
+                fields['SESSCOOKIE'] = self._sesscookie[0]
+            userkey = self._userkey
+            if userkey and userkey[0] == username and userkey[2] > now:
+                fields['USERKEY'] = userkey[1]
+        return fields
+
+    def update(self, response, username, now=None):
+        """Keep the SESSCOOKIE and USERKEY of a signon response; forget
+        everything if the signon failed
+
+        :param response: OFX response
+        :type response: bytes
+        :param username: the user the request signed on as
+        :type username: string
+        :return: the signon status, see :py:func:`ofxclient.sgml.signon`
+        :rtype: tuple or None
+        """
+        now = now or time.time()
+        status, values = sgml.signon(response)
+        if status is None or status[0] != 0:
+            self.clear()
+            return status
+        with self._lock:
+            if values.get('SESSCOOKIE'):
+                self._sesscookie = (values['SESSCOOKIE'], now + self.max_age)
+            if values.get('USERKEY'):
+                expires = _ofx_time(values.get('TSKEYEXPIRE')) or \
+                    now + self.max_age
+                self._userkey = (username, values['USERKEY'], expires)
+        return status
+
+
+def _parse_set_cookie(header, now, max_age):
+    """(name, value, expires) of a ``Set-Cookie`` header, or None"""
+    parts = [p.strip() for p in header.split(';')]
+    name, sep, value = parts[0].partition('=')
+    if not sep or not name.strip():
+        return None
+    expires = now + max_age
+    attributes = {}
+    for part in parts[1:]:
+        key, _, attr = part.partition('=')
+        attributes[key.strip().lower()] = attr.strip()
+    if 'max-age' in attributes:
+        try:
+            expires = now + int(attributes['max-age'])
+        except ValueError:
+            pass
+    elif 'expires' in attributes:
+        parsed = parsedate_tz(attributes['expires'])
+        if parsed is not None:
+            expires = mktime_tz(parsed)
+    return name.strip(), value.strip(), expires
+
+
+def _ofx_time(value):
+    """Seconds since the epoch of an OFX date, taken as GMT (ignoring
+    the time zone); None if it cannot be parsed"""
+    parsed = sgml.parse_date(value) if value else None
+    if parsed is None:
+        return None
+    return calendar.timegm(parsed.timetuple())
@@ -0,0 +1,396 @@
+"""A small streaming scanner for OFX SGML (and OFX 2 XML) responses.
+
+It is much cheaper than building a full BeautifulSoup or OfxParser tree
+when only a few values are needed, and it works on file-like objects a
+chunk at a time so memory use does not grow with the size of the
+response.
+
+Tag names are reported in upper case.  Elements (tags with a value) do
+not need closing tags; aggregates do, but a missing closing tag is
+tolerated: closing an outer aggregate closes everything inside it.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+import codecs
+from collections import namedtuple
+import datetime
+from decimal import Decimal, InvalidOperation
+import re
+
+AGGREGATE = 'aggregate'
+ELEMENT = 'element'
+END = 'end'
+
+CHUNK_SIZE = 64 * 1024
+
+ACCTINFO_TYPES = ('INVACCTINFO', 'CCACCTINFO', 'BANKACCTINFO')
+
+TransactionRecord = namedtuple('TransactionRecord', [
+    'fitid', 'date', 'amount', 'name', 'memo', 'type'
+])
+
+_TAG = re.compile(r'<([^<>]*)>([^<]*)')
+_ENTITIES = [('&lt;', '<'), ('&gt;', '>'), ('&nbsp;', ' '), ('&amp;', '&')]
+
+
+def tokens(source, chunk_size=CHUNK_SIZE, encoding=None):
+    """Yield a (kind, name, value) 3-tuple for every tag in ``source``
+
+    ``kind`` is :py:data:`AGGREGATE` for an opening tag without a value,
+    :py:data:`ELEMENT` for a tag with a value and :py:data:`END` for a
+    closing tag.  ``value`` is None except for elements.  The OFX header,
+    XML declarations and comments are skipped.
+
+    :param source: OFX response
+    :type source: string, bytes or a file-like object
+    :param encoding: how to decode bytes (by default whatever the OFX
+      header says, see :py:func:`header_encoding`)
+    :type encoding: string or None
+    """
+    buf = ''
+    pos = 0
+    for chunk in _chunks(source, chunk_size, encoding):
+        buf = buf[pos:] + chunk
+        pos = 0
+        for match in _TAG.finditer(buf):
+            if match.end() == len(buf):
+                # the value may go on in the next chunk
+                pos = match.start()
+                break
+            pos = match.end()
+            token = _token(match)
+            if token is not None:
+                yield token
+    for match in _TAG.finditer(buf, pos):
+        token = _token(match)
+        if token is not None:
+            yield token
+
+
+def walk(source, **kwargs):
+    """Like :py:func:`tokens` but keeps track of nesting
+
+    Yields (kind, name, value, path) 4-tuples where ``path`` is a tuple of
+    the names of the enclosing aggregates.  An :py:data:`END` event is
+    yielded for every aggregate that is closed, including ones closed
+    implicitly by an outer closing tag; closing tags of elements (OFX 2)
+    are dropped.
+    """
+    stack = []
+    for kind, name, value in tokens(source, **kwargs):
+        if kind == AGGREGATE:
+            yield kind, name, value, tuple(stack)
+            stack.append(name)
+        elif kind == ELEMENT:
+            yield kind, name, value, tuple(stack)
+        elif name in stack:
+            while stack:
+                closed = stack.pop()
+                yield END, closed, None, tuple(stack)
+                if closed == name:
+                    break
+
+
+def signon_status(source):
+    """The STATUS of the signon response
+
+    Stops reading as soon as the signon response is over.
+
+    :return: 2-tuple of (integer code, message) or None if the response
+      has no SONRS; the code is None if the SONRS has no CODE
+    :rtype: tuple or None
+    """
+    status = _SignonStatus()
+    for event in walk(source):
+        status.feed(*event)
+        if status.done:
+            break
+    return status.result()
+
+
+def signon(source):
+    """The STATUS and the other elements of the signon response, like
+    SESSCOOKIE, USERKEY and TSKEYEXPIRE
+
+    Stops reading as soon as the signon response is over.
+
+    :return: 2-tuple of (status as returned by :py:func:`signon_status`,
+      dict of element name to value, the first one of each)
+    :rtype: tuple
+    """
+    status = _SignonStatus()
+    for event in walk(source):
+        status.feed(*event)
+        if status.done:
+            break
+    return status.result(), status.values
+
+
+def statuses(source):
+    """The STATUS of the signon response and of every transaction
+    response (the ``*TRNRS`` aggregates, like STMTTRNRS), read in a
+    single pass
+
+    :return: 2-tuple of (signon status as returned by
+      :py:func:`signon_status`, list of (aggregate name, code, message)
+      3-tuples, one per transaction response in the order they appear;
+      the code is None if the STATUS has no CODE)
+    :rtype: tuple
+    """
+    signon = _SignonStatus()
+    responses = []
+    for kind, name, value, path in walk(source):
+        signon.feed(kind, name, value, path)
+        if kind == AGGREGATE and name.endswith('TRNRS'):
+            responses.append([name, None, None])
+        elif kind == ELEMENT and responses and path[-2:] == \
+                (responses[-1][0], 'STATUS'):
+            if name == 'CODE' and responses[-1][1] is None:
+                responses[-1][1] = value
+            elif name == 'MESSAGE' and responses[-1][2] is None:
+                responses[-1][2] = value
+    return signon.result(), [
+        (name, int(code) if code is not None else None, message or '')
+        for name, code, message in responses]
+
+
+def account_list(source):
+    """The signon status and the accounts of an ACCTINFO response, read
+    in a single pass
+
+    Every account is a dict with a ``type`` (the name of its
+    BANKACCTINFO, CCACCTINFO or INVACCTINFO aggregate), ``desc`` and the
+    elements of that aggregate, e.g. ``ACCTID``, ``BANKID``,
+    ``ACCTTYPE`` or ``BROKERID``.  When an ACCTINFO has more than one of
+    those aggregates, investment beats credit card beats bank, as it
+    does in ofxparse.
+
+    :return: 2-tuple of (status as returned by :py:func:`signon_status`,
+      list of account dicts)
+    :rtype: tuple
+    """
+    status = _SignonStatus()
+    accounts = []
+    current = None
+    for kind, name, value, path in walk(source):
+        status.feed(kind, name, value, path)
+        if kind == AGGREGATE and name == 'ACCTINFO':
+            current = {'desc': None}
+        elif current is None:
+            continue
+        elif kind == ELEMENT:
+            if name == 'DESC' and current['desc'] is None:
+                current['desc'] = value
+            for acctinfo in ACCTINFO_TYPES:
+                if acctinfo in path:
+                    current.setdefault(acctinfo, {}).setdefault(name, value)
+        elif kind == END and name == 'ACCTINFO':
+            for acctinfo in ACCTINFO_TYPES:
+                if acctinfo in current:
+                    account = dict(current[acctinfo])
+                    account['type'] = acctinfo
+                    account['desc'] = current['desc']
+                    accounts.append(account)
+                    break
+            current = None
+    return status.result(), accounts
+
+
+def transactions(source, **kwargs):
+    """Yield a :py:class:`TransactionRecord` for every transaction in a
+    statement response, as soon as its aggregate closes
+
+    Bank and credit card transactions are STMTTRN aggregates (also inside
+    an INVBANKTRAN); investment transactions are the other aggregates of
+    an INVTRANLIST (BUYSTOCK, INCOME, ...).  ``date`` is DTPOSTED or
+    DTTRADE, ``amount`` TRNAMT or TOTAL, and ``type`` the lower case
+    TRNTYPE or investment aggregate name, like ofxparse reports them.
+    Nothing but the transaction being read is kept in memory.
+    """
+    current = None
+    for kind, name, value, path in walk(source, **kwargs):
+        if kind == AGGREGATE:
+            if current is None and (
+                    name == 'STMTTRN' or
+                    (path and path[-1] == 'INVTRANLIST' and
+                     name != 'INVBANKTRAN')):
+                current = (name, len(path), {})
+        elif current is None:
+            continue
+        elif kind == ELEMENT:
+            current[2].setdefault(name, value)
+        elif kind == END and name == current[0] and len(path) == current[1]:
+            yield _transaction_record(current[0], current[2])
+            current = None
+
+
+def parse_date(value):
+    """:py:class:`datetime.datetime` of an OFX date, ignoring the time
+    zone; None if it cannot be parsed"""
+    for fmt, length in (('%Y%m%d%H%M%S', 14), ('%Y%m%d%H%M', 12),
+                        ('%Y%m%d', 8)):
+        try:
+            return datetime.datetime.strptime(value[:length], fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _transaction_record(aggregate, values):
+    if aggregate == 'STMTTRN':
+        date = values.get('DTPOSTED')
+        amount = values.get('TRNAMT')
+        name = values.get('NAME')
+        kind = values.get('TRNTYPE', '').lower()
+    else:
+        date = values.get('DTTRADE')
+        amount = values.get('TOTAL')
+        name = values.get('UNIQUEID')
+        kind = aggregate.lower()
+    return TransactionRecord(
+        fitid=values.get('FITID'),
+        date=parse_date(date) if date else None,
+        amount=_decimal(amount),
+        name=name,
+        memo=values.get('MEMO'),
+        type=kind
+    )
+
+
+def _decimal(value):
+    if value is None:
+        return None
+    try:
+        return Decimal(value.replace(',', '.'))
+    except InvalidOperation:
+        return None
+
+
+class _SignonStatus(object):
+
+    def __init__(self):
+        self.seen = False
+        self.done = False
+        self.code = None
+        self.message = None
+        self.values = {}
+
+    def feed(self, kind, name, value, path):
+        if self.done:
+            return
+        if kind == AGGREGATE and name == 'SONRS':
+            self.seen = True
+        elif kind == END and name == 'SONRS':
+            self.done = True
+        elif kind == ELEMENT and 'SONRS' in path:
+            self.values.setdefault(name, value)
+            if name == 'CODE' and self.code is None:
+                self.code = value
+            elif name == 'MESSAGE' and self.message is None:
+                self.message = value
+
+    def result(self):
+        if not self.seen:
+            return None
+        code = int(self.code) if self.code is not None else None
+        return code, self.message or ''
+
+
+def decode(data, encoding=None):
+    """Decode a raw OFX response to text, using the character set its
+    header declares unless ``encoding`` is given
+
+    :param data: raw OFX response
+    :type data: bytes
+    :rtype: string
+    """
+    return data.decode(encoding or header_encoding(data), 'replace')
+
+
+def header_encoding(data):
+    """Python codec for the character set declared by the header of a raw
+    OFX response
+
+    Understands the OFX 1.x ENCODING/CHARSET header lines (ENCODING:UNICODE
+    is UTF-8, whatever the CHARSET) and the XML declaration of OFX 2.x.
+    Falls back to Windows-1252, the most common character set for OFX 1.x.
+
+    :param data: (the start of) a raw OFX response
+    :type data: bytes
+    :rtype: string
+    """
+    head = data[:_HEADER_SIZE].split(b'<OFX>', 1)[0]
+    xml = _XML_ENCODING.search(head)
+    if xml:
+        return _codec(xml.group(1).decode('ascii'), 'cp1252')
+    encoding = _HEADER_ENCODING.search(head)
+    if encoding and encoding.group(1).upper() in _UTF8_ENCODINGS:
+        return 'utf-8'
+    charset = _HEADER_CHARSET.search(head)
+    if charset:
+        return _codec(charset.group(1).decode('ascii'), 'cp1252')
+    return 'cp1252'
+
+
+def _codec(name, default):
+    name = name.upper()
+    if name in _CHARSETS:
+        return _CHARSETS[name]
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return default
+
+
+_HEADER_SIZE = 1024
+_XML_ENCODING = re.compile(br'<\?xml[^>]*encoding=["\']([\w.-]+)["\']', re.I)
+_HEADER_ENCODING = re.compile(br'ENCODING:\s*([\w-]+)', re.I)
+_HEADER_CHARSET = re.compile(br'CHARSET:\s*([\w-]+)', re.I)
+# OFX 1.x calls UTF-8 "UNICODE"
+_UTF8_ENCODINGS = (b'UTF-8', b'UTF8', b'UNICODE')
+_CHARSETS = {
+    '1252': 'cp1252',
+    'NONE': 'cp1252',
+    'ISO-8859-1': 'latin-1',
+    '8859-1': 'latin-1',
+}
+
+
+def _chunks(source, chunk_size, encoding):
+    if not hasattr(source, 'read'):
+        if isinstance(source, bytes):
+            source = decode(source, encoding)
+        yield source
+        return
+    decoder = None
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, bytes):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(
+                    encoding or header_encoding(chunk))('replace')
+            chunk = decoder.decode(chunk)
+        yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b'', True)
+        if tail:
+            yield tail
+
+
+def _token(match):
+    tag = match.group(1).strip()
+    if not tag or tag[0] in '?!':
+        return None
+    if tag[0] == '/':
+        return END, tag[1:].strip().upper(), None
+    if tag[-1] == '/':
+        return ELEMENT, tag[:-1].strip().upper(), ''
+    value = match.group(2).strip()
+    if not value:
+        return AGGREGATE, tag.upper(), None
+    if '&' in value:
+        for entity, char in _ENTITIES:
+            value = value.replace(entity, char)
+    return ELEMENT, tag.upper(), value
@@ -0,0 +1,238 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+from collections import namedtuple
+import datetime
+from decimal import ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_EVEN, Decimal
+import os
+import os.path
+import sqlite3
+import threading
+
+try:
+    DEFAULT_STORE = os.path.expanduser(os.path.join('~', 'ofxclient.db'))
+except:
+    DEFAULT_STORE = None
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# amounts are kept exactly as text, and for range queries as an integer
+# number of units of 10 ** -AMOUNT_PLACES
+AMOUNT_PLACES = 4
+
+StoredTransaction = namedtuple('StoredTransaction', [
+    'account', 'fitid', 'date', 'amount', 'type', 'payee', 'memo',
+    'checknum'
+])
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS transactions (
+        account TEXT NOT NULL,
+        fitid TEXT NOT NULL,
+        date TEXT,
+        amount TEXT,
+        amount_units INTEGER,
+        type TEXT,
+        payee TEXT,
+        memo TEXT,
+        checknum TEXT,
+        PRIMARY KEY (account, fitid)
+    )""",
+    """CREATE INDEX IF NOT EXISTS transactions_account_date
+        ON transactions (account, date)""",
+    """CREATE INDEX IF NOT EXISTS transactions_account_amount
+        ON transactions (account, amount_units)""",
+]
+
+
+class TransactionStore(object):
+    """Local SQLite store of downloaded transactions.
+
+    Transactions are keyed on (account local_id, FITID), so ingesting
+    overlapping downloads of the same account never creates duplicates;
+    a transaction the bank sends again simply replaces the stored copy.
+
+    :param file_name: path of the SQLite database, or ':memory:'
+      (defaults to $USERS_HOME/ofxclient.db)
+    :type file_name: string or None
+
+    Example::
+
+      from ofxclient.store import TransactionStore
+
+      store = TransactionStore()
+      store.sync(account, days=30)
+      for t in store.transactions(account, start=datetime.date(2019, 1, 1)):
+          print(t.date, t.amount, t.payee)
+    """
+
+    def __init__(self, file_name=None):
+        f = file_name or DEFAULT_STORE
+        if f is None:
+            raise ValueError('file_name is required')
+        self.file_name = f
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(f, check_same_thread=False)
+        with self._db:
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+
+    def close(self):
+        self._db.close()
+
+    def sync(self, account, days=60):
+        """Download an account's statement and ingest it
+
+        :rtype: integer - number of transactions ingested
+        """
+        return self.ingest(account, account.statement(days=days))
+
+    def ingest(self, account, statement):
+        """Store (or update) every transaction of a statement in one
+        transaction.
+
+        :param account: the account the statement belongs to
+        :type account: :py:class:`ofxclient.Account` or local_id string
+        :param statement: a downloaded statement
+        :type statement: :py:class:`ofxparse.Statement`
+        :rtype: integer - number of transactions ingested
+        """
+        return self.ingest_transactions(account, statement.transactions)
+
+    def ingest_transactions(self, account, transactions):
+        """Store (or update) :py:class:`ofxparse.Transaction` or
+        :py:class:`ofxparse.InvestmentTransaction` objects.
+
+        :rtype: integer - number of transactions ingested
+        """
+        local_id = _local_id(account)
+        rows = [_row(local_id, t) for t in transactions]
+        with self._lock:
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO transactions '
+                    '(account, fitid, date, amount, amount_units, type, '
+                    'payee, memo, checknum) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def transactions(self, account, start=None, end=None,
+                     min_amount=None, max_amount=None):
+        """Stored transactions of an account, oldest first.
+
+        :param account: account to look up
+        :type account: :py:class:`ofxclient.Account` or local_id string
+        :param start: only transactions on or after this date
+        :type start: :py:class:`datetime.date` or None
+        :param end: only transactions before this date
+        :type end: :py:class:`datetime.date` or None
+        :param min_amount: only transactions of at least this amount
+          (compared exactly for amounts of up to :py:data:`AMOUNT_PLACES`
+          decimal places)
+        :type min_amount: number or None
+        :param max_amount: only transactions of at most this amount
+        :type max_amount: number or None
+        :rtype: list of :py:class:`StoredTransaction`
+        """
+        where = ['account = ?']
+        args = [_local_id(account)]
+        if start is not None:
+            where.append('date >= ?')
+            args.append(_format_date(start))
+        if end is not None:
+            where.append('date < ?')
+            args.append(_format_date(end))
+        if min_amount is not None:
+            where.append('amount_units >= ?')
+            args.append(_amount_units(min_amount, ROUND_CEILING))
+        if max_amount is not None:
+            where.append('amount_units <= ?')
+            args.append(_amount_units(max_amount, ROUND_FLOOR))
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT account, fitid, date, amount, type, payee, memo, '
+                'checknum FROM transactions WHERE %s ORDER BY date, fitid'
+                % ' AND '.join(where), args).fetchall()
+        return [_stored(r) for r in rows]
+
+    def transaction(self, account, fitid):
+        """One stored transaction by FITID, or None
+
+        :rtype: :py:class:`StoredTransaction` or None
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT account, fitid, date, amount, type, payee, memo, '
+                'checknum FROM transactions WHERE account = ? AND fitid = ?',
+                (_local_id(account), fitid)).fetchone()
+        return _stored(row) if row else None
+
+    def count(self, account=None):
+        """Number of stored transactions, for one account or all of them
+
+        :rtype: integer
+        """
+        with self._lock:
+            if account is None:
+                cursor = self._db.execute('SELECT COUNT(*) FROM transactions')
+            else:
+                cursor = self._db.execute(
+                    'SELECT COUNT(*) FROM transactions WHERE account = ?',
+                    (_local_id(account),))
+            return cursor.fetchone()[0]
+
+
+def _local_id(account):
+    if hasattr(account, 'local_id'):
+        return account.local_id()
+    return account
+
+
+def _format_date(value):
+    if value is None:
+        return None
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    return value.strftime(DATE_FORMAT)
+
+
+def _decimal(value):
+    if isinstance(value, float):
+        # the shortest repr, not the binary expansion
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def _amount_units(amount, rounding=ROUND_HALF_EVEN):
+    return int(_decimal(amount).scaleb(AMOUNT_PLACES).to_integral_value(
+        rounding))
+
+
+def _row(local_id, t):
+    # investment transactions have a tradeDate/total instead
+    date = getattr(t, 'date', None) or getattr(t, 'tradeDate', None)
+    amount = getattr(t, 'amount', None)
+    if amount is None:
+        amount = getattr(t, 'total', None)
+    if amount is not None:
+        amount = _decimal(amount)
+    return (
+        local_id,
+        t.id,
+        _format_date(date),
+        str(amount) if amount is not None else None,
+        _amount_units(amount) if amount is not None else None,
+        getattr(t, 'type', None),
+        getattr(t, 'payee', None),
+        getattr(t, 'memo', None),
+        getattr(t, 'checknum', None),
+    )
+
+
+def _stored(row):
+    row = list(row)
+    if row[2] is not None:
+        row[2] = datetime.datetime.strptime(row[2], DATE_FORMAT)
+    if row[3] is not None:
+        row[3] = Decimal(row[3])
+    return StoredTransaction(*row)
@@ -0,0 +1,198 @@
+"""Downloading many accounts in one go, each to its own file.
+
+:py:func:`sync_accounts` downloads accounts in parallel (see
+:py:func:`ofxclient.util.iter_downloads`), writes each one to
+``<output_dir>/<local id>.ofx`` and returns a summary that can be written
+as JSON: per account whether it worked, how many bytes came back and the
+timings of every request it took (see :py:mod:`ofxclient.timing`), so it
+is clear where the time of a large run went.
+
+From the command line::
+
+  ofxclient sync --output-dir /tmp/ofx --jobs 8 --institution amex
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+from contextlib import contextmanager
+import os
+import os.path
+import time
+
+from ofxclient import sgml
+from ofxclient.account import BankAccount, BrokerageAccount, CreditCardAccount
+from ofxclient.util import iter_downloads, write_atomic
+
+ACCOUNT_TYPES = {
+    'bank': BankAccount,
+    'creditcard': CreditCardAccount,
+    'brokerage': BrokerageAccount,
+}
+
+
+def select_accounts(accounts, ids=None, institutions=None, types=None):
+    """The accounts that match every filter given
+
+    :param ids: account local ids
+    :type ids: list or None
+    :param institutions: institutions, each matched against the local id,
+      FI id, org and description of an account's institution (ignoring
+      case)
+    :type institutions: list or None
+    :param types: keys of :py:data:`ACCOUNT_TYPES`
+    :type types: list or None
+    :rtype: list of :py:class:`ofxclient.Account`, in the order given
+    """
+    ids = set(ids or [])
+    wanted = set(i.lower() for i in institutions or [])
+    classes = tuple(ACCOUNT_TYPES[t] for t in types or [])
+    selected = []
+    for a in accounts:
+        if ids and a.local_id() not in ids:
+            continue
+        if wanted and not wanted.intersection(_institution_names(a)):
+            continue
+        if classes and not isinstance(a, classes):
+            continue
+        selected.append(a)
+    return selected
+
+
+def sync_accounts(accounts, output_dir, days=60, workers=4,
+                  per_institution=None):
+    """Download accounts in parallel, each to its own file in
+    ``output_dir``
+
+    A failed account does not stop the others; it is reported in the
+    summary and no file is written for it.  A download fails when it
+    raises, and also when the bank answers with an HTTP error or without
+    a successful signon (see :py:func:`download_error`).
+
+    :param accounts: accounts to download
+    :type accounts: list of :py:class:`ofxclient.Account`
+    :param output_dir: directory for the files (created if missing)
+    :type output_dir: string
+    :param days: Number of days to look back at
+    :type days: integer
+    :param workers: max number of concurrent downloads
+    :type workers: integer
+    :param per_institution: max number of concurrent downloads per
+      institution (optional)
+    :type per_institution: integer or None
+    :return: summary with ``started``, ``seconds``, ``succeeded``,
+      ``failed``, ``bytes`` and ``accounts``, one dict per account in the
+      order given
+    :rtype: dict
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    accounts = list(accounts)
+    started = time.time()
+    results = []
+    with recording_requests(accounts) as timings:
+        for account, data, error in iter_downloads(
+                accounts, days=days, workers=workers,
+                per_institution=per_institution, raw=True):
+            events = timings[id(account)]
+            if error is None:
+                error = download_error(data, events)
+            file_name = None
+            if error is None:
+                file_name = os.path.join(output_dir,
+                                         '%s.ofx' % account.local_id())
+                try:
+                    write_atomic(file_name, data)
+                except (IOError, OSError) as e:
+                    error, file_name = e, None
+            results.append(_account_summary(
+                account, data, error, file_name, events))
+
+    failed = sum(1 for r in results if not r['ok'])
+    return {
+        'started': started,
+        'seconds': time.time() - started,
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'bytes': sum(r['bytes'] for r in results),
+        'accounts': results,
+    }
+
+
+def download_error(data, events=()):
+    """Why a download that raised nothing still failed, if it did
+
+    :param data: the raw response
+    :type data: bytes
+    :param events: the timings of the requests it took (see
+      :py:func:`recording_requests`), to check the HTTP status of the
+      last one
+    :type events: list of :py:class:`ofxclient.timing.RequestTiming`
+    :return: the error, or None if the response has a successful signon
+    :rtype: :py:class:`ValueError` or None
+    """
+    requests = [e for e in events if e.kind == 'request']
+    if requests and (requests[-1].status or 0) >= 400:
+        return ValueError('HTTP status %s' % requests[-1].status)
+    status = sgml.signon_status(data)
+    if status is None:
+        return ValueError('no signon response')
+    code, message = status
+    if code != 0:
+        return ValueError('signon failed with code %s: %s' % (code, message))
+    return None
+
+
+@contextmanager
+def recording_requests(accounts):
+    """Collect the timing events of every account while in the block
+
+    Yields a dict of ``id(account)`` to the list of its events.
+    """
+    timings = dict((id(a), []) for a in accounts)
+    for a in accounts:
+        # list.append is atomic, so parallel requests can share the hook
+        a.add_hook(timings[id(a)].append)
+    try:
+        yield timings
+    finally:
+        for a in accounts:
+            a.hooks.remove(timings[id(a)].append)
+
+
+def _account_summary(account, data, error, file_name, events):
+    requests = [e for e in events if e.kind == 'request']
+    seconds = None
+    if requests:
+        seconds = max(r.started + (r.total or 0) for r in requests) - \
+            min(r.started for r in requests)
+    phases = {}
+    for r in requests:
+        for phase, value in r.phases.items():
+            phases[phase] = phases.get(phase, 0) + value
+    return {
+        'local_id': account.local_id(),
+        'description': account.long_description(),
+        'institution': account.institution.local_id(),
+        'type': _type_name(account),
+        'ok': error is None,
+        'error': repr(error) if error is not None else None,
+        'file': file_name,
+        'bytes': len(data) if data is not None and error is None else 0,
+        'seconds': seconds,
+        'phases': phases,
+        'requests': [r.as_dict() for r in requests],
+    }
+
+
+def _institution_names(account):
+    institution = account.institution
+    names = (institution.local_id(), institution.id, institution.org,
+             institution.description)
+    return set(('%s' % name).lower() for name in names if name)
+
+
+def _type_name(account):
+    for name, cls in ACCOUNT_TYPES.items():
+        if isinstance(account, cls):
+            return name
+    return None
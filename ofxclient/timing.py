@@ -0,0 +1,268 @@
+"""Where the time of a download goes.
+
+:py:class:`ofxclient.Client` reports a :py:class:`RequestTiming` for every
+request it sends to a bank, and :py:class:`ofxclient.Account` a
+:py:class:`ParseTiming` for every response it parses.  They are passed to
+hooks: callables registered on a client, on an account or, for every
+client and account, with :py:func:`add_hook`.
+
+:py:class:`LatencyHistograms` is a hook that keeps latency histograms per
+bank host.
+
+Example::
+
+  from ofxclient import timing
+
+  histograms = timing.LatencyHistograms()
+  timing.add_hook(histograms)
+  account.statement(days=30)
+  print(histograms.summary())
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+import bisect
+import logging
+import threading
+import time
+try:
+    # python 3
+    from urllib.parse import urlsplit
+except ImportError:
+    # python 2
+    from urlparse import urlsplit
+
+# phases of a request, in the order they happen; dns, connect and tls are
+# only there when a new connection had to be made
+PHASES = ('dns', 'connect', 'tls', 'send', 'server', 'transfer')
+
+# upper bounds, in seconds, of the buckets of a LatencyHistograms
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10,
+           30, 60, 120)
+
+_hooks = []
+_hooks_lock = threading.Lock()
+
+
+class RequestTiming(object):
+    """Timings and other facts about one request to a bank
+
+    ``phases`` maps each phase of :py:data:`PHASES` that happened to the
+    seconds spent in it:
+
+    * ``dns``, ``connect``, ``tls``: name resolution, TCP connect and TLS
+      handshake of a new connection
+    * ``send``: sending the request
+    * ``server``: waiting for the response to start - mostly the bank's
+      own processing time
+    * ``transfer``: reading the response body
+
+    When a request is sent more than once (for instance when the bank
+    asks for its session cookie back), phases and byte counts add up.
+    Retries after a failure (see :py:mod:`ofxclient.retry`) get a timing
+    of their own, with ``attempt`` counting from 1.
+    """
+
+    kind = 'request'
+
+    def __init__(self, url, host):
+        self.url = url
+        self.host = host
+        self.started = time.time()
+        self.phases = {}
+        self.total = None
+        self.status = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.reused = None
+        self.cookie_retry = False
+        self.attempt = 1
+        self.error = None
+
+    def add(self, phase, seconds):
+        """Add ``seconds`` to ``phase``"""
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def finish(self, error=None):
+        self.total = time.time() - self.started
+        self.error = error
+        return self
+
+    def as_dict(self):
+        """Everything about the request, for logging or JSON
+
+        :rtype: dict
+        """
+        return {
+            'kind': self.kind,
+            'url': self.url,
+            'host': self.host,
+            'started': self.started,
+            'phases': dict(self.phases),
+            'total': self.total,
+            'status': self.status,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'reused': self.reused,
+            'cookie_retry': self.cookie_retry,
+            'attempt': self.attempt,
+            'error': repr(self.error) if self.error is not None else None,
+        }
+
+
+class ParseTiming(object):
+    """How long parsing a downloaded response took
+
+    :param host: host of the bank the response came from
+    :param account: :py:meth:`ofxclient.Account.local_id` of the account
+    :param duration: seconds spent parsing
+    :param size: size of the response in bytes
+    """
+
+    kind = 'parse'
+
+    def __init__(self, host, account, duration, size):
+        self.host = host
+        self.account = account
+        self.duration = duration
+        self.size = size
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'host': self.host,
+            'account': self.account,
+            'duration': self.duration,
+            'size': self.size,
+        }
+
+
+class LatencyHistograms(object):
+    """Hook that keeps a latency histogram per bank host and phase
+
+    Besides the phases of :py:data:`PHASES` there are ``total`` (a whole
+    request) and ``parse`` histograms.  Safe to share between threads.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._statuses = {}
+
+    def __call__(self, event):
+        with self._lock:
+            if event.kind == 'parse':
+                self._add(event.host, 'parse', event.duration)
+                return
+            for phase, seconds in event.phases.items():
+                self._add(event.host, phase, seconds)
+            if event.total is not None:
+                self._add(event.host, 'total', event.total)
+            status = event.status if event.error is None else 'error'
+            statuses = self._statuses.setdefault(event.host, {})
+            statuses[status] = statuses.get(status, 0) + 1
+
+    def hosts(self):
+        """Hosts seen so far
+
+        :rtype: list
+        """
+        with self._lock:
+            return sorted(set(h for h, _ in self._histograms))
+
+    def histogram(self, host, phase='total'):
+        """Counts per bucket: (upper bound in seconds, count) 2-tuples; the
+        last bound is None, for everything slower than the last bucket
+
+        :rtype: list
+        """
+        with self._lock:
+            counts = list(self._histograms.get((host, phase),
+                                               {'counts': []})['counts'])
+        if not counts:
+            counts = [0] * (len(self.buckets) + 1)
+        return list(zip(self.buckets + (None,), counts))
+
+    def summary(self):
+        """Count, mean, approximate median and 95th percentile and max
+        of every phase, and the count of every HTTP status, per host
+
+        :rtype: dict
+        """
+        summary = {}
+        with self._lock:
+            for (host, phase), h in self._histograms.items():
+                summary.setdefault(host, {})[phase] = {
+                    'count': h['count'],
+                    'mean': h['sum'] / h['count'],
+                    'p50': self._percentile(h, 0.5),
+                    'p95': self._percentile(h, 0.95),
+                    'max': h['max'],
+                }
+            for host, statuses in self._statuses.items():
+                summary.setdefault(host, {})['statuses'] = dict(statuses)
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._statuses = {}
+
+    def _add(self, host, phase, seconds):
+        h = self._histograms.get((host, phase))
+        if h is None:
+            h = self._histograms[(host, phase)] = {
+                'counts': [0] * (len(self.buckets) + 1),
+                'count': 0, 'sum': 0.0, 'max': 0.0}
+        h['counts'][bisect.bisect_left(self.buckets, seconds)] += 1
+        h['count'] += 1
+        h['sum'] += seconds
+        h['max'] = max(h['max'], seconds)
+
+    def _percentile(self, h, fraction):
+        # upper bound of the bucket the percentile falls in; the max if
+        # that is lower
+        wanted = fraction * h['count']
+        seen = 0
+        for bound, count in zip(self.buckets, h['counts']):
+            seen += count
+            if seen >= wanted:
+                return min(bound, h['max'])
+        return h['max']
+
+
+def host(url):
+    """The host (and port, if any) of ``url``; what timings are grouped by
+
+    :rtype: string
+    """
+    return urlsplit(url).netloc
+
+
+def add_hook(hook):
+    """Call ``hook`` with the timings of every client and account
+
+    :param hook: callable taking a :py:class:`RequestTiming` or
+      :py:class:`ParseTiming`
+    """
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def emit(event, hooks=()):
+    """Pass ``event`` to ``hooks`` and the hooks added with
+    :py:func:`add_hook`; a hook that raises is logged and skipped"""
+    with _hooks_lock:
+        everyone = list(hooks) + _hooks
+    for hook in everyone:
+        try:
+            hook(event)
+        except Exception:
+            logging.exception('timing hook %r failed', hook)
@@ -0,0 +1,346 @@
+"""How :py:class:`ofxclient.Client` talks to banks.
+
+A transport takes a request that is ready to send - url, ordered headers
+and body - and returns the response.  :py:class:`HTTPSTransport` is the
+real thing.  :py:class:`RecordingTransport` and :py:class:`ReplayTransport`
+save exchanges to a directory and serve them back, so downloads can be
+tested, profiled and benchmarked without a network or a bank.
+
+Example::
+
+  from ofxclient.transport import RecordingTransport, ReplayTransport
+
+  # once, against the bank
+  client = institution.client()
+  client.transport = RecordingTransport('/tmp/recorded')
+  ...
+
+  # later, anywhere, as often as needed
+  client.transport = ReplayTransport('/tmp/recorded', latency=0.25)
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+try:
+    # python 3
+    from http.client import HTTPException
+except ImportError:
+    # python 2
+    from httplib import HTTPException
+import hashlib
+import io
+import json
+import logging
+import os
+import os.path
+import re
+import socket
+import threading
+import time
+try:
+    # python 3
+    from urllib.parse import splittype, splithost
+except ImportError:
+    # python 2
+    from urllib import splittype, splithost
+
+from ofxclient.pool import DEFAULT_POOL
+
+REDACTED = 'REDACTED'
+
+# request elements and headers that are never written to a recording
+SECRET_FIELDS = ('USERID', 'USERPASS', 'NEWUSERPASS', 'USERKEY', 'USERCRED1',
+                 'USERCRED2', 'AUTHTOKEN', 'SESSCOOKIE')
+SECRET_HEADERS = ('Authorization', 'Cookie', 'Set-Cookie')
+
+
+class Response(object):
+    """Status and headers of a response.
+
+    Mirrors the parts of :py:class:`http.client.HTTPResponse` that
+    :py:class:`ofxclient.Client` relies on.
+    """
+
+    def __init__(self, status, reason, headers, will_close=False):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.will_close = will_close
+
+    def getheader(self, name, default=None):
+        name = name.lower()
+        values = [v for k, v in self.headers if k.lower() == name]
+        if not values:
+            return default
+        return ', '.join(values)
+
+    def getheaders(self):
+        return list(self.headers)
+
+
+class Transport(object):
+    """Interface of a transport"""
+
+    def post(self, url, headers, body, timing=None):
+        """POST ``body`` to ``url``
+
+        :param url: where to send the request
+        :type url: string
+        :param headers: (Name, Value) header 2-tuples, in the order they
+          must be sent
+        :type headers: list
+        :param body: the OFX query
+        :type body: bytes
+        :param timing: where to record the phases of the request, as far
+          as the transport can tell them apart
+        :type timing: :py:class:`ofxclient.timing.RequestTiming` or None
+        :return: 2-tuple of (response with ``status``, ``getheader()`` and
+          ``getheaders()``, bytes response body)
+        :rtype: tuple
+        """
+        raise NotImplementedError
+
+
+class HTTPSTransport(Transport):
+    """Sends requests over HTTPS, on connections borrowed from a
+    :py:class:`ofxclient.pool.ConnectionPool`.
+
+    :param pool: pool to borrow connections from (defaults to
+      :py:data:`ofxclient.pool.DEFAULT_POOL`)
+    :type pool: :py:class:`ofxclient.pool.ConnectionPool` or None
+    """
+
+    def __init__(self, pool=None):
+        self.pool = pool or DEFAULT_POOL
+
+    def post(self, url, headers, body, timing=None):
+        garbage, path = splittype(url)
+        host, selector = splithost(path)
+        pool = self.pool
+        h, reused = pool.connection(host)
+        if timing is not None:
+            timing.reused = reused
+        try:
+            res, response = self._exchange(h, selector, headers, body,
+                                           timing)
+        except (socket.error, HTTPException):
+            h.close()
+            if not reused:
+                raise
+            # the bank closed the kept-alive socket while it sat in the
+            # pool; this is expected, so try again on a fresh connection
+            logging.debug('pooled connection to %s went away; reconnecting',
+                          host)
+            h = pool.new_connection(host)
+            if timing is not None:
+                timing.reused = False
+            try:
+                res, response = self._exchange(h, selector, headers, body,
+                                               timing)
+            except Exception:
+                h.close()
+                raise
+        if res.will_close:
+            h.close()
+        else:
+            pool.release(host, h)
+        return res, response
+
+    def _exchange(self, h, selector, headers, body, timing=None):
+        """Send one request on connection ``h`` and read the whole response.
+
+        :return: 2-tuple of (HTTPResponse, bytes response body)
+        :rtype: tuple
+        """
+        if h.sock is None:
+            # connect up front rather than as part of sending, so that it
+            # can be timed on its own
+            start = time.time()
+            h.connect()
+            if timing is not None:
+                phases = getattr(h, 'timings', None) or \
+                    {'connect': time.time() - start}
+                for phase, seconds in phases.items():
+                    timing.add(phase, seconds)
+        start = time.time()
+        # Discover requires a particular ordering of headers, so send the
+        # request step by step.
+        h.putrequest('POST', selector, skip_host=True,
+                     skip_accept_encoding=True)
+        logging.debug('---- request headers ----')
+        for hname, hval in headers:
+            logging.debug('%s: %s', hname, hval)
+            h.putheader(hname, hval)
+        logging.debug('---- request body (query) ----')
+        logging.debug(body)
+        h.endheaders(body)
+        sent = time.time()
+        res = h.getresponse()
+        started = time.time()
+        response = res.read()
+        if timing is not None:
+            timing.add('send', sent - start)
+            timing.add('server', started - sent)
+            timing.add('transfer', time.time() - started)
+        logging.debug('---- response ----')
+        logging.debug(res.__dict__)
+        logging.debug('Headers: %s', res.getheaders())
+        logging.debug(response)
+        res.close()
+        return res, response
+
+
+class RecordingTransport(Transport):
+    """Passes requests on to another transport and saves every exchange
+    to ``directory``, one JSON file each, for :py:class:`ReplayTransport`
+
+    User ids, passwords and other credentials in the request, session
+    tokens in the response (USERKEY, SESSCOOKIE), and cookie and
+    authorization headers are replaced by ``REDACTED`` before anything
+    is written.
+
+    :param directory: where to save the exchanges (created if missing)
+    :type directory: string
+    :param transport: transport that does the actual work (defaults to
+      an :py:class:`HTTPSTransport`)
+    :type transport: :py:class:`Transport` or None
+    """
+
+    def __init__(self, directory, transport=None):
+        self.directory = directory
+        self.transport = transport or HTTPSTransport()
+        self._lock = threading.Lock()
+        self._counts = {}
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def post(self, url, headers, body, timing=None):
+        res, response = self.transport.post(url, headers, body,
+                                            timing=timing)
+        query = redact(body.decode('latin-1'))
+        key = request_key(url, query)
+        with self._lock:
+            seq = self._counts.get(key, 0)
+            while os.path.exists(self._path(key, seq)):
+                seq += 1
+            self._counts[key] = seq + 1
+            exchange = {
+                'url': url,
+                'request_headers': _redact_headers(headers),
+                'request': query,
+                'status': res.status,
+                'reason': res.reason,
+                'headers': _redact_headers(res.getheaders()),
+                # latin-1 maps every byte to one character, so the body
+                # survives the trip through JSON unchanged
+                'body': redact(response.decode('latin-1')),
+            }
+            with io.open(self._path(key, seq), 'w', encoding='utf-8') as fp:
+                fp.write(json.dumps(exchange, indent=2, sort_keys=True,
+                                    ensure_ascii=False))
+        return res, response
+
+    def _path(self, key, seq):
+        return os.path.join(self.directory, '%s-%04d.json' % (key, seq))
+
+
+class ReplayTransport(Transport):
+    """Serves the exchanges saved by a :py:class:`RecordingTransport`
+    instead of talking to a bank
+
+    A request is matched to a recording on its url and its query, leaving
+    out credentials and everything that changes from one run to the next
+    (dates, TRNUIDs, cookies).  When a request was recorded more than
+    once, the recordings are served in order and the last one repeats.
+    The TRNUIDs in a served response are rewritten to the ones of the
+    request, so responses still match up with their requests.
+
+    :param directory: directory of recorded exchanges
+    :type directory: string
+    :param latency: seconds to wait before answering each request, to
+      mimic a real bank
+    :type latency: integer or float
+    :raises ValueError: from :py:meth:`post` when nothing was recorded for
+      a request
+    """
+
+    def __init__(self, directory, latency=0):
+        self.directory = directory
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._served = {}
+        self._exchanges = {}
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.json'):
+                continue
+            with io.open(os.path.join(directory, name),
+                         encoding='utf-8') as fp:
+                exchange = json.loads(fp.read())
+            key = request_key(exchange['url'], exchange['request'])
+            self._exchanges.setdefault(key, []).append(exchange)
+
+    def post(self, url, headers, body, timing=None):
+        query = body.decode('latin-1')
+        key = request_key(url, redact(query))
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if not exchanges:
+                raise ValueError('no recorded response for %s' % url)
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        exchange = exchanges[min(served, len(exchanges) - 1)]
+        if self.latency:
+            time.sleep(self.latency)
+            if timing is not None:
+                timing.add('server', self.latency)
+        response = _renumber(exchange['body'], exchange['request'], query)
+        res = Response(exchange['status'], exchange['reason'],
+                       [tuple(h) for h in exchange['headers']])
+        return res, response.encode('latin-1')
+
+
+def redact(query):
+    """``query`` with the values of :py:data:`SECRET_FIELDS` replaced by
+    ``REDACTED``
+
+    :type query: string
+    :rtype: string
+    """
+    return _SECRETS.sub(r'<\1>' + REDACTED, query)
+
+
+def request_key(url, query):
+    """Identifies a request for :py:class:`ReplayTransport`: a hash of the
+    url and the query without its volatile fields
+
+    :rtype: string
+    """
+    stable = _VOLATILE_HEADER.sub(r'\1:', _VOLATILE.sub(r'<\1>', query))
+    stable = '\n'.join(line.strip() for line in stable.splitlines())
+    data = '%s\0%s' % (url, stable)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+
+def _redact_headers(headers):
+    secret = [h.lower() for h in SECRET_HEADERS]
+    return [(name, REDACTED if name.lower() in secret else '%s' % value)
+            for name, value in headers]
+
+
+def _renumber(response, recorded, query):
+    """Swap the TRNUIDs of the recorded request for those of ``query`` in
+    a recorded response"""
+    new = dict(zip(_TRNUID.findall(recorded), _TRNUID.findall(query)))
+    if not new:
+        return response
+    return _TRNUID_TAG.sub(
+        lambda m: m.group(1) + new.get(m.group(2), m.group(2)), response)
+
+
+_SECRETS = re.compile(r'<(%s)>[^<\r\n]*' % '|'.join(SECRET_FIELDS), re.I)
+_VOLATILE = re.compile(r'<(DT\w+|TRNUID|CLTCOOKIE|NEWFILEUID)>[^<\r\n]*',
+                       re.I)
+_VOLATILE_HEADER = re.compile(r'^(NEWFILEUID|OLDFILEUID):[^\r\n]*',
+                              re.I | re.M)
+_TRNUID = re.compile(r'<TRNUID>\s*([^<\s]+)', re.I)
+_TRNUID_TAG = re.compile(r'(<TRNUID>\s*)([^<\s]+)', re.I)
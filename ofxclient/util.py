@@ -6,15 +6,28 @@ try:
 except ImportError:
     # python 2
     from StringIO import StringIO
+import logging
+import os
+import os.path
+import tempfile
+import threading
 
 from ofxclient.client import Client
 
 
-def combined_download(accounts, days=60):
+def combined_download(accounts, days=60, workers=1, per_institution=None):
     """Download OFX files and combine them into one
 
     It expects an 'accounts' list of ofxclient.Account objects
     as well as an optional 'days' specifier which defaults to 60
+
+    With ``workers`` greater than 1 the accounts are downloaded in
+    parallel (see :py:func:`download_accounts`); an account that fails to
+    download is logged and left out instead of failing the whole batch.
+    Either way the accounts appear in the output in the order given.
+
+    The whole combined file is kept in memory; to write it straight to a
+    file instead use :py:func:`combined_download_to`.
     """
 
     client = Client(institution=None)
@@ -22,12 +35,237 @@ def combined_download(accounts, days=60):
     out_file = StringIO()
     out_file.write(client.header())
     out_file.write('<OFX>')
-    for a in accounts:
-        ofx = a.download(days=days).read()
-        stripped = ofx.partition('<OFX>')[2].partition('</OFX>')[0]
-        out_file.write(stripped)
+    for ofx in _downloads(accounts, days, workers, per_institution):
+        start, end = _body_bounds(ofx, '<OFX>', '</OFX>')
+        out_file.write(ofx[start:end])
 
     out_file.write("</OFX>")
     out_file.seek(0)
 
     return out_file
+
+
+def combined_download_to(sink, accounts, days=60, workers=1,
+                         per_institution=None):
+    """Like :py:func:`combined_download` but stream the combined OFX file
+    to ``sink`` as it is downloaded
+
+    The header, each account's body and the trailer are written directly
+    to ``sink``, so only about one response is held in memory at a time
+    rather than the whole combined file.
+
+    :param sink: binary file-like object to write to
+    :type sink: file
+    :return: number of bytes written
+    :rtype: integer
+    """
+    client = Client(institution=None)
+
+    head = client.header().encode() + b'<OFX>'
+    sink.write(head)
+    written = len(head)
+    for data in _downloads(accounts, days, workers, per_institution,
+                           raw=True):
+        start, end = _body_bounds(data, b'<OFX>', b'</OFX>')
+        sink.write(memoryview(data)[start:end])
+        written += end - start
+    sink.write(b'</OFX>')
+    return written + len(b'</OFX>')
+
+
+def _downloads(accounts, days, workers, per_institution, raw=False):
+    """Yield each account's OFX response in order; in parallel (skipping
+    failures) when ``workers`` is greater than 1"""
+    if workers > 1:
+        for a, ofx, error in iter_downloads(accounts, days=days,
+                                            workers=workers,
+                                            per_institution=per_institution,
+                                            raw=raw):
+            if error is None:
+                yield ofx
+    else:
+        for a in accounts:
+            yield _download(a, days, raw)
+
+
+def _download(account, days, raw):
+    if raw:
+        return account.download_bytes(days=days)
+    return account.download(days=days).read()
+
+
+def _body_bounds(ofx, open_tag, close_tag):
+    """Offsets of the text between the first ``open_tag`` and the
+    ``close_tag`` after it (or the end) - without copying the text"""
+    start = ofx.find(open_tag)
+    if start < 0:
+        return 0, 0
+    start += len(open_tag)
+    end = ofx.find(close_tag, start)
+    if end < 0:
+        end = len(ofx)
+    return start, end
+
+
+def batch_download(accounts, days=60):
+    """Download accounts with one request per institution login
+
+    Accounts are grouped by :py:meth:`ofxclient.Institution.local_id`
+    and each group is fetched with
+    :py:meth:`ofxclient.Institution.download_all`.
+
+    :rtype: list of :py:class:`StringIO`, in the order of ``accounts``
+    """
+    groups = {}
+    order = []
+    for idx, a in enumerate(accounts):
+        key = a.institution.local_id()
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(idx)
+
+    results = [None] * len(accounts)
+    for key in order:
+        members = [accounts[idx] for idx in groups[key]]
+        institution = members[0].institution
+        for idx, ofx in zip(groups[key],
+                            institution.download_all(members, days=days)):
+            results[idx] = ofx
+    return results
+
+
+def download_accounts(accounts, days=60, workers=4, per_institution=None,
+                      raw=False):
+    """Download several accounts in parallel
+
+    At most ``workers`` downloads run at once, and at most
+    ``per_institution`` of those talk to the same institution (bank url).
+    An account whose institution is already at its limit does not hold
+    up accounts at other institutions.
+
+    Failures are isolated: an exception raised while downloading one
+    account is logged and returned in its result instead of being raised.
+
+    :param accounts: accounts to download
+    :type accounts: list of :py:class:`ofxclient.Account`
+    :param days: Number of days to look back at
+    :type days: integer
+    :param workers: max number of concurrent downloads
+    :type workers: integer
+    :param per_institution: max number of concurrent downloads per
+      institution (optional)
+    :type per_institution: integer or None
+    :param raw: return the responses as raw bytes
+      (see :py:meth:`ofxclient.Account.download_bytes`)
+    :type raw: boolean
+    :return: (account, OFX response string or None, exception or None)
+      3-tuples, in the same order as ``accounts``
+    :rtype: list
+    """
+    return list(iter_downloads(accounts, days=days, workers=workers,
+                               per_institution=per_institution, raw=raw))
+
+
+def iter_downloads(accounts, days=60, workers=4, per_institution=None,
+                   raw=False):
+    """Generator version of :py:func:`download_accounts`
+
+    Results are yielded in the order of ``accounts`` as soon as they (and
+    all the ones before them) are done, and are not kept around after
+    that.  Downloads do not run more than ``workers`` accounts ahead of
+    the one the caller is waiting for, so at most about ``workers``
+    responses are held in memory however slow an early account is.
+    """
+    accounts = list(accounts)
+    workers = max(1, min(workers, len(accounts)))
+    results = {}
+    pending = list(range(len(accounts)))
+    active = {}
+    # the next index to be yielded, and whether the caller stopped early
+    state = {'next': 0, 'closed': False}
+    cond = threading.Condition()
+
+    def institution_key(account):
+        return account.institution.url
+
+    def next_index():
+        with cond:
+            while pending and not state['closed']:
+                for pos, idx in enumerate(pending):
+                    if idx >= state['next'] + workers:
+                        break
+                    key = institution_key(accounts[idx])
+                    if per_institution and \
+                            active.get(key, 0) >= per_institution:
+                        continue
+                    del pending[pos]
+                    active[key] = active.get(key, 0) + 1
+                    return idx
+                cond.wait()
+            return None
+
+    def done(idx, result):
+        with cond:
+            results[idx] = result
+            active[institution_key(accounts[idx])] -= 1
+            cond.notify_all()
+
+    def worker():
+        while True:
+            idx = next_index()
+            if idx is None:
+                return
+            account = accounts[idx]
+            result = (account, None, None)
+            try:
+                result = (account, _download(account, days, raw), None)
+            except Exception as e:
+                logging.exception('download failed for %s',
+                                  account.long_description())
+                result = (account, None, e)
+            finally:
+                done(idx, result)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    try:
+        for idx in range(len(accounts)):
+            with cond:
+                while idx not in results:
+                    cond.wait()
+                result = results.pop(idx)
+                state['next'] = idx + 1
+                cond.notify_all()
+            yield result
+    finally:
+        # let the workers go if the caller stops early
+        with cond:
+            state['closed'] = True
+            cond.notify_all()
+
+
+def write_atomic(file_name, data):
+    """Write bytes to ``file_name`` through a temporary file in the same
+    directory, so readers see either the old file or the whole new one
+
+    :type file_name: string
+    :type data: bytes
+    """
+    dir_name = os.path.dirname(os.path.abspath(file_name))
+    fd, tmp = tempfile.mkstemp(dir=dir_name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+        if hasattr(os, 'replace'):
+            # python 3
+            os.replace(tmp, file_name)
+        else:
+            # python 2
+            os.rename(tmp, file_name)
+    except:
+        os.remove(tmp)
+        raise
@@ -0,0 +1,178 @@
+from __future__ import absolute_import
+from __future__ import unicode_literals
+from __future__ import with_statement
+import datetime
+import json
+import os
+import os.path
+import re
+import tempfile
+import threading
+
+try:
+    DEFAULT_WATERMARKS = os.path.expanduser(
+        os.path.join('~', 'ofxclient.watermarks.json'))
+except:
+    DEFAULT_WATERMARKS = None
+
+DEFAULT_OVERLAP_DAYS = 3
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class WatermarkStore(object):
+    """Remembers, per :py:meth:`ofxclient.Account.local_id`, how far the
+    last successful statement download reached.
+
+    Used by :py:meth:`ofxclient.Account.download_since_last` so that
+    repeated syncs only ask the bank for what is new.  The watermarks are
+    kept in a small JSON file, next to the default config file unless
+    another ``file_name`` is given.
+
+    Saving only writes the watermarks changed through this store over
+    what is in the file by then, so it does not undo what other stores
+    of the file saved before.  Only the saves of one store are locked
+    against each other (threads may share it): two stores or processes
+    saving at the same moment can still lose one's changes.
+    :py:func:`default_store` shares one store per file in a process.
+
+    :param file_name: absolute path to the watermark file (optional)
+    :type file_name: string or None
+
+    Example::
+
+      from ofxclient.watermark import WatermarkStore
+
+      store = WatermarkStore(file_name='/tmp/watermarks.json')
+      ofx = account.download_since_last(store=store)
+    """
+
+    def __init__(self, file_name=None):
+        f = file_name or DEFAULT_WATERMARKS
+        if f is None:
+            raise ValueError('file_name is required')
+        self.file_name = f
+        self._lock = threading.Lock()
+        self._load()
+
+    def get(self, local_id):
+        """OFX date of the last successful download, or None
+
+        :rtype: string or None
+        """
+        with self._lock:
+            return self._marks.get(local_id)
+
+    def set(self, local_id, value):
+        """Record the OFX date a download reached (does not save)"""
+        with self._lock:
+            self._marks[local_id] = value
+            self._changed[local_id] = value
+        return self
+
+    def remove(self, local_id):
+        """Forget an account's watermark (does not save)"""
+        with self._lock:
+            self._changed[local_id] = None
+            return self._marks.pop(local_id, None) is not None
+
+    def save(self):
+        """Save the watermarks to disk, atomically replacing the file
+
+        The file is read again first and only the watermarks set or
+        removed since the last save are changed in it.  The file is not
+        locked, see :py:class:`WatermarkStore`.
+        """
+        with self._lock:
+            marks = self._read()
+            for local_id, value in self._changed.items():
+                if value is None:
+                    marks.pop(local_id, None)
+                else:
+                    marks[local_id] = value
+            data = json.dumps(marks, indent=2, sort_keys=True)
+            dir_name = os.path.dirname(os.path.abspath(self.file_name))
+            fd, tmp = tempfile.mkstemp(dir=dir_name, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as fp:
+                    fp.write(data)
+                if hasattr(os, 'replace'):
+                    # python 3
+                    os.replace(tmp, self.file_name)
+                else:
+                    # python 2
+                    os.rename(tmp, self.file_name)
+            except:
+                os.remove(tmp)
+                raise
+            self._marks = marks
+            self._changed = {}
+        return self
+
+    def _load(self):
+        self._marks = self._read()
+        # local_id -> value set since the last save (None if removed)
+        self._changed = {}
+        return self
+
+    def _read(self):
+        if os.path.exists(self.file_name):
+            with open(self.file_name) as fp:
+                data = fp.read()
+            if data.strip():
+                return json.loads(data)
+        return {}
+
+
+def default_store(file_name=None):
+    """The :py:class:`WatermarkStore` of a file, shared by everything in
+    the process (e.g. parallel
+    :py:meth:`ofxclient.Account.download_since_last` calls)
+
+    :param file_name: absolute path to the watermark file (optional)
+    :type file_name: string or None
+    :rtype: :py:class:`WatermarkStore`
+    """
+    key = os.path.abspath(file_name or DEFAULT_WATERMARKS or '')
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = WatermarkStore(file_name=file_name)
+        return store
+
+
+def watermark_from_response(response):
+    """The date a statement response covers up to: the DTEND of its
+    transaction list, or DTSERVER if there is none.
+
+    Returns None unless the response actually contains a statement.
+
+    :param response: OFX response
+    :type response: string
+    :rtype: string or None
+    """
+    if not _STATEMENT.search(response):
+        return None
+    found = _DTEND.search(response) or _DTSERVER.search(response)
+    if found is None:
+        return None
+    return found.group(1)
+
+
+def since(watermark, overlap_days=DEFAULT_OVERLAP_DAYS):
+    """'YYYYMMDD' start date for a download: the watermark minus an
+    overlap window, to catch transactions that post late.
+
+    :param watermark: OFX date, e.g. '20190110120000.000[-5:EST]'
+    :type watermark: string
+    :rtype: string
+    """
+    date = datetime.datetime.strptime(watermark[:8], '%Y%m%d')
+    date -= datetime.timedelta(days=overlap_days)
+    return date.strftime('%Y%m%d')
+
+
+_STATEMENT = re.compile(r'<(?:CC|INV)?STMTRS>', re.I)
+_DTEND = re.compile(r'<DTEND>\s*(\d{8}[^<\s]*)', re.I)
+_DTSERVER = re.compile(r'<DTSERVER>\s*(\d{8}[^<\s]*)', re.I)
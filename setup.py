@@ -30,7 +30,7 @@ setup(name='ofxclient',
       url='https://github.com/captin411/ofxclient',
       license='MIT License',
       packages=find_packages(exclude=[
-          'ez_setup', 'example', 'tests', 'external']),
+          'ez_setup', 'example', 'tests', 'benchmarks', 'external']),
       include_package_data=True,
       zip_safe=False,
       entry_points={
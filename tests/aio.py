@@ -0,0 +1,118 @@
+import sys
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from ofxclient import Client, CreditCardAccount, Institution
+
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from tests.aio_support import (
+        cancelled_connection, fake_connection, peak_concurrency, run
+    )
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'asyncio support needs 3.5+')
+class AsyncClientTests(unittest.TestCase):
+
+    def setUp(self):
+        self.institution = Institution(
+                id='1',
+                org='org',
+                url='https://example.com/ofx?x=1',
+                username='username',
+                password='password'
+        )
+
+    def testSameQueries(self):
+        from ofxclient.aio import AsyncClient
+        with mock.patch('ofxclient.client.ofx_uid', return_value='UID'), \
+                mock.patch('ofxclient.client.now', return_value='NOW'):
+            sync = Client(institution=self.institution)
+            async_ = AsyncClient(institution=self.institution)
+            self.assertEqual(
+                sync.bank_account_query('1', '20190101', 'CHECKING', '2'),
+                async_.bank_account_query('1', '20190101', 'CHECKING', '2'))
+            self.assertEqual(
+                sync.brokerage_account_query('1', '20190101', '3'),
+                async_.brokerage_account_query('1', '20190101', '3'))
+
+    def testPostContentLength(self):
+        from ofxclient.aio import AsyncClient
+        opener, writers = fake_connection(
+            b'HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\n<OFX>')
+        client = AsyncClient(institution=self.institution)
+        with mock.patch('asyncio.open_connection', opener):
+            self.assertEqual(run(client.post('QUERY')), '<OFX>')
+
+        head, _, body = writers[0].data.partition(b'\r\n\r\n')
+        lines = head.decode().split('\r\n')
+        self.assertEqual(lines[0], 'POST /ofx?x=1 HTTP/1.1')
+        expected = ['%s: %s' % h
+                    for h in client._request_headers('example.com', 'QUERY')]
+        self.assertEqual(lines[1:], expected)
+        self.assertEqual(body, b'QUERY')
+        self.assertTrue(writers[0].waited)
+
+    def testPostChunked(self):
+        from ofxclient.aio import AsyncClient
+        opener, _ = fake_connection(
+            b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+            b'3\r\n<OF\r\n2\r\nX>\r\n0\r\n\r\n')
+        client = AsyncClient(institution=self.institution)
+        with mock.patch('asyncio.open_connection', opener):
+            self.assertEqual(run(client.post('QUERY')), '<OFX>')
+
+    def testCookieRetry(self):
+        from ofxclient.aio import AsyncClient
+        opener, writers = fake_connection(
+            b'HTTP/1.1 200 OK\r\nSet-Cookie: a=b\r\n'
+            b'Content-Length: 0\r\n\r\n',
+            b'HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\n<OFX>')
+        client = AsyncClient(institution=self.institution)
+        with mock.patch('asyncio.open_connection', opener):
+            self.assertEqual(run(client.post('QUERY')), '<OFX>')
+        self.assertEqual(len(writers), 2)
+        self.assertTrue(b'\r\nCookie: a=b\r\n' in writers[1].data)
+
+    def testDownloadAsync(self):
+        account = CreditCardAccount(institution=self.institution,
+                                    number='12345')
+        opener, writers = fake_connection(
+            b'HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\n<OFX>')
+        with mock.patch('asyncio.open_connection', opener):
+            got = run(account.download_async(days=5))
+        self.assertEqual(got.read(), '<OFX>')
+        self.assertTrue(b'<CCSTMTRQ>' in writers[0].data)
+        self.assertTrue(b'<ACCTID>12345' in writers[0].data)
+
+    def testAuthenticateAsync(self):
+        opener, _ = fake_connection(
+            b'HTTP/1.1 200 OK\r\nContent-Length: 102\r\n\r\n'
+            b'<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>15500'
+            b'<MESSAGE>bad password</STATUS></SONRS></SIGNONMSGSRSV1>')
+        with mock.patch('asyncio.open_connection', opener):
+            with self.assertRaises(ValueError) as cm:
+                run(self.institution.authenticate_async())
+        self.assertEqual(str(cm.exception), 'bad password')
+
+    def testRateLimiter(self):
+        from ofxclient.ratelimit import RateLimiter
+        limiter = RateLimiter(max_concurrent=1)
+        self.assertEqual(peak_concurrency(limiter, 4), 1)
+
+    def testCancelledTrialReleased(self):
+        from ofxclient.aio import AsyncClient
+        from ofxclient.retry import CircuitBreaker
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.failure()
+        client = AsyncClient(institution=self.institution,
+                             circuit_breaker=breaker)
+        with mock.patch('asyncio.open_connection', cancelled_connection):
+            with self.assertRaises(asyncio.CancelledError):
+                run(client.post_bytes('QUERY'))
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
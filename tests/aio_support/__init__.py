@@ -0,0 +1,72 @@
+"""Coroutine helpers for tests/aio.py
+
+They are kept out of tests/aio.py, which has to import (and be skipped)
+on pythons without async/await; import this package on Python 3.5+ only.
+"""
+import asyncio
+
+
+class FakeWriter(object):
+
+    def __init__(self):
+        self.data = b''
+        self.closed = False
+        self.waited = False
+
+    def write(self, data):
+        self.data += data
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        self.waited = self.closed
+
+
+def fake_connection(*responses):
+    writers = []
+    responses = list(responses)
+
+    async def open_connection(*args, **kwargs):
+        reader = asyncio.StreamReader()
+        reader.feed_data(responses.pop(0))
+        reader.feed_eof()
+        writer = FakeWriter()
+        writers.append(writer)
+        return reader, writer
+    return open_connection, writers
+
+
+async def cancelled_connection(*args, **kwargs):
+    raise asyncio.CancelledError()
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def peak_concurrency(limiter, tasks):
+    """Run ``tasks`` coroutines that each hold ``limiter`` for a moment,
+    and return how many held it at once at most"""
+    from ofxclient.aio import _acquire
+    state = {'active': 0, 'peak': 0}
+
+    async def work():
+        await _acquire(limiter)
+        try:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            await asyncio.sleep(0.01)
+            state['active'] -= 1
+        finally:
+            limiter.release()
+
+    async def main():
+        await asyncio.gather(*[work() for _ in range(tasks)])
+
+    run(main())
+    return state['peak']
@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from ofxclient import CreditCardAccount, Institution
+from ofxclient.cache import ResponseCache, cacheable
+from ofxclient.client import Client
+
+OK = (b'OFXHEADER:100\r\nDATA:OFXSGML\r\n\r\n<OFX><SIGNONMSGSRSV1><SONRS>'
+      b'<STATUS><CODE>0<SEVERITY>INFO</STATUS></SONRS></SIGNONMSGSRSV1>'
+      b'</OFX>')
+STATEMENT_FAILED = OK.replace(
+    b'</OFX>', b'<BANKMSGSRSV1><STMTTRNRS><TRNUID>1<STATUS><CODE>2000'
+    b'<SEVERITY>ERROR</STATUS></STMTTRNRS></BANKMSGSRSV1></OFX>')
+FAILED = (b'<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>15500'
+          b'<SEVERITY>ERROR<MESSAGE>bad password</STATUS></SONRS>'
+          b'</SIGNONMSGSRSV1></OFX>')
+
+
+class ResponseCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = ResponseCache(self.dir, ttl=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def age(self, key, seconds):
+        path = self.cache._path(key)
+        then = time.time() - seconds
+        os.utime(path, (then, then))
+
+    def testGetSet(self):
+        key = ('inst', 'acct', 'statement', '20190101')
+        self.assertTrue(self.cache.get(key) is None)
+        self.assertTrue(self.cache.set(key, OK))
+        self.assertEqual(self.cache.get(key), OK)
+        self.assertTrue(self.cache.get(('inst', 'other', 'statement',
+                                        '20190101')) is None)
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], len(OK))
+
+    def testExpired(self):
+        key = ('inst', None, 'accounts', None)
+        self.cache.set(key, OK)
+        self.age(key, 61)
+        self.assertTrue(self.cache.get(key) is None)
+
+    def testFailedSignonNotCached(self):
+        key = ('inst', None, 'accounts', None)
+        self.assertFalse(cacheable(FAILED))
+        self.assertFalse(cacheable(b'<html>error</html>'))
+        self.assertFalse(cacheable(STATEMENT_FAILED))
+        self.assertTrue(cacheable(STATEMENT_FAILED.replace(b'2000', b'0')))
+        self.assertFalse(self.cache.set(key, FAILED))
+        self.assertTrue(self.cache.get(key) is None)
+
+    def testEvictsLeastRecentlyUsed(self):
+        self.cache.max_bytes = len(OK) * 2
+        for n in range(2):
+            self.cache.set(('k', n), OK)
+            self.age(('k', n), 30 - n)
+        # reading the oldest entry makes the other one least recently used
+        self.cache.get(('k', 0))
+        self.cache.set(('k', 2), OK)
+        self.assertEqual(self.cache.get(('k', 0)), OK)
+        self.assertTrue(self.cache.get(('k', 1)) is None)
+        self.assertEqual(self.cache.get(('k', 2)), OK)
+
+    def testClear(self):
+        self.cache.set(('k', 1), OK)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+
+class ClientCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = ResponseCache(self.dir)
+        i = Institution(id='1', org='org', url='https://example.com',
+                        username='user', password='pass',
+                        client_args={'id': 'x'})
+        self.account = CreditCardAccount(institution=i, number='12345')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testNoCacheByDefault(self):
+        self.assertTrue(Client(institution=None).response_cache is None)
+
+    def testDownloadServedFromCache(self):
+        res = mock.Mock(status=200)
+        res.getheader.return_value = None
+        with mock.patch('ofxclient.cache.DEFAULT_CACHE', self.cache):
+            with mock.patch.object(Client, '_do_post',
+                                   return_value=(res, OK)) as post:
+                self.assertEqual(self.account.download_bytes(days=5), OK)
+                self.assertEqual(self.account.download_bytes(days=5), OK)
+                self.assertEqual(post.call_count, 1)
+                # a different date window is a different request
+                self.account.download_bytes(days=6)
+                self.assertEqual(post.call_count, 2)
+                # no key, no caching
+                Client(institution=self.account.institution).post_bytes('q')
+                self.assertEqual(post.call_count, 3)
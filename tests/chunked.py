@@ -0,0 +1,145 @@
+import datetime
+import os
+import re
+import shutil
+import socket
+import tempfile
+import unittest
+
+from ofxclient import CreditCardAccount, Institution
+from ofxclient import chunked
+from ofxclient.retry import CircuitBreaker, RetryPolicy
+from ofxclient.transport import Response, Transport
+
+HEAD = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS>
+<DTSERVER>20190110120000<LANGUAGE>ENG</SONRS></SIGNONMSGSRSV1>
+<CREDITCARDMSGSRSV1><CCSTMTTRNRS><TRNUID>1<STATUS><CODE>0
+<SEVERITY>INFO</STATUS><CCSTMTRS><CURDEF>USD<CCACCTFROM><ACCTID>12345
+</CCACCTFROM><BANKTRANLIST><DTSTART>%s<DTEND>%s
+"""
+TRANSACTION = """<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>%s<TRNAMT>-1.00
+<FITID>%s<NAME>Shop</STMTTRN>
+"""
+TAIL = """</BANKTRANLIST><LEDGERBAL><BALAMT>%s<DTASOF>%s</LEDGERBAL>
+</CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1></OFX>"""
+
+TODAY = datetime.date.today()
+
+
+def day(offset):
+    return (TODAY - datetime.timedelta(days=offset)).strftime('%Y%m%d')
+
+
+class WindowTransport(Transport):
+    """A statement with one transaction per day of the requested range,
+    both ends included"""
+
+    def __init__(self, fail=(), refuse=()):
+        self.requests = []
+        self.fail = fail
+        self.refuse = refuse
+
+    def post(self, url, headers, body, timing=None):
+        query = body.decode()
+        start = re.search(r'<DTSTART>(\d+)', query).group(1)
+        end = re.search(r'<DTEND>(\d+)', query)
+        end = end.group(1) if end else day(0)
+        self.requests.append((start, end))
+        if start in self.fail:
+            raise socket.error('timed out')
+        date = datetime.datetime.strptime(start, '%Y%m%d').date()
+        parts = [HEAD % (start, end)]
+        if start in self.refuse:
+            parts[0] = parts[0].replace('<CODE>0', '<CODE>15500', 1)
+        while date.strftime('%Y%m%d') <= end:
+            stamp = date.strftime('%Y%m%d')
+            parts.append(TRANSACTION % (stamp, 'T' + stamp))
+            date += datetime.timedelta(days=1)
+        parts.append(TAIL % (end[-2:], end))
+        return Response(200, 'OK', []), ''.join(parts).encode()
+
+
+class ChunkedTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def account(self, transport):
+        institution = Institution(
+            id='1', org='org', url='https://ofx.example.com/',
+            username='user', password='pass', client_args={
+                'id': 'x', 'transport': transport,
+                'retry_policy': RetryPolicy(max_attempts=1),
+                'circuit_breaker': CircuitBreaker()})
+        return CreditCardAccount(institution=institution, number='12345')
+
+    def testWindows(self):
+        today = datetime.date(2019, 1, 31)
+        # 2019-01-01 is 17897 days after the epoch, so windows of 10 days
+        # start on 2018-12-25
+        self.assertEqual(chunked.windows(30, window_days=10, today=today), [
+            ('20181225', '20190105'),
+            ('20190104', '20190115'),
+            ('20190114', '20190125'),
+            ('20190124', None),
+        ])
+        self.assertEqual(chunked.windows(5, window_days=10, today=today),
+                         [('20190124', None)])
+
+    def testWindowsStable(self):
+        today = datetime.date(2026, 10, 16)
+        for later in range(1, 40):
+            tomorrow = today + datetime.timedelta(days=later)
+            closed = set(chunked.windows(365, today=today)[:-1])
+            again = set(chunked.windows(365 + later, today=tomorrow)[:-1])
+            self.assertTrue(closed <= again)
+
+    def testDownloadMerged(self):
+        transport = WindowTransport()
+        ranges = chunked.windows(30, window_days=7)
+        statement = self.account(transport).statement_chunked(
+            days=30, window_days=7, workers=3)
+        self.assertEqual(sorted(transport.requests),
+                         [(start, end or day(0)) for start, end in ranges])
+        fitids = sorted(t.id for t in statement.transactions)
+        self.assertEqual(fitids[0], 'T' + ranges[0][0])
+        self.assertEqual(fitids[-1], 'T' + day(0))
+        self.assertEqual(len(fitids), len(set(fitids)))
+        self.assertTrue(len(fitids) >= 31)
+        # balances come from the newest window
+        self.assertEqual(statement.balance, int(day(0)[-2:]))
+        self.assertEqual(statement.start_date.strftime('%Y%m%d'),
+                         ranges[0][0])
+
+    def testResume(self):
+        ranges = chunked.windows(30, window_days=10)
+        broken = WindowTransport(fail=(ranges[1][0],))
+        self.assertRaises(socket.error, self.account(broken).download_chunked,
+                          days=30, window_days=10, workers=1,
+                          chunk_dir=self.dir)
+        self.assertEqual(len(os.listdir(self.dir)), 1)
+
+        transport = WindowTransport()
+        data = self.account(transport).download_chunked(
+            days=30, window_days=10, workers=2, chunk_dir=self.dir)
+        # the saved window is not asked for again; the open one is never
+        # saved
+        self.assertEqual(sorted(transport.requests),
+                         [(start, end or day(0)) for start, end in ranges[1:]])
+        self.assertEqual(len(os.listdir(self.dir)), len(ranges) - 1)
+        first = datetime.datetime.strptime(ranges[0][0], '%Y%m%d').date()
+        self.assertEqual(data.count(b'<STMTTRN>'),
+                         (TODAY - first).days + 1)
+
+    def testRefusedWindow(self):
+        ranges = chunked.windows(30, window_days=10)
+        refusing = WindowTransport(refuse=(ranges[1][0],))
+        self.assertRaises(ValueError, self.account(refusing).download_chunked,
+                          days=30, window_days=10, workers=1,
+                          chunk_dir=self.dir)
+        # the refused window is not saved as a chunk
+        self.assertEqual(len(os.listdir(self.dir)), 1)
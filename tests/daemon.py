@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ofxclient import CreditCardAccount, Institution
+from ofxclient.daemon import SyncDaemon
+from ofxclient.retry import RetryPolicy
+
+from tests.sync import BAD_PASSWORD, RefusingTransport
+from tests.transport import EchoTransport
+
+
+class FakeConfig(object):
+    """Just what SyncDaemon needs of an OfxConfig"""
+
+    def __init__(self, file_name, accounts):
+        self.file_name = file_name
+        self.next_accounts = self.current = accounts
+        self.reloads = 0
+
+    def accounts(self):
+        return list(self.current)
+
+    def reload(self):
+        self.reloads += 1
+        self.current = self.next_accounts
+
+
+class SyncDaemonTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.config_file = os.path.join(self.dir, 'ofxclient.ini')
+        open(self.config_file, 'w').close()
+        self.transport = EchoTransport()
+        self.banks = [self.institution(str(i)) for i in range(2)]
+        self.accounts = [
+            CreditCardAccount(institution=self.banks[0], number='1'),
+            CreditCardAccount(institution=self.banks[0], number='2'),
+            CreditCardAccount(institution=self.banks[1], number='3'),
+        ]
+        self.config = FakeConfig(self.config_file, self.accounts)
+
+    def institution(self, id):
+        return Institution(
+            id=id, org='org', url='https://ofx%s.example.com/' % id,
+            username='user', password='pass', client_args={
+                'id': 'x', 'transport': self.transport,
+                'retry_policy': RetryPolicy(max_attempts=1)})
+
+    def daemon(self, **kwargs):
+        return SyncDaemon(self.config, os.path.join(self.dir, 'out'),
+                          interval=100, jitter=0.1, stagger=60, **kwargs)
+
+    def testStaggerAndRun(self):
+        d = self.daemon()
+        now = d.next_due()
+        self.assertTrue(now <= time.time())
+
+        results = d.run_pending(now)
+        self.assertEqual([a.number for a, f, e in results], ['1', '2'])
+        self.assertEqual([e for a, f, e in results], [None, None])
+        for account, file_name, error in results:
+            self.assertTrue(os.path.basename(file_name).startswith(
+                account.local_id()))
+            with open(file_name, 'rb') as fp:
+                self.assertTrue(b'<CCSTMTRS>' in fp.read())
+            due = d._due[account.local_id()]
+            self.assertTrue(now + 89 < due < time.time() + 111)
+
+        # the second institution is 30s (60s over 2 institutions) later
+        self.assertEqual(d.run_pending(now + 29), [])
+        results = d.run_pending(now + 30)
+        self.assertEqual([a.number for a, f, e in results], ['3'])
+
+    def testRefusedNotWritten(self):
+        self.transport = RefusingTransport(200, BAD_PASSWORD)
+        bad = CreditCardAccount(institution=self.institution('9'), number='1')
+        self.config = FakeConfig(self.config_file, [bad])
+        d = self.daemon()
+        (account, file_name, error), = d.run_pending(d.next_due())
+        self.assertTrue(file_name is None)
+        self.assertTrue('bad password' in str(error))
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'out')) and
+                         os.listdir(os.path.join(self.dir, 'out')))
+
+    def testAccountInterval(self):
+        d = self.daemon(intervals={self.accounts[2].local_id(): 5})
+        self.assertEqual(d.interval_for(self.accounts[0].local_id()), 100)
+        self.assertEqual(d.interval_for(self.accounts[2].local_id()), 5)
+
+    def testReload(self):
+        d = self.daemon()
+        self.assertFalse(d.reload_if_changed())
+        self.assertEqual(self.config.reloads, 0)
+
+        added = CreditCardAccount(institution=self.banks[1], number='4')
+        self.config.next_accounts = [self.accounts[0], added]
+        mtime = os.stat(self.config_file).st_mtime + 10
+        os.utime(self.config_file, (mtime, mtime))
+
+        now = time.time()
+        self.assertTrue(d.reload_if_changed(now))
+        self.assertEqual(self.config.reloads, 1)
+        self.assertEqual(sorted(d._due), sorted(
+            [self.accounts[0].local_id(), added.local_id()]))
+        self.assertEqual(d._due[added.local_id()], now)
@@ -1,6 +1,13 @@
+import re
 import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
 
+from ofxclient import BankAccount
 from ofxclient import Client
+from ofxclient import CreditCardAccount
 from ofxclient import Institution
 
 
@@ -64,6 +71,27 @@ class OfxInstitutionTests(unittest.TestCase):
         self.assertEqual(c.app_version, 'capp_version')
         self.assertEqual(c.ofx_version, 'cofx_version')
 
+    def testClientShared(self):
+        i = Institution(
+                id='1',
+                org='org',
+                url='http://example.com',
+                username='username',
+                password='password',
+                client_args={'app_id': 'capp_id'}
+        )
+        c = i.client()
+        self.assertTrue(i.client() is c)
+
+        hooked = c.with_hooks([lambda event: None])
+        self.assertFalse(hooked is c)
+        self.assertEqual(len(hooked.hooks), 1)
+        self.assertEqual(c.hooks, [])
+
+        i.client_args['app_id'] = 'other'
+        self.assertFalse(i.client() is c)
+        self.assertEqual(i.client().app_id, 'other')
+
     def testRequiredParams(self):
         self.assertRaises(TypeError, Institution.__init__)
 
@@ -78,3 +106,67 @@ class OfxInstitutionTests(unittest.TestCase):
 
         a = {'id': '1', 'org': 'org', 'url': 'url', 'username': 'username'}
         self.assertRaises(TypeError, Institution, **a)
+
+
+class DownloadAllTests(unittest.TestCase):
+
+    def setUp(self):
+        self.institution = Institution(
+                id='1',
+                org='org',
+                url='https://example.com',
+                username='username',
+                password='password'
+        )
+        self.accounts = [
+            BankAccount(institution=self.institution, number='111',
+                        routing_number='9', account_type='CHECKING'),
+            CreditCardAccount(institution=self.institution, number='222'),
+            BankAccount(institution=self.institution, number='333',
+                        routing_number='9', account_type='SAVINGS'),
+        ]
+
+    def respond(self, query):
+        self.queries.append(query)
+        uids = re.findall(r'<TRNUID>(\w+)', query)
+        return ''.join([
+            'OFXHEADER:100\r\n\r\n<OFX>',
+            '<SIGNONMSGSRSV1><SONRS>ok</SONRS></SIGNONMSGSRSV1>',
+            '<BANKMSGSRSV1>',
+            '<STMTTRNRS><TRNUID>%s<STMTRS>333</STMTRS></STMTTRNRS>' % uids[1],
+            '<STMTTRNRS><TRNUID>%s<STMTRS>111</STMTRS></STMTTRNRS>' % uids[0],
+            '</BANKMSGSRSV1><CREDITCARDMSGSRSV1>',
+            '<CCSTMTTRNRS><TRNUID>%s<CCSTMTRS>222</CCSTMTRS></CCSTMTTRNRS>'
+            % uids[2],
+            '</CREDITCARDMSGSRSV1></OFX>'
+        ])
+
+    def testOneRequest(self):
+        self.queries = []
+        with mock.patch.object(Client, 'post', autospec=True,
+                               side_effect=lambda c, q: self.respond(q)):
+            got = self.institution.download_all(self.accounts, days=5)
+
+        self.assertEqual(len(self.queries), 1)
+        query = self.queries[0]
+        self.assertEqual(query.count('<SONRQ>'), 1)
+        self.assertEqual(query.count('<BANKMSGSRQV1>'), 1)
+        self.assertEqual(query.count('<STMTTRNRQ>'), 2)
+        self.assertEqual(query.count('<CCSTMTTRNRQ>'), 1)
+        self.assertTrue(query.index('<BANKMSGSRQV1>') <
+                        query.index('<CREDITCARDMSGSRQV1>'))
+
+        docs = [g.read() for g in got]
+        self.assertTrue(docs[0].startswith(
+            'OFXHEADER:100\r\n\r\n<OFX><SIGNONMSGSRSV1>'))
+        self.assertTrue('<STMTRS>111</STMTRS>' in docs[0])
+        self.assertFalse('333' in docs[0])
+        self.assertTrue(docs[0].endswith('</STMTTRNRS></BANKMSGSRSV1></OFX>'))
+        self.assertTrue('<CREDITCARDMSGSRSV1><CCSTMTTRNRS>' in docs[1])
+        self.assertTrue('<STMTRS>333</STMTRS>' in docs[2])
+
+    def testForeignAccount(self):
+        other = Institution(id='2', org='org', url='https://example.org',
+                            username='username', password='password')
+        a = CreditCardAccount(institution=other, number='444')
+        self.assertRaises(ValueError, self.institution.download_all, [a])
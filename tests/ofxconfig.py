@@ -2,15 +2,21 @@ import keyring
 from keyrings.alt.file import PlaintextKeyring
 import os
 import os.path
+import shutil
+import sqlite3
 import tempfile
 import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
 try:
     from test.support import EnvironmentVarGuard
 except ImportError:
     from test.test_support import EnvironmentVarGuard
 
 import ofxclient.config
-from ofxclient.config import OfxConfig
+from ofxclient.config import OfxConfig, SqliteStorage, migrate
 from ofxclient import Institution, CreditCardAccount
 
 
@@ -82,7 +88,7 @@ class OfxConfigTests(unittest.TestCase):
         self.assertEqual(got.institution.password, a.institution.password)
 
     def testFieldsSecured(self):
-        if not ofxclient.config.KEYRING_AVAILABLE:
+        if not ofxclient.config.keyring_available():
             return
 
         # always skip these for now
@@ -108,7 +114,7 @@ class OfxConfigTests(unittest.TestCase):
         )
 
     def testFieldsRemainUnsecure(self):
-        if not ofxclient.config.KEYRING_AVAILABLE:
+        if not ofxclient.config.keyring_available():
             return
 
         # always skip these for now
@@ -139,7 +145,7 @@ class OfxConfigTests(unittest.TestCase):
         )
 
     def testResecuredAfterEncryptAccount(self):
-        if not ofxclient.config.KEYRING_AVAILABLE:
+        if not ofxclient.config.keyring_available():
             return
 
         # always skip these for now
@@ -185,3 +191,169 @@ class OfxConfigTests(unittest.TestCase):
         self.assertTrue(
             c.parser.is_secure_option(a1.local_id(), 'institution.password')
         )
+
+    def testAccountsMemoized(self):
+        c = OfxConfig(file_name=self.temp_file.name)
+        i = Institution(
+                id='1',
+                org='org',
+                url='url',
+                username='user',
+                password='pass'
+        )
+        a1 = CreditCardAccount(institution=i, number='12345')
+        a2 = CreditCardAccount(institution=i, number='67890')
+        c.add_account(a1)
+
+        got = c.account(a1.local_id())
+        self.assertTrue(c.accounts()[0] is got)
+        self.assertTrue(c.account(a1.local_id()) is got)
+
+        c.add_account(a2)
+        self.assertEqual([a.local_id() for a in c.accounts()],
+                         [a1.local_id(), a2.local_id()])
+        self.assertTrue(c.accounts()[0] is got)
+
+        c.remove_account(a1.local_id())
+        self.assertEqual([a.local_id() for a in c.accounts()],
+                         [a2.local_id()])
+        self.assertTrue(c.account(a1.local_id()) is None)
+
+        c.save()
+        kept = c.account(a2.local_id())
+        c.reload()
+        self.assertFalse(c.account(a2.local_id()) is kept)
+        self.assertEqual(c.account(a2.local_id()).number, '67890')
+
+    def testLocalIdCached(self):
+        i = Institution(id='1', org='org', url='url', username='user',
+                        password='pass')
+        a = CreditCardAccount(institution=i, number='12345')
+        first = a.local_id()
+        self.assertEqual(a.local_id(), first)
+        i.username = 'other'
+        self.assertNotEqual(a.local_id(), first)
+
+    def testInstitutionsShared(self):
+        c = OfxConfig(file_name=self.temp_file.name)
+        i = Institution(id='1', org='org', url='url', username='user',
+                        password='pass')
+        other = Institution(id='1', org='org', url='url', username='other',
+                            password='pass')
+        c.add_account(CreditCardAccount(institution=i, number='12345'))
+        c.add_account(CreditCardAccount(institution=i, number='67890'))
+        c.add_account(CreditCardAccount(institution=other, number='12345'))
+        c.save()
+
+        c = OfxConfig(file_name=self.temp_file.name)
+        a1, a2, a3 = c.accounts()
+        self.assertTrue(a1.institution is a2.institution)
+        self.assertTrue(a1.institution.client() is a2.institution.client())
+        self.assertFalse(a1.institution is a3.institution)
+
+    def testSharedInstitutionUpdated(self):
+        c = OfxConfig(file_name=self.temp_file.name)
+        old = Institution(id='1', org='org', url='https://a/ofx',
+                          username='user', password='old')
+        c.add_account(CreditCardAccount(institution=old, number='12345'))
+        c.add_account(CreditCardAccount(institution=old, number='67890'))
+        c.save()
+
+        c = OfxConfig(file_name=self.temp_file.name)
+        a1, a2 = c.accounts()
+        client = a1.institution.client()
+        new = Institution(id='1', org='org', url='https://b/ofx',
+                          username='user', password='new')
+        c.add_account(CreditCardAccount(institution=new, number='12345'))
+        c.save()
+        for a in (c.account(a1.local_id()), a2):
+            self.assertEqual(a.institution.password, 'new')
+            self.assertEqual(a.institution.url, 'https://b/ofx')
+        self.assertFalse(a2.institution.client() is client)
+
+
+class DictKeyring(object):
+
+    def __init__(self):
+        self.passwords = {}
+
+    def get_password(self, name, key):
+        return self.passwords.get((name, key))
+
+    def set_password(self, name, key, value):
+        self.passwords[(name, key)] = value
+
+    def delete_password(self, name, key):
+        del self.passwords[(name, key)]
+
+
+class SqliteStorageTests(unittest.TestCase):
+
+    def setUp(self):
+        self.keyring = DictKeyring()
+        for name, value in (('keyring', self.keyring),
+                            ('_keyring_available', True)):
+            patcher = mock.patch.object(ofxclient.config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.file_name = os.path.join(self.dir, 'accounts.db')
+        self.institution = Institution(id='1', org='org', url='url',
+                                       username='user', password='pass')
+
+    def account(self, number):
+        return CreditCardAccount(institution=self.institution, number=number)
+
+    def testRoundTrip(self):
+        a = self.account('12345')
+        c = OfxConfig(file_name=self.file_name)
+        self.assertTrue(isinstance(c.storage, SqliteStorage))
+        self.assertTrue(c.parser is None)
+        c.add_account(a)
+        self.assertTrue(c.is_encrypted_account(a.local_id()))
+        c.save()
+
+        key = ('ofxclient', '%sinstitution.password' % a.local_id())
+        self.assertEqual(self.keyring.passwords[key], 'pass')
+        db = sqlite3.connect(self.file_name)
+        data, = db.execute('SELECT data FROM accounts').fetchone()
+        db.close()
+        self.assertFalse('pass' in data.replace('password', ''))
+
+        c = OfxConfig(file_name=self.file_name)
+        got = c.account(a.local_id())
+        self.assertEqual(got.number, '12345')
+        self.assertEqual(got.institution.username, 'user')
+        self.assertEqual(got.institution.password, 'pass')
+        self.assertEqual(len(c.encrypted_accounts()), 1)
+
+        self.assertTrue(c.remove_account(a.local_id()))
+        c.save()
+        self.assertEqual(OfxConfig(file_name=self.file_name).accounts(), [])
+        self.assertFalse(key in self.keyring.passwords)
+
+    def testWritersDoNotClobber(self):
+        a1, a2 = self.account('12345'), self.account('67890')
+        c1 = OfxConfig(file_name=self.file_name)
+        c2 = OfxConfig(file_name=self.file_name)
+        c1.add_account(a1)
+        c2.add_account(a2)
+        c1.save()
+        c2.save()
+        c1.reload()
+        self.assertEqual([a.number for a in c1.accounts()],
+                         ['12345', '67890'])
+
+    def testMigrate(self):
+        ini = os.path.join(self.dir, 'ofxclient.ini')
+        c = OfxConfig(file_name=ini)
+        c.add_account(self.account('12345'))
+        c.add_account(self.account('67890'))
+        c.save()
+
+        self.assertEqual(migrate(ini, self.file_name), 2)
+        c = OfxConfig(file_name=self.file_name)
+        self.assertEqual([a.number for a in c.accounts()],
+                         ['12345', '67890'])
+        self.assertEqual(c.accounts()[0].institution.password, 'pass')
@@ -0,0 +1,88 @@
+import socket
+import time
+import unittest
+
+from ofxclient import Client, Institution
+from ofxclient.pool import ConnectionPool, DEFAULT_POOL
+
+
+class FakeConnection(object):
+
+    def __init__(self):
+        self.sock, self.peer = socket.socketpair()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.peer.close()
+
+
+class ConnectionPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ConnectionPool(max_idle=2, idle_timeout=60)
+        self.pool.new_connection = lambda host: FakeConnection()
+
+    def tearDown(self):
+        self.pool.clear()
+
+    def testReuse(self):
+        conn, reused = self.pool.connection('example.com')
+        self.assertFalse(reused)
+        self.pool.release('example.com', conn)
+
+        again, reused = self.pool.connection('example.com')
+        self.assertTrue(reused)
+        self.assertTrue(again is conn)
+
+        other, reused = self.pool.connection('example.org')
+        self.assertFalse(reused)
+        self.assertFalse(other is conn)
+
+    def testMaxIdle(self):
+        conns = [self.pool.connection('example.com')[0] for _ in range(3)]
+        for conn in conns:
+            self.pool.release('example.com', conn)
+        self.assertEqual(self.pool.idle_count('example.com'), 2)
+        self.assertTrue(conns[2].closed)
+
+    def testMaxIdleZeroDisablesPooling(self):
+        self.pool.max_idle = 0
+        conn, _ = self.pool.connection('example.com')
+        self.pool.release('example.com', conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.idle_count(), 0)
+
+    def testIdleExpiry(self):
+        self.pool.idle_timeout = 0.01
+        conn, _ = self.pool.connection('example.com')
+        self.pool.release('example.com', conn)
+        time.sleep(0.02)
+        again, reused = self.pool.connection('example.com')
+        self.assertFalse(reused)
+        self.assertTrue(conn.closed)
+
+    def testStaleDetection(self):
+        conn, _ = self.pool.connection('example.com')
+        self.pool.release('example.com', conn)
+        # server hangs up while the connection sits idle
+        conn.peer.close()
+        again, reused = self.pool.connection('example.com')
+        self.assertFalse(reused)
+        self.assertTrue(conn.closed)
+
+
+class ClientPoolTests(unittest.TestCase):
+
+    def testDefaultPoolShared(self):
+        i = Institution(id='1', org='org', url='https://example.com',
+                        username='username', password='password')
+        self.assertTrue(Client(institution=i).connection_pool is DEFAULT_POOL)
+        self.assertTrue('connection_pool' not in i.client().init_args)
+
+        pool = ConnectionPool()
+        c = Client(institution=i, connection_pool=pool)
+        self.assertTrue(c.connection_pool is pool)
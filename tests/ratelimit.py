@@ -0,0 +1,80 @@
+import threading
+import time
+import unittest
+
+from ofxclient import Institution
+from ofxclient.ratelimit import RateLimiter, limiter_for, reset_limiters
+
+
+class RateLimiterTests(unittest.TestCase):
+
+    def tearDown(self):
+        reset_limiters()
+
+    def testRate(self):
+        limiter = RateLimiter(rate=20, burst=1)
+        start = time.time()
+        for _ in range(3):
+            with limiter:
+                pass
+        # the first request uses the burst, the next two wait 1/20s each
+        self.assertTrue(time.time() - start >= 0.09)
+        self.assertTrue(0 < limiter.try_acquire() <= 0.05)
+
+    def testMaxConcurrent(self):
+        limiter = RateLimiter(max_concurrent=2)
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def work():
+            with limiter:
+                with lock:
+                    state['active'] += 1
+                    state['peak'] = max(state['peak'], state['active'])
+                time.sleep(0.01)
+                with lock:
+                    state['active'] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(state['peak'], 2)
+        self.assertEqual(limiter.active, 0)
+
+        limiter.acquire()
+        limiter.acquire()
+        self.assertTrue(limiter.try_acquire() is None)
+
+        released = []
+        self.assertTrue(limiter.try_acquire(
+            on_release=lambda: released.append(1)) is None)
+        limiter.release()
+        limiter.release()
+        self.assertEqual(released, [1])
+
+    def testSharedPerHost(self):
+        a = limiter_for('ofx.example.com', rate='2', max_concurrent='3')
+        self.assertTrue(limiter_for('ofx.example.com') is a)
+        self.assertFalse(limiter_for('ofx.example.org') is a)
+        self.assertEqual((a.rate, a.burst, a.max_concurrent), (2.0, 2.0, 3))
+
+    def testClientArgs(self):
+        i = Institution(id='1', org='org', url='https://ofx.example.com/',
+                        username='user', password='pass',
+                        client_args={'rate_limit': '0.5',
+                                     'max_concurrent': '2'})
+        client = i.client()
+        self.assertEqual(client.rate_limit, 0.5)
+        self.assertEqual(client.max_concurrent, 2)
+        self.assertEqual(client.init_args['rate_limit'], 0.5)
+        self.assertFalse('rate_burst' in client.init_args)
+        limiter = client.rate_limiter('ofx.example.com')
+        self.assertTrue(limiter is limiter_for('ofx.example.com'))
+        self.assertEqual(limiter.max_concurrent, 2)
+
+        self.assertTrue(Institution(
+            id='1', org='org', url='https://ofx.example.com/',
+            username='user', password='pass'
+        ).client().rate_limiter('ofx.example.com') is None)
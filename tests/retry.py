@@ -0,0 +1,161 @@
+import socket
+import time
+import unittest
+
+from ofxclient import Institution
+from ofxclient.retry import Attempts, CircuitBreaker, CircuitOpenError, \
+    RetryPolicy
+
+from tests.transport import ScriptedTransport
+
+OK = (b'<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO'
+      b'</STATUS></SONRS></SIGNONMSGSRSV1></OFX>')
+BUSY = (b'<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>2000<SEVERITY>ERROR'
+        b'</STATUS></SONRS></SIGNONMSGSRSV1></OFX>')
+BAD_PASSWORD = (b'<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>15500'
+                b'<SEVERITY>ERROR</STATUS></SONRS></SIGNONMSGSRSV1></OFX>')
+
+
+class RetryPolicyTests(unittest.TestCase):
+
+    def testDelay(self):
+        policy = RetryPolicy(backoff=1, max_backoff=5, jitter=False)
+        self.assertEqual([policy.delay(n) for n in range(1, 6)],
+                         [1, 2, 4, 5, 5])
+        policy.jitter = True
+        for n in range(1, 6):
+            self.assertTrue(0 <= policy.delay(n) <= min(5, 2 ** (n - 1)))
+
+    def testRetryable(self):
+        policy = RetryPolicy()
+        self.assertFalse(policy.retryable_error(socket.timeout()))
+        self.assertTrue(policy.retryable_error(socket.error('reset')))
+        self.assertTrue(RetryPolicy(retry_timeouts=True).retryable_error(
+            socket.timeout()))
+        self.assertFalse(policy.retryable_error(ValueError()))
+        self.assertTrue(policy.retryable_response(503, b''))
+        self.assertTrue(policy.retryable_response(200, BUSY))
+        self.assertFalse(policy.retryable_response(200, OK))
+        self.assertFalse(policy.retryable_response(200, BAD_PASSWORD))
+        self.assertFalse(policy.retryable_response(404, b'not found'))
+
+
+class AttemptsTests(unittest.TestCase):
+
+    def testDecisions(self):
+        breaker = CircuitBreaker(failure_threshold=10)
+        attempts = Attempts(RetryPolicy(max_attempts=2, backoff=0), breaker,
+                            'https://ofx.example.com/')
+        self.assertEqual(attempts.response(503, b''), 0)
+        self.assertEqual(attempts.number, 2)
+        self.assertTrue(attempts.response(503, b'') is None)
+        self.assertEqual(breaker.failures, 2)
+        self.assertTrue(attempts.response(200, OK) is None)
+        self.assertEqual(breaker.failures, 0)
+
+        # timeouts count against the bank without being retried; bugs
+        # do neither
+        self.assertTrue(attempts.error(socket.timeout()) is None)
+        self.assertEqual(breaker.failures, 1)
+        self.assertTrue(attempts.error(ValueError()) is None)
+        self.assertEqual(breaker.failures, 1)
+        attempts = Attempts(RetryPolicy(backoff=0), breaker, 'url',
+                            timeouts=(KeyError,))
+        self.assertTrue(attempts.error(KeyError()) is None)
+        self.assertEqual(breaker.failures, 2)
+        self.assertEqual(attempts.error(socket.error('reset')), 0)
+
+
+class CircuitBreakerTests(unittest.TestCase):
+
+    def testOpensAndRecovers(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        self.assertTrue(breaker.allow())
+        breaker.failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        # one trial request at a time
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+
+class ClientRetryTests(unittest.TestCase):
+
+    def client(self, transport, attempts=3, breaker=None):
+        i = Institution(id='1', org='org', url='https://ofx.example.com/',
+                        username='user', password='pass',
+                        client_args={
+                            'id': 'x',
+                            'transport': transport,
+                            'retry_policy': RetryPolicy(
+                                max_attempts=attempts, backoff=0),
+                            'circuit_breaker': breaker or CircuitBreaker()})
+        return i.client()
+
+    def testRetriesUntilSuccess(self):
+        transport = ScriptedTransport((None, socket.error('reset')),
+                                      (503, b''), (200, BUSY), (200, OK))
+        client = self.client(transport, attempts=4)
+        self.assertEqual(client.post_bytes('q'), OK)
+        self.assertEqual(transport.calls, 4)
+
+    def testGivesUp(self):
+        transport = ScriptedTransport((503, b'down'), (503, b'still down'))
+        client = self.client(transport, attempts=2)
+        self.assertEqual(client.post_bytes('q'), b'still down')
+
+        transport = ScriptedTransport((None, socket.error('reset')),
+                                      (None, socket.error('reset')))
+        client = self.client(transport, attempts=2)
+        self.assertRaises(socket.error, client.post_bytes, 'q')
+
+    def testTimeoutsNotRetried(self):
+        transport = ScriptedTransport((None, socket.timeout()), (200, OK))
+        client = self.client(transport)
+        self.assertRaises(socket.timeout, client.post_bytes, 'q')
+        self.assertEqual(transport.calls, 1)
+        client.retry_policy.retry_timeouts = True
+        self.assertEqual(client.post_bytes('q'), OK)
+
+    def testNoRetry(self):
+        transport = ScriptedTransport((200, BAD_PASSWORD), (200, OK))
+        self.assertEqual(self.client(transport).post_bytes('q'),
+                         BAD_PASSWORD)
+        transport = ScriptedTransport((None, ValueError('bug')), (200, OK))
+        self.assertRaises(ValueError, self.client(transport).post_bytes, 'q')
+        self.assertEqual(transport.calls, 1)
+
+    def testCircuitBreaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        transport = ScriptedTransport((503, b''), (503, b''), (200, OK))
+        client = self.client(transport, attempts=3, breaker=breaker)
+        self.assertRaises(CircuitOpenError, client.post_bytes, 'q')
+        self.assertEqual(transport.calls, 2)
+        self.assertRaises(CircuitOpenError, client.post_bytes, 'q')
+        self.assertEqual(transport.calls, 2)
+
+    def testTrialReleasedOnOtherErrors(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.failure()
+        time.sleep(0.06)
+        transport = ScriptedTransport((None, ValueError('bug')),
+                                      (None, KeyboardInterrupt()), (200, OK))
+        client = self.client(transport, breaker=breaker)
+        self.assertRaises(ValueError, client.post_bytes, 'q')
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertRaises(KeyboardInterrupt, client.post_bytes, 'q')
+        self.assertEqual(client.post_bytes('q'), OK)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
@@ -2,8 +2,19 @@ try:
     from configparser import ConfigParser, NoOptionError
 except ImportError:
     from ConfigParser import ConfigParser, NoOptionError
+try:
+    from io import StringIO
+except ImportError:
+    from StringIO import StringIO
+import subprocess
+import sys
 import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
 
+import ofxclient.config
 from ofxclient.config import SecurableConfigParser
 
 
@@ -116,3 +127,112 @@ class IdentifySecureOptionTests(unittest.TestCase):
         self.assertEqual(c._unsaved, {})
 
     pass
+
+
+class FakeKeyring(object):
+
+    def __init__(self, **passwords):
+        self.passwords = dict(passwords)
+        self.gets = 0
+
+    def get_password(self, name, key):
+        self.gets += 1
+        return self.passwords.get(key)
+
+    def set_password(self, name, key, value):
+        self.passwords[key] = value
+
+    def delete_password(self, name, key):
+        del self.passwords[key]
+
+
+class SecretCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.keyring = FakeKeyring(section1password='PASSWORD',
+                                   section2ssn='111-11-1111')
+        patcher = mock.patch('ofxclient.config.keyring', self.keyring)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.conf = SecurableConfigParser(keyring_available=True)
+        for section, option in (('section1', 'password'),
+                                ('section2', 'ssn')):
+            self.conf.add_section(section)
+            ConfigParser.set(self.conf, section, option,
+                             self.conf._secure_placeholder)
+
+    def testFetchedOnce(self):
+        for _ in range(3):
+            self.assertEqual(self.conf.get('section1', 'password'),
+                             'PASSWORD')
+            self.conf.items('section1')
+        self.assertEqual(self.keyring.gets, 1)
+        self.conf.clear_secret_cache()
+        self.conf.get('section1', 'password')
+        self.assertEqual(self.keyring.gets, 2)
+
+    def testNoCache(self):
+        self.conf.cache_secrets = False
+        self.conf.get('section1', 'password')
+        self.conf.get('section1', 'password')
+        self.assertEqual(self.keyring.gets, 2)
+
+    def testInvalidation(self):
+        self.conf.get('section1', 'password')
+        self.conf.set_secure('section1', 'password', 'NEW')
+        self.assertEqual(self.conf.get('section1', 'password'), 'NEW')
+        self.conf.write(StringIO())
+        self.assertEqual(self.keyring.passwords['section1password'], 'NEW')
+        self.assertEqual(self.conf.get('section1', 'password'), 'NEW')
+        self.assertEqual(self.keyring.gets, 1)
+
+        self.conf.remove_option('section1', 'password')
+        self.conf.write(StringIO())
+        self.assertFalse('section1password' in self.keyring.passwords)
+        self.assertFalse('section1password' in self.conf._secrets)
+
+    def testPrefetch(self):
+        self.assertEqual(self.conf.prefetch_secrets(workers=2), 2)
+        self.assertEqual(self.keyring.gets, 2)
+        self.assertEqual(self.conf.get('section2', 'ssn'), '111-11-1111')
+        self.assertEqual(self.conf.prefetch_secrets(), 0)
+        self.assertEqual(self.keyring.gets, 2)
+
+
+class LazyKeyringTests(unittest.TestCase):
+
+    def setUp(self):
+        self.keyring = FakeKeyring()
+        for name, value in (('keyring', self.keyring),
+                            ('_keyring_available', None)):
+            patcher = mock.patch.object(ofxclient.config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def testProbedOnFirstUse(self):
+        conf = SecurableConfigParser()
+        self.assertEqual(self.keyring.gets, 0)
+        self.assertTrue(conf.keyring_available)
+        self.assertTrue(ofxclient.config.keyring_available())
+        self.assertEqual(self.keyring.gets, 1)
+
+    def testCompatibilityName(self):
+        available = ofxclient.config.KEYRING_AVAILABLE
+        self.assertEqual(self.keyring.gets, 0)
+        self.assertTrue(available)
+        self.assertEqual(available, True)
+        self.assertEqual(self.keyring.gets, 1)
+        ofxclient.config._keyring_available = False
+        self.assertFalse(available)
+        self.assertFalse(available == True)
+
+    def testNoBackend(self):
+        self.keyring.get_password = mock.Mock(side_effect=RuntimeError)
+        self.assertFalse(SecurableConfigParser().keyring_available)
+
+    def testNotImportedByCli(self):
+        out = subprocess.check_output([sys.executable, '-c', (
+            'import sys, ofxclient.cli; '
+            'print(" ".join(m for m in ("ofxparse", "ofxhome", "keyring") '
+            'if m in sys.modules))')])
+        self.assertEqual(out.strip(), b'')
@@ -0,0 +1,126 @@
+import unittest
+
+from ofxclient import CreditCardAccount, Institution
+from ofxclient.retry import CircuitBreaker, RetryPolicy
+from ofxclient.session import Session
+from ofxclient.transport import Response, Transport
+
+SIGNON = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>%s<SEVERITY>INFO</STATUS>
+<DTSERVER>20190110120000<LANGUAGE>ENG%s</SONRS></SIGNONMSGSRSV1>
+</OFX>"""
+TOKENS = '<USERKEY>key1<TSKEYEXPIRE>20190110130000<SESSCOOKIE>sess1'
+
+# 2019-01-10 12:00:00 GMT
+NOON = 1547121600
+
+
+def signon(code=0, extra=''):
+    return (SIGNON % (code, extra)).encode()
+
+
+class SessionTests(unittest.TestCase):
+
+    def testCookies(self):
+        s = Session(max_age=60)
+        self.assertTrue(s.cookie_header(NOON) is None)
+        s.set_cookies(['sid=1; Path=/; Secure', 'lang=en; Max-Age=600',
+                       'old=x; Expires=Thu, 10 Jan 2019 11:00:00 GMT',
+                       'junk'], now=NOON)
+        self.assertEqual(s.cookie_header(NOON), 'lang=en; sid=1')
+        # the session cookie goes after max_age
+        self.assertEqual(s.cookie_header(NOON + 61), 'lang=en')
+        s.set_cookies(['lang=en; Max-Age=0'], now=NOON + 62)
+        self.assertTrue(s.cookie_header(NOON + 62) is None)
+
+    def testSignonTokens(self):
+        s = Session(max_age=60)
+        self.assertEqual(s.update(signon(extra=TOKENS), 'user', now=NOON),
+                         (0, ''))
+        self.assertEqual(s.signon_fields('user', now=NOON),
+                         {'USERKEY': 'key1', 'SESSCOOKIE': 'sess1'})
+        # the user key belongs to one user, and lasts until TSKEYEXPIRE
+        self.assertEqual(s.signon_fields('other', now=NOON),
+                         {'SESSCOOKIE': 'sess1'})
+        self.assertEqual(s.signon_fields('user', now=NOON + 61),
+                         {'USERKEY': 'key1'})
+        self.assertEqual(s.signon_fields('user', now=NOON + 3600), {})
+
+        s.set_cookies(['sid=1'], now=NOON)
+        self.assertEqual(s.update(signon(15500), 'user', now=NOON),
+                         (15500, ''))
+        self.assertEqual(s.signon_fields('user', now=NOON), {})
+        self.assertTrue(s.cookie_header(NOON) is None)
+
+
+class ScriptedBank(Transport):
+    """Hands out a cookie and signon tokens, and refuses the tokens once
+    ``expired`` is set"""
+
+    def __init__(self):
+        self.requests = []
+        self.expired = False
+
+    def post(self, url, headers, body, timing=None):
+        query = body.decode()
+        self.requests.append((dict(headers), query))
+        if self.expired and '<USERKEY>' in query:
+            return Response(200, 'OK', []), signon(15500)
+        tokens = TOKENS.replace('20190110130000', '20990101')
+        return Response(200, 'OK', [('Set-Cookie', 'sid=1; Path=/')]), \
+            signon(extra=tokens)
+
+
+class ClientSessionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.bank = ScriptedBank()
+        self.institution = Institution(
+            id='1', org='org', url='https://ofx.example.com/',
+            username='user', password='pass', client_args={
+                'id': 'x', 'transport': self.bank,
+                'retry_policy': RetryPolicy(max_attempts=1),
+                'circuit_breaker': CircuitBreaker()})
+        self.accounts = [
+            CreditCardAccount(institution=self.institution, number=n)
+            for n in ('1', '2')]
+
+    def testReused(self):
+        self.accounts[0].download_bytes(days=5)
+        self.accounts[1].download_bytes(days=5)
+        (first_headers, first), (headers, query) = self.bank.requests
+        self.assertFalse('Cookie' in first_headers)
+        self.assertTrue('<USERPASS>pass' in first)
+        self.assertEqual(headers['Cookie'], 'sid=1')
+        self.assertTrue('<USERKEY>key1' in query)
+        self.assertTrue('<SESSCOOKIE>sess1' in query)
+        self.assertFalse('<USERID>' in query)
+        self.assertFalse('<USERPASS>' in query)
+
+    def testRejected(self):
+        self.accounts[0].download_bytes(days=5)
+        self.bank.expired = True
+        self.assertTrue(b'sess1' in self.accounts[1].download_bytes(days=5))
+        refused, (headers, query) = self.bank.requests[1:]
+        self.assertTrue('<USERKEY>' in refused[1])
+        self.assertFalse('Cookie' in headers)
+        self.assertTrue('<USERPASS>pass' in query)
+        self.assertFalse('<SESSCOOKIE>' in query)
+        # the same statement request, with a new signon
+        self.assertEqual(refused[1].split('</SIGNONMSGSRQV1>')[1],
+                         query.split('</SIGNONMSGSRQV1>')[1])
+
+    def testExplicitCredentialsAndOptOut(self):
+        self.accounts[0].download_bytes(days=5)
+        self.institution.authenticate(username='user', password='new')
+        self.assertTrue('<USERPASS>new' in self.bank.requests[-1][1])
+
+        self.institution.client_args['reuse_session'] = 'false'
+        self.accounts[1].download_bytes(days=5)
+        headers, query = self.bank.requests[-1]
+        self.assertFalse('Cookie' in headers)
+        self.assertTrue('<USERPASS>pass' in query)
+        self.assertEqual(self.institution.client().init_args['reuse_session'],
+                         False)
@@ -0,0 +1,209 @@
+import datetime
+from decimal import Decimal
+from io import BytesIO, StringIO
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from ofxclient import sgml
+from ofxclient import Client
+from ofxclient import BankAccount, BrokerageAccount, CreditCardAccount
+from ofxclient import Institution
+from ofxclient.transport import Response
+
+SGML = (
+    'OFXHEADER:100\r\nDATA:OFXSGML\r\n\r\n'
+    '<OFX>\r\n<SIGNONMSGSRSV1><SONRS><STATUS><CODE>0\r\n<SEVERITY>INFO'
+    '<MESSAGE>Hi &amp; welcome</STATUS><DTSERVER>20190301</SONRS>'
+    '</SIGNONMSGSRSV1><SIGNUPMSGSRSV1><ACCTINFOTRNRS><ACCTINFORS>'
+    '<ACCTINFO><DESC>Checking<BANKACCTINFO><BANKACCTFROM><BANKID>9'
+    '<ACCTID>111<ACCTTYPE>CHECKING</BANKACCTFROM><SVCSTATUS>ACTIVE'
+    '</BANKACCTINFO></ACCTINFO>'
+    '<ACCTINFO><BANKACCTINFO><BANKACCTFROM><ACCTID>222</BANKACCTFROM>'
+    '</BANKACCTINFO><INVACCTINFO><INVACCTFROM><BROKERID>b.com'
+    '<ACCTID>333</INVACCTFROM></INVACCTINFO></ACCTINFO>'
+    '<ACCTINFO><DESC>Card<CCACCTINFO><CCACCTFROM><ACCTID>444'
+    '</ACCTINFO>'
+    '</ACCTINFORS></ACCTINFOTRNRS></SIGNUPMSGSRSV1></OFX>'
+)
+
+XML = (
+    '<?xml version="1.0"?><?OFX OFXHEADER="200"?>'
+    '<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>15500</CODE>'
+    '<SEVERITY>ERROR</SEVERITY><MESSAGE>bad password</MESSAGE></STATUS>'
+    '</SONRS></SIGNONMSGSRSV1></OFX>'
+)
+
+
+class ScannerTests(unittest.TestCase):
+
+    def testTokens(self):
+        got = list(sgml.tokens('HEADER<OFX><A>1 &lt;2<B/></c></OFX>'))
+        self.assertEqual(got, [
+            (sgml.AGGREGATE, 'OFX', None),
+            (sgml.ELEMENT, 'A', '1 <2'),
+            (sgml.ELEMENT, 'B', ''),
+            (sgml.END, 'C', None),
+            (sgml.END, 'OFX', None),
+        ])
+
+    def testChunkBoundaries(self):
+        whole = list(sgml.tokens(SGML))
+        for size in (1, 2, 3, 7, 64):
+            self.assertEqual(
+                list(sgml.tokens(StringIO(SGML), chunk_size=size)), whole)
+            self.assertEqual(
+                list(sgml.tokens(BytesIO(SGML.encode()), chunk_size=size)),
+                whole)
+
+    def testWalkClosesImplicitly(self):
+        events = [(k, n, p) for k, n, v, p in
+                  sgml.walk('<A><B><C>1</A><D>2')]
+        self.assertEqual(events, [
+            (sgml.AGGREGATE, 'A', ()),
+            (sgml.AGGREGATE, 'B', ('A',)),
+            (sgml.ELEMENT, 'C', ('A', 'B')),
+            (sgml.END, 'B', ('A',)),
+            (sgml.END, 'A', ()),
+            (sgml.ELEMENT, 'D', ()),
+        ])
+
+    def testSignonStatus(self):
+        self.assertEqual(sgml.signon_status(SGML), (0, 'Hi & welcome'))
+        self.assertEqual(sgml.signon_status(XML), (15500, 'bad password'))
+        self.assertTrue(sgml.signon_status('<OFX></OFX>') is None)
+
+    def testStatuses(self):
+        self.assertEqual(sgml.statuses(SGML), ((0, 'Hi & welcome'), [
+            ('ACCTINFOTRNRS', None, '')]))
+        self.assertEqual(sgml.statuses(
+            '<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>0</STATUS></SONRS>'
+            '</SIGNONMSGSRSV1><BANKMSGSRSV1><STMTTRNRS><TRNUID>1<STATUS>'
+            '<CODE>2000<SEVERITY>ERROR<MESSAGE>down</STATUS></STMTTRNRS>'
+            '<STMTTRNRS><STATUS></STATUS></STMTTRNRS></BANKMSGSRSV1></OFX>'),
+            ((0, ''), [('STMTTRNRS', 2000, 'down'), ('STMTTRNRS', None, '')]))
+
+    def testAccountList(self):
+        status, accounts = sgml.account_list(SGML)
+        self.assertEqual(status, (0, 'Hi & welcome'))
+        self.assertEqual([(a['type'], a['ACCTID'], a['desc'])
+                          for a in accounts], [
+            ('BANKACCTINFO', '111', 'Checking'),
+            ('INVACCTINFO', '333', None),
+            ('CCACCTINFO', '444', 'Card'),
+        ])
+        self.assertEqual(accounts[0]['BANKID'], '9')
+        self.assertEqual(accounts[1]['BROKERID'], 'b.com')
+
+
+class InstitutionScannerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.institution = Institution(
+                id='1',
+                org='org',
+                url='https://example.com',
+                username='username',
+                password='password'
+        )
+
+    def testAccounts(self):
+        accounts = self.institution._accounts_from_response(SGML)
+        self.assertEqual([type(a) for a in accounts],
+                         [BankAccount, BrokerageAccount, CreditCardAccount])
+        self.assertEqual(accounts[0].routing_number, '9')
+        self.assertEqual(accounts[0].account_type, 'CHECKING')
+        self.assertEqual(accounts[0].description, 'Checking')
+        self.assertEqual(accounts[1].broker_id, 'b.com')
+        self.assertEqual(accounts[1].description, '***333')
+        self.assertTrue(accounts[2].institution is self.institution)
+
+    def testSignonErrors(self):
+        self.assertEqual(self.institution._check_authentication(SGML), 1)
+        self.assertRaises(ValueError,
+                          self.institution._check_authentication, XML)
+        self.assertRaises(ValueError,
+                          self.institution._accounts_from_response, XML)
+
+
+STATEMENT = (
+    '<OFX><INVSTMTMSGSRSV1><INVSTMTTRNRS><INVSTMTRS><INVTRANLIST>'
+    '<DTSTART>20190101<DTEND>20190301'
+    '<BUYSTOCK><INVBUY><INVTRAN><FITID>b1<DTTRADE>20190102'
+    '<MEMO>buy</INVTRAN><SECID><UNIQUEID>123456789<UNIQUEIDTYPE>CUSIP'
+    '</SECID><UNITS>10<TOTAL>-100.50</INVBUY><BUYTYPE>BUY</BUYSTOCK>'
+    '<INVBANKTRAN><STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20190103120000'
+    '<TRNAMT>5,25<FITID>c1<NAME>Interest</STMTTRN>'
+    '<SUBACCTFUND>CASH</INVBANKTRAN>'
+    '</INVTRANLIST></INVSTMTRS></INVSTMTTRNRS></INVSTMTMSGSRSV1></OFX>'
+)
+
+
+class TransactionScannerTests(unittest.TestCase):
+
+    def testTransactions(self):
+        got = list(sgml.transactions(StringIO(STATEMENT)))
+        self.assertEqual(len(got), 2)
+        buy, interest = got
+        self.assertEqual(buy.fitid, 'b1')
+        self.assertEqual(buy.type, 'buystock')
+        self.assertEqual(buy.amount, Decimal('-100.50'))
+        self.assertEqual(buy.date, datetime.datetime(2019, 1, 2))
+        self.assertEqual(buy.name, '123456789')
+        self.assertEqual(buy.memo, 'buy')
+        self.assertEqual(interest.fitid, 'c1')
+        self.assertEqual(interest.type, 'credit')
+        self.assertEqual(interest.amount, Decimal('5.25'))
+        self.assertEqual(interest.date,
+                         datetime.datetime(2019, 1, 3, 12, 0, 0))
+        self.assertEqual(interest.name, 'Interest')
+        self.assertTrue(interest.memo is None)
+
+    def testIterTransactions(self):
+        i = Institution(id='1', org='org', url='https://example.com',
+                        username='username', password='password')
+        a = BrokerageAccount(institution=i, number='1', broker_id='b')
+        with mock.patch.object(Client, 'post_bytes',
+                               return_value=STATEMENT.encode()):
+            got = a.iter_transactions(days=5)
+            self.assertEqual([t.fitid for t in got], ['b1', 'c1'])
+
+
+class DecodeTests(unittest.TestCase):
+
+    def testHeaderEncoding(self):
+        self.assertEqual(sgml.header_encoding(
+            b'OFXHEADER:100\r\nENCODING:USASCII\r\nCHARSET:1252\r\n<OFX>'),
+            'cp1252')
+        self.assertEqual(sgml.header_encoding(
+            b'OFXHEADER:100\r\nENCODING:UTF-8\r\nCHARSET:NONE\r\n<OFX>'),
+            'utf-8')
+        self.assertEqual(sgml.header_encoding(
+            b'<?xml version="1.0" encoding="UTF-8"?><OFX>'), 'utf-8')
+        self.assertEqual(sgml.header_encoding(b'<OFX>'), 'cp1252')
+
+    def testDecodeUnicode(self):
+        data = (b'OFXHEADER:100\r\nENCODING:UNICODE\r\nCHARSET:NONE\r\n'
+                b'<OFX><NAME>Caf\xc3\xa9</OFX>')
+        self.assertEqual(sgml.header_encoding(data), 'utf-8')
+        self.assertEqual(list(sgml.tokens(BytesIO(data)))[1],
+                         (sgml.ELEMENT, 'NAME', 'Caf\xe9'))
+
+    def testDecodeKeepsCp1252(self):
+        data = b'CHARSET:1252\r\n<OFX><NAME>Caf\xe9 \x80</OFX>'
+        self.assertEqual(sgml.decode(data),
+                         'CHARSET:1252\r\n<OFX><NAME>Caf\xe9 \u20ac</OFX>')
+        self.assertEqual(list(sgml.tokens(BytesIO(data)))[1],
+                         (sgml.ELEMENT, 'NAME', 'Caf\xe9 \u20ac'))
+
+    def testPostDecodes(self):
+        i = Institution(id='1', org='org', url='https://example.com',
+                        username='username', password='password')
+        data = b'ENCODING:UTF-8\r\n<OFX><NAME>Caf\xc3\xa9</OFX>'
+        with mock.patch.object(Client, '_do_post',
+                               return_value=(Response(200, 'OK', []), data)):
+            self.assertEqual(i.client().post_bytes('q'), data)
+            self.assertEqual(i.client().post('q'),
+                             'ENCODING:UTF-8\r\n<OFX><NAME>Caf\xe9</OFX>')
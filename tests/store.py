@@ -0,0 +1,88 @@
+import datetime
+from decimal import Decimal
+import unittest
+
+from ofxclient import CreditCardAccount, Institution
+from ofxclient.store import TransactionStore
+
+
+class FakeTransaction(object):
+
+    def __init__(self, id, date, amount, payee='payee', memo='memo'):
+        self.id = id
+        self.date = date
+        self.amount = amount
+        self.payee = payee
+        self.memo = memo
+        self.type = 'debit'
+        self.checknum = ''
+
+
+class FakeStatement(object):
+
+    def __init__(self, transactions):
+        self.transactions = transactions
+
+
+class TransactionStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TransactionStore(file_name=':memory:')
+        i = Institution(id='1', org='org', url='https://example.com',
+                        username='user', password='pass')
+        self.account = CreditCardAccount(institution=i, number='12345')
+
+    def tearDown(self):
+        self.store.close()
+
+    def statement(self, *transactions):
+        return FakeStatement([
+            FakeTransaction(fitid, datetime.datetime(2019, 1, day),
+                            Decimal(amount))
+            for fitid, day, amount in transactions
+        ])
+
+    def testUpsertOnFitid(self):
+        self.store.ingest(self.account, self.statement(
+            ('a', 1, '-10.00'), ('b', 2, '-20.50')))
+        self.store.ingest(self.account, self.statement(
+            ('b', 2, '-21.50'), ('c', 3, '100.00')))
+        self.assertEqual(self.store.count(self.account), 3)
+        self.assertEqual(self.store.count('someone else'), 0)
+        b = self.store.transaction(self.account, 'b')
+        self.assertEqual(b.amount, Decimal('-21.50'))
+        self.assertEqual(b.date, datetime.datetime(2019, 1, 2))
+        self.assertEqual(b.account, self.account.local_id())
+
+    def testRangeQueries(self):
+        self.store.ingest(self.account, self.statement(
+            ('a', 1, '-10.00'), ('b', 2, '-20.50'), ('c', 3, '100.00'),
+            ('d', 4, '5.00')))
+
+        got = self.store.transactions(self.account,
+                                      start=datetime.date(2019, 1, 2),
+                                      end=datetime.date(2019, 1, 4))
+        self.assertEqual([t.fitid for t in got], ['b', 'c'])
+
+        got = self.store.transactions(self.account, min_amount=0)
+        self.assertEqual([t.fitid for t in got], ['c', 'd'])
+
+        got = self.store.transactions(self.account.local_id(),
+                                      min_amount=-15, max_amount=10)
+        self.assertEqual([t.fitid for t in got], ['a', 'd'])
+
+    def testAmountsExact(self):
+        self.store.ingest(self.account, self.statement(
+            ('a', 1, '100000000000000.02'), ('b', 2, '-0.10'),
+            ('c', 3, '0.30')))
+        self.assertEqual(str(self.store.transaction(self.account, 'b').amount),
+                         '-0.10')
+        # as floats, both ends are 100000000000000.015625
+        got = self.store.transactions(
+            self.account, max_amount=Decimal('100000000000000.01'))
+        self.assertEqual([t.fitid for t in got], ['b', 'c'])
+        got = self.store.transactions(self.account, min_amount=0.1 + 0.2)
+        self.assertEqual([t.fitid for t in got], ['a'])
+        got = self.store.transactions(self.account, min_amount=0.3,
+                                      max_amount=Decimal('0.3'))
+        self.assertEqual([t.fitid for t in got], ['c'])
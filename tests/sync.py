@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from ofxclient import BankAccount, CreditCardAccount, Institution
+from ofxclient.retry import CircuitBreaker, RetryPolicy
+from ofxclient.sync import select_accounts, sync_accounts
+from ofxclient.transport import Response, Transport
+
+from tests.transport import EchoTransport
+
+
+class BrokenTransport(Transport):
+
+    def post(self, url, headers, body, timing=None):
+        raise socket.error('connection refused')
+
+
+class RefusingTransport(Transport):
+    """Answers with an HTTP ``status`` and ``body``"""
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    def post(self, url, headers, body, timing=None):
+        return Response(self.status, 'OK', []), self.body
+
+
+BAD_PASSWORD = (b'<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>15500'
+                b'<SEVERITY>ERROR<MESSAGE>bad password</STATUS></SONRS>'
+                b'</SIGNONMSGSRSV1></OFX>')
+
+
+class SyncTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.amex = self.institution('1', 'AMEX', EchoTransport())
+        self.bank = self.institution('2', 'BANK', BrokenTransport())
+        self.accounts = [
+            CreditCardAccount(institution=self.amex, number='1'),
+            CreditCardAccount(institution=self.amex, number='2'),
+            BankAccount(institution=self.bank, number='3',
+                        routing_number='123', account_type='CHECKING'),
+        ]
+
+    def institution(self, id, org, transport):
+        return Institution(
+            id=id, org=org, url='https://ofx%s.example.com/' % id,
+            username='user', password='pass', client_args={
+                'id': 'x', 'transport': transport,
+                'retry_policy': RetryPolicy(max_attempts=1),
+                'circuit_breaker': CircuitBreaker()})
+
+    def testSelect(self):
+        a1, a2, a3 = self.accounts
+        self.assertEqual(select_accounts(self.accounts), self.accounts)
+        self.assertEqual(
+            select_accounts(self.accounts, ids=[a3.local_id(), a1.local_id()]),
+            [a1, a3])
+        self.assertEqual(select_accounts(self.accounts, institutions=['amex']),
+                         [a1, a2])
+        self.assertEqual(select_accounts(self.accounts, types=['bank']), [a3])
+        self.assertEqual(select_accounts(self.accounts, types=['creditcard'],
+                                         institutions=['2']), [])
+
+    def testSync(self):
+        summary = sync_accounts(self.accounts, self.dir, workers=3)
+        json.dumps(summary)
+        self.assertEqual((summary['succeeded'], summary['failed']), (2, 1))
+
+        ok, _, failed = summary['accounts']
+        self.assertTrue(ok['ok'])
+        self.assertEqual(ok['type'], 'creditcard')
+        self.assertEqual(ok['file'],
+                         os.path.join(self.dir, '%s.ofx' % ok['local_id']))
+        with open(ok['file'], 'rb') as fp:
+            self.assertEqual(len(fp.read()), ok['bytes'])
+        self.assertEqual(len(ok['requests']), 1)
+        self.assertTrue(ok['seconds'] >= 0)
+
+        self.assertFalse(failed['ok'])
+        self.assertTrue('connection refused' in failed['error'])
+        self.assertTrue(failed['file'] is None)
+        self.assertEqual(failed['bytes'], 0)
+        self.assertEqual(len(failed['requests']), 1)
+
+        # the hooks are taken off again
+        self.assertEqual([a.hooks for a in self.accounts], [[], [], []])
+
+    def testRefusedIsFailure(self):
+        accounts = [
+            CreditCardAccount(institution=self.institution(
+                '3', 'BAD', RefusingTransport(200, BAD_PASSWORD)), number='1'),
+            CreditCardAccount(institution=self.institution(
+                '4', 'DOWN', RefusingTransport(503, b'<html>down</html>')),
+                number='1'),
+        ]
+        summary = sync_accounts(accounts, self.dir)
+        self.assertEqual((summary['succeeded'], summary['failed']), (0, 2))
+        refused, down = summary['accounts']
+        self.assertTrue('bad password' in refused['error'])
+        self.assertTrue('503' in down['error'])
+        self.assertEqual([r['file'] for r in summary['accounts']],
+                         [None, None])
+        self.assertEqual(os.listdir(self.dir), [])
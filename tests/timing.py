@@ -0,0 +1,139 @@
+import socket
+import unittest
+
+from ofxclient import CreditCardAccount, Institution
+from ofxclient import timing
+from ofxclient.pool import TimedHTTPSConnection
+from ofxclient.retry import CircuitBreaker, RetryPolicy
+
+from tests.transport import ScriptedTransport
+
+STATEMENT = b"""OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS>
+<DTSERVER>20190110120000<LANGUAGE>ENG</SONRS></SIGNONMSGSRSV1>
+<CREDITCARDMSGSRSV1><CCSTMTTRNRS><TRNUID>1<STATUS><CODE>0
+<SEVERITY>INFO</STATUS><CCSTMTRS><CURDEF>USD<CCACCTFROM><ACCTID>12345
+</CCACCTFROM><BANKTRANLIST><DTSTART>20190101<DTEND>20190110
+</BANKTRANLIST><LEDGERBAL><BALAMT>-10.00<DTASOF>20190110</LEDGERBAL>
+</CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1></OFX>"""
+
+
+class ClientTimingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.institution = Institution(
+            id='1', org='org', url='https://ofx.example.com:8443/ofx',
+            username='user', password='pass', client_args={
+                'id': 'x',
+                'retry_policy': RetryPolicy(max_attempts=1),
+                'circuit_breaker': CircuitBreaker()})
+        self.account = CreditCardAccount(institution=self.institution,
+                                         number='12345')
+        self.account.add_hook(self.events.append)
+
+    def use(self, transport):
+        self.institution.client_args['transport'] = transport
+
+    def testRequestAndParse(self):
+        self.use(ScriptedTransport((200, [], STATEMENT)))
+        self.account.download_parsed(days=5)
+        request, parse = self.events
+        self.assertEqual(request.kind, 'request')
+        self.assertEqual(request.host, 'ofx.example.com:8443')
+        self.assertEqual(request.status, 200)
+        self.assertEqual(request.phases, {'server': 0.25})
+        self.assertEqual(request.bytes_received, len(STATEMENT))
+        self.assertTrue(request.bytes_sent > 0)
+        self.assertFalse(request.cookie_retry)
+        self.assertTrue(request.total >= 0)
+        self.assertTrue(request.error is None)
+        self.assertEqual(parse.kind, 'parse')
+        self.assertEqual(parse.account, self.account.local_id())
+        self.assertEqual(parse.size, len(STATEMENT))
+
+    def testCookieRetry(self):
+        self.use(ScriptedTransport(
+            (200, [('Set-Cookie', 'session=1')], b''),
+            (200, [], STATEMENT)))
+        self.account.download_bytes(days=5)
+        request, = self.events
+        self.assertTrue(request.cookie_retry)
+        self.assertEqual(request.phases, {'server': 0.5})
+        self.assertEqual(request.bytes_received, len(STATEMENT))
+
+    def testError(self):
+        error = socket.error('reset')
+        self.use(ScriptedTransport((None, [], error)))
+        self.assertRaises(socket.error, self.account.download_bytes, days=5)
+        request, = self.events
+        self.assertTrue(request.error is error)
+        self.assertTrue(request.status is None)
+
+    def testGlobalHookAndBrokenHook(self):
+        seen = []
+
+        def broken(event):
+            raise RuntimeError('boom')
+
+        timing.add_hook(broken)
+        timing.add_hook(seen.append)
+        try:
+            self.use(ScriptedTransport((200, [], STATEMENT)))
+            self.institution.client().post_bytes('q')
+        finally:
+            timing.remove_hook(broken)
+            timing.remove_hook(seen.append)
+        self.assertEqual([e.kind for e in seen], ['request'])
+
+
+class LatencyHistogramsTests(unittest.TestCase):
+
+    def request(self, host, total, status=200, error=None, **phases):
+        t = timing.RequestTiming('https://%s/' % host, host)
+        for phase, seconds in phases.items():
+            t.add(phase, seconds)
+        t.status = status
+        t.finish(error=error)
+        t.total = total
+        return t
+
+    def testHistograms(self):
+        h = timing.LatencyHistograms(buckets=(0.1, 1, 10))
+        h(self.request('a', 0.05, server=0.04))
+        h(self.request('a', 0.5, server=0.4))
+        h(self.request('a', 20, status=None, error=socket.timeout()))
+        h(self.request('b', 2, connect=1.5))
+        h(timing.ParseTiming('a', 'acct', 0.3, 100))
+
+        self.assertEqual(h.hosts(), ['a', 'b'])
+        self.assertEqual(h.histogram('a'),
+                         [(0.1, 1), (1, 1), (10, 0), (None, 1)])
+        self.assertEqual(h.histogram('b', 'server'),
+                         [(0.1, 0), (1, 0), (10, 0), (None, 0)])
+
+        summary = h.summary()
+        self.assertEqual(summary['a']['total']['count'], 3)
+        self.assertEqual(summary['a']['total']['p50'], 1)
+        self.assertEqual(summary['a']['total']['max'], 20)
+        self.assertEqual(summary['a']['parse']['count'], 1)
+        self.assertEqual(summary['a']['statuses'], {200: 2, 'error': 1})
+        self.assertEqual(summary['b']['connect']['p95'], 1.5)
+
+
+class TimedConnectionTests(unittest.TestCase):
+
+    def testConnectPhases(self):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+        try:
+            conn = TimedHTTPSConnection('127.0.0.1', port)
+            sock = conn._timed_create_connection(('127.0.0.1', port), 5)
+            sock.close()
+        finally:
+            server.close()
+        self.assertEqual(sorted(conn.timings), ['connect', 'dns'])
@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ofxclient import CreditCardAccount, Institution
+from ofxclient.transport import (
+    RecordingTransport,
+    ReplayTransport,
+    Response,
+    Transport
+)
+
+URL = 'https://ofx.example.com/cgi-ofx/ofx'
+
+RESPONSE = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS>
+<DTSERVER>20190110120000</SONRS></SIGNONMSGSRSV1>
+<CREDITCARDMSGSRSV1><CCSTMTTRNRS><TRNUID>%s<STATUS><CODE>0
+<SEVERITY>INFO</STATUS><CCSTMTRS><CURDEF>USD<CCACCTFROM><ACCTID>12345
+</CCACCTFROM></CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1></OFX>"""
+
+
+class EchoTransport(Transport):
+    """Answers every request with a statement echoing its TRNUID"""
+
+    def __init__(self):
+        self.requests = []
+
+    def post(self, url, headers, body, timing=None):
+        self.requests.append((url, headers, body))
+        query = body.decode()
+        trnuid = query.split('<TRNUID>')[1].split()[0]
+        res = Response(200, 'OK', [('Content-Type', 'application/x-ofx'),
+                                   ('Set-Cookie', 'session=secret')])
+        return res, (RESPONSE % trnuid).encode()
+
+
+class ScriptedTransport(Transport):
+    """Serves the given (status, body) or (status, headers, body) in
+    turn, each taking 0.25s of server time; a body that is an exception
+    is raised instead"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def post(self, url, headers, body, timing=None):
+        self.calls += 1
+        scripted = self.responses.pop(0)
+        if len(scripted) == 2:
+            scripted = (scripted[0], [], scripted[1])
+        status, headers, response = scripted
+        if isinstance(response, BaseException):
+            raise response
+        if timing is not None:
+            timing.add('server', 0.25)
+        return Response(status, 'OK', headers), response
+
+
+class TransportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.institution = Institution(
+            id='1', org='org', url=URL, username='someuser',
+            password='hunter2', client_args={'id': 'x'})
+        self.account = CreditCardAccount(institution=self.institution,
+                                         number='12345')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def client(self, transport):
+        client = self.institution.client()
+        client.transport = transport
+        self.institution.client = lambda: client
+        return client
+
+    def record(self):
+        echo = EchoTransport()
+        self.client(RecordingTransport(self.dir, transport=echo))
+        return self.account.download_bytes(days=5), echo
+
+    def testRecordRedactsCredentials(self):
+        response, echo = self.record()
+        self.assertEqual(len(echo.requests), 1)
+        self.assertTrue(b'hunter2' in echo.requests[0][2])
+        names = os.listdir(self.dir)
+        self.assertEqual(len(names), 1)
+        with open(os.path.join(self.dir, names[0])) as fp:
+            saved = fp.read()
+        self.assertFalse('hunter2' in saved)
+        self.assertFalse('someuser' in saved)
+        self.assertFalse('session=secret' in saved)
+        self.assertTrue('REDACTED' in saved)
+
+    def testRecordRedactsSessionTokens(self):
+        class TokenTransport(EchoTransport):
+            def post(self, url, headers, body, timing=None):
+                res, response = EchoTransport.post(self, url, headers, body)
+                return res, response.replace(
+                    b'</SONRS>', b'<USERKEY>live-key<SESSCOOKIE>live-sess'
+                                 b'</SONRS>')
+        self.client(RecordingTransport(self.dir, transport=TokenTransport()))
+        self.assertTrue(b'live-key' in self.account.download_bytes(days=5))
+        name, = os.listdir(self.dir)
+        with open(os.path.join(self.dir, name)) as fp:
+            saved = fp.read()
+        self.assertFalse('live-key' in saved)
+        self.assertFalse('live-sess' in saved)
+        self.assertTrue('<USERKEY>REDACTED' in saved)
+
+    def testReplay(self):
+        self.record()
+        self.client(ReplayTransport(self.dir))
+        # a later download has a fresh TRNUID and date; the replayed
+        # response must carry the new TRNUID
+        query = self.account._download_query(as_of='20190101')
+        client = self.institution.client()
+        res, body = client._do_post(query)
+        self.assertEqual(res.status, 200)
+        trnuid = query.split('<TRNUID>')[1].split()[0]
+        self.assertTrue(('<TRNUID>%s' % trnuid).encode() in body)
+
+    def testReplayLatency(self):
+        self.record()
+        self.client(ReplayTransport(self.dir, latency=0.05))
+        start = time.time()
+        self.account.download_bytes(days=5)
+        self.assertTrue(time.time() - start >= 0.05)
+
+    def testReplayUnknownRequest(self):
+        self.record()
+        client = self.client(ReplayTransport(self.dir))
+        self.assertRaises(ValueError, client.post_bytes,
+                          client.account_list_query())
@@ -0,0 +1,121 @@
+import threading
+import time
+import unittest
+from io import BytesIO
+try:
+    from io import StringIO
+except ImportError:
+    from StringIO import StringIO
+
+from ofxclient import CreditCardAccount, Institution
+from ofxclient.util import (
+    combined_download, combined_download_to, download_accounts,
+    iter_downloads
+)
+
+
+class FakeAccount(CreditCardAccount):
+
+    tracker = None
+
+    def download(self, days=60):
+        return StringIO(self.download_bytes(days=days).decode())
+
+    def download_bytes(self, days=60):
+        self.tracker.enter(self)
+        try:
+            time.sleep(0.01)
+            if self.number == 'bad':
+                raise IOError('bank is down')
+            return ('HEADER<OFX><ACCT>%s</ACCT></OFX>' % self.number).encode()
+        finally:
+            self.tracker.leave(self)
+
+
+class Tracker(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+        self.total = 0
+        self.peak_total = 0
+
+    def enter(self, account):
+        url = account.institution.url
+        with self.lock:
+            self.active[url] = self.active.get(url, 0) + 1
+            self.total += 1
+            self.peak[url] = max(self.peak.get(url, 0), self.active[url])
+            self.peak_total = max(self.peak_total, self.total)
+
+    def leave(self, account):
+        with self.lock:
+            self.active[account.institution.url] -= 1
+            self.total -= 1
+
+
+def make_accounts(numbers, url='https://bank1'):
+    i = Institution(id='1', org='org', url=url,
+                    username='user', password='pass')
+    return [FakeAccount(institution=i, number=n) for n in numbers]
+
+
+class DownloadAccountsTests(unittest.TestCase):
+
+    def setUp(self):
+        FakeAccount.tracker = self.tracker = Tracker()
+
+    def testOrderAndFailureIsolation(self):
+        accounts = make_accounts(['1', 'bad', '3', '4'])
+        results = download_accounts(accounts, workers=3)
+        self.assertEqual([a for a, _, _ in results], accounts)
+        self.assertEqual(results[0][1],
+                         'HEADER<OFX><ACCT>1</ACCT></OFX>')
+        self.assertTrue(results[1][1] is None)
+        self.assertTrue(isinstance(results[1][2], IOError))
+        self.assertTrue(results[3][2] is None)
+
+    def testLimits(self):
+        accounts = make_accounts([str(n) for n in range(6)]) + \
+            make_accounts([str(n) for n in range(6)], url='https://bank2')
+        download_accounts(accounts, workers=3, per_institution=1)
+        self.assertEqual(self.tracker.peak['https://bank1'], 1)
+        self.assertEqual(self.tracker.peak['https://bank2'], 1)
+        self.assertTrue(self.tracker.peak_total <= 3)
+
+    def testBoundedAhead(self):
+        accounts = make_accounts([str(n) for n in range(10)])
+        started = []
+        enter = self.tracker.enter
+        self.tracker.enter = lambda a: (started.append(a.number), enter(a))
+        downloads = iter_downloads(accounts, workers=3)
+        next(downloads)
+        time.sleep(0.1)
+        # with only the first result taken, downloads stay within 3
+        # accounts of the next one
+        self.assertEqual(sorted(started), ['0', '1', '2', '3'])
+        self.assertEqual([e for _, _, e in downloads], [None] * 9)
+        self.assertEqual(len(started), 10)
+
+    def testCombinedParallel(self):
+        accounts = make_accounts(['1', 'bad', '3'])
+        sequential = make_accounts(['1', '3'])
+        self.assertEqual(
+            combined_download(accounts, workers=2).read().partition('<OFX>')[2],
+            combined_download(sequential).read().partition('<OFX>')[2])
+        self.assertRaises(IOError, combined_download, accounts)
+
+    def testCombinedDownloadTo(self):
+        accounts = make_accounts(['1', '2'])
+        sink = BytesIO()
+        written = combined_download_to(sink, accounts)
+        data = sink.getvalue()
+        self.assertEqual(written, len(data))
+        self.assertTrue(data.startswith(b'OFXHEADER:100'))
+        self.assertEqual(
+            data.partition(b'<OFX>')[2],
+            b'<ACCT>1</ACCT><ACCT>2</ACCT></OFX>')
+        self.assertEqual(
+            data.partition(b'<OFX>')[2].decode(),
+            combined_download(accounts).read().partition('<OFX>')[2])
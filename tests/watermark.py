@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from ofxclient import Client, CreditCardAccount, Institution
+from ofxclient.watermark import (
+    WatermarkStore, default_store, since, watermark_from_response
+)
+
+RESPONSE = (
+    '<OFX><SIGNONMSGSRSV1><SONRS><DTSERVER>20190301083000</SONRS>'
+    '</SIGNONMSGSRSV1><CREDITCARDMSGSRSV1><CCSTMTTRNRS><CCSTMTRS>'
+    '<BANKTRANLIST><DTSTART>20190101<DTEND>20190228120000.000[-5:EST]'
+    '</BANKTRANLIST></CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1></OFX>'
+)
+
+
+class WatermarkTests(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.file_name = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def testFromResponse(self):
+        self.assertEqual(watermark_from_response(RESPONSE),
+                         '20190228120000.000[-5:EST]')
+        no_dtend = RESPONSE.replace('<DTEND>', '<DTFOO>')
+        self.assertEqual(watermark_from_response(no_dtend), '20190301083000')
+        error = '<OFX><SONRS><DTSERVER>20190301083000</SONRS></OFX>'
+        self.assertTrue(watermark_from_response(error) is None)
+
+    def testSince(self):
+        self.assertEqual(since('20190302120000', overlap_days=3), '20190227')
+        self.assertEqual(since('20190302', overlap_days=0), '20190302')
+
+    def testStorePersists(self):
+        store = WatermarkStore(file_name=self.file_name)
+        self.assertTrue(store.get('abc') is None)
+        store.set('abc', '20190101').save()
+        self.assertEqual(WatermarkStore(self.file_name).get('abc'),
+                         '20190101')
+
+    def testStoresMerge(self):
+        one = WatermarkStore(file_name=self.file_name)
+        two = WatermarkStore(file_name=self.file_name)
+        one.set('a', '20190101').save()
+        two.set('b', '20190102').save()
+        one.remove('a')
+        one.save()
+        self.assertEqual(WatermarkStore(self.file_name)._read(),
+                         {'b': '20190102'})
+        self.assertEqual(one.get('b'), '20190102')
+
+    def testDefaultStoreShared(self):
+        self.assertTrue(default_store(self.file_name) is
+                        default_store(self.file_name))
+
+    def testDownloadSinceLast(self):
+        store = WatermarkStore(file_name=self.file_name)
+        i = Institution(id='1', org='org', url='https://example.com',
+                        username='user', password='pass')
+        a = CreditCardAccount(institution=i, number='12345')
+
+        with mock.patch.object(Client, 'post', return_value=RESPONSE) as post:
+            a.download_since_last(store=store, days=10)
+            self.assertFalse('<DTSTART>20190225' in post.call_args[0][0])
+            self.assertEqual(store.get(a.local_id()),
+                             '20190228120000.000[-5:EST]')
+
+            a.download_since_last(store=store, overlap_days=3)
+            self.assertTrue('<DTSTART>20190225' in post.call_args[0][0])
+
+        self.assertEqual(WatermarkStore(self.file_name).get(a.local_id()),
+                         '20190228120000.000[-5:EST]')